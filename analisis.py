@@ -1,7 +1,23 @@
+import numpy as np
 import pandas as pd
 import os
+import json
+import re
+import hashlib
+import sqlite3
 import unicodedata
 from datetime import datetime
+from exportador_excel import HOJA_ANOMALIAS, exportar_reporte_excel
+from catalogo import directorio_raiz, registrar_reporte
+from calendario_aperturas import actualizar_calendario
+from clasificador_lineal import HABILITADO as MODELO_LINEAL_HABILITADO, agregar_prediccion
+from anomalias import anomalias_a_tabla, detectar_anomalias
+from escritura_atomica import bloqueo_particion, nuevo_id_corrida
+from esquema import VERSION_ESQUEMA, aplicar_esquema
+from instantaneas import generar_instantanea
+from top_riesgo import actualizar_top
+from memo_clasificacion import COLUMNAS_MEMO, MemoClasificacion
+from rasgos_numericos import COLUMNAS_RASGOS, PARAMETROS_PONDERACION, VERSION_RASGOS, bono_por_monto, extraer_rasgos, monto_equivalente
 
 # Directorio de datos compatible con Docker y local
 DATA_DIR = "/app/data" if os.path.exists("/app") else os.path.join(os.getcwd(), "data")
@@ -21,32 +37,176 @@ MATRIZ_TEORICA = {
 
 REGLAS_CLASIFICACION = MATRIZ_TEORICA
 
+
+def calcular_version_reglas(matriz, ponderacion=None):
+    """
+    Huella corta de la matriz: cambia si cambia cualquier keyword, peso, la
+    ponderación por monto o la extracción de rasgos numéricos (VERSION_RASGOS)
+    """
+    contenido = json.dumps([matriz, ponderacion, VERSION_RASGOS], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()[:12]
+
+
+VERSION_REGLAS = calcular_version_reglas(MATRIZ_TEORICA, PARAMETROS_PONDERACION)
+
 def limpiar_texto_curado(texto):
     if not isinstance(texto, str): return ""
     texto = texto.lower()
     return "".join(c for c in unicodedata.normalize("NFD", texto) if unicodedata.category(c) != "Mn")
 
-def analizar_boletin(df):
-    if df.empty: return df, None, pd.DataFrame()
+def coincidencias_por_keyword(texto_clean, keywords):
+    """
+    {keyword: máscara} con una sola pasada sobre toda la columna: un filtro
+    con todas las keywords juntas y, solo sobre las filas candidatas, cada una.
+    Las keywords son texto literal (como en simulador_reglas.py), no regex.
+    """
+    if not keywords:
+        return {}
+    vacia = np.zeros(len(texto_clean), dtype=bool)
+    patron = "|".join(re.escape(k) for k in keywords)
+    candidatas = texto_clean.str.contains(patron, na=False).to_numpy(dtype=bool)
+    subconjunto = texto_clean[candidatas]
+    mascaras = {}
+    for keyword in keywords:
+        mascara = vacia.copy()
+        mascara[candidatas] = subconjunto.str.contains(keyword, regex=False, na=False).to_numpy(dtype=bool)
+        mascaras[keyword] = mascara
+    return mascaras
+
+
+def puntuar_versiones(detalles, matrices):
+    """
+    Aplica varias versiones de la matriz ({nombre: matriz}) compartiendo la
+    normalización, la búsqueda de keywords y los rasgos numéricos. Retorna
+    {nombre: resultado}, cada uno igual al de puntuar_textos con esa matriz.
+    """
+    # El texto normalizado solo se usa para clasificar; no se persiste
+    texto_clean = detalles.apply(limpiar_texto_curado)
+    keywords = sorted({k for matriz in matrices.values() for info in matriz.values() for k in info["keywords"]})
+    por_keyword = coincidencias_por_keyword(texto_clean, keywords)
+
+    # Montos, porcentajes y número de norma: un monto grande sube la
+    # intensidad de un fenómeno ya detectado (nunca marca uno nuevo)
+    rasgos = extraer_rasgos(detalles.to_frame("detalle"))
+    bono = bono_por_monto(monto_equivalente(rasgos))
+
+    resultados = {}
+    for nombre, matriz in matrices.items():
+        resultado = pd.DataFrame(index=detalles.index)
+        resultado["tipo_decision"] = "No identificado"
+        resultado["transferencia"] = "No identificado"
+        resultado["indice_fenomeno_corruptivo"] = 0.0
+        for categoria, info in matriz.items():
+            mask = np.zeros(len(detalles), dtype=bool)
+            for keyword in info["keywords"]:
+                mask |= por_keyword[keyword]
+            resultado.loc[mask, "tipo_decision"] = categoria
+            resultado.loc[mask, "transferencia"] = info["transferencia"]
+            resultado.loc[mask, "indice_fenomeno_corruptivo"] = info["peso"]
+
+        resultado[COLUMNAS_RASGOS] = rasgos
+        peso = resultado["indice_fenomeno_corruptivo"].to_numpy(dtype="float64")
+        resultado["indice_fenomeno_corruptivo"] = np.where(peso > 0, np.minimum(peso + bono, 10.0), 0.0).round(2)
+        resultados[nombre] = resultado
+    return resultados
+
+
+def puntuar_textos(detalles):
+    """Matriz + rasgos numéricos para una Serie de textos (sin memo ni archivos)"""
+    return puntuar_versiones(detalles, {"vigente": MATRIZ_TEORICA})["vigente"]
+
+
+def texto_para_clasificar(df):
+    """El detalle, más el texto de los anexos cuando la etapa de anexos.py corrió"""
+    if "texto_anexos" not in df.columns:
+        return df["detalle"]
+    anexos = df["texto_anexos"].fillna("").astype(str)
+    combinado = df["detalle"].fillna("").astype(str) + " " + anexos
+    return combinado.where(anexos != "", df["detalle"])
+
+
+def aviso_sin_anexos(data_dir):
+    """
+    Para las herramientas que reclasifican el archivo (comparar_reglas.py,
+    simulador_reglas.py): el texto de los anexos no se guarda en los
+    reportes, así que con la etapa de anexos activa solo se puede usar el detalle.
+    """
+    if os.environ.get("ANEXOS", "0") == "1" or os.path.isdir(os.path.join(data_dir, "anexos")):
+        return (
+            "ℹ️ Los reportes no guardan el texto de los anexos: este resultado usa solo el detalle "
+            "y puede diferir de lo que clasificó analizar_boletin con ANEXOS=1."
+        )
+    return None
+
+
+def clasificar_decisiones(df, memo=None):
+    """
+    Aplica la matriz a las filas recibidas sin escribir ningún reporte. Con
+    un MemoClasificacion, los textos ya vistos no se vuelven a procesar.
+    """
     df = df.copy()
-    df["texto_clean"] = df["detalle"].apply(limpiar_texto_curado)
-    df["tipo_decision"] = "No identificado"
-    df["transferencia"] = "No identificado"
-    df["indice_fenomeno_corruptivo"] = 0.0
-
-    for categoria, info in MATRIZ_TEORICA.items():
-        mask = df["texto_clean"].str.contains("|".join(info["keywords"]), na=False)
-        df.loc[mask, "tipo_decision"] = categoria
-        df.loc[mask, "transferencia"] = info["transferencia"]
-        df.loc[mask, "indice_fenomeno_corruptivo"] = info["peso"]
-
-    def evaluar_riesgo(score):
-        if score >= 8: return "Alto"
-        if score >= 5: return "Medio"
-        return "Bajo"
-
-    df["nivel_riesgo_teorico"] = df["indice_fenomeno_corruptivo"].apply(evaluar_riesgo)
-    fecha_str = datetime.now().strftime("%Y%m%d")
-    path = os.path.join(DATA_DIR, f"reporte_fenomenos_{fecha_str}.xlsx")
-    df.to_excel(path, index=False)
-    return df, path, pd.DataFrame()
+    textos = texto_para_clasificar(df)
+    if memo is None:
+        resultado = puntuar_textos(textos)
+    else:
+        resultado = memo.clasificar(textos, puntuar_textos)
+    for col in COLUMNAS_MEMO:
+        df[col] = resultado[col].to_numpy()
+
+    score = pd.to_numeric(df["indice_fenomeno_corruptivo"]).fillna(0.0)
+    df["nivel_riesgo_teorico"] = np.select([score >= 8, score >= 5], ["Alto", "Medio"], default="Bajo")
+    return aplicar_esquema(df)
+
+
+def abrir_memo(data_dir):
+    """Memo de clasificación bajo data/; sin él (disco de solo lectura) se clasifica todo"""
+    try:
+        return MemoClasificacion(data_dir, VERSION_REGLAS)
+    except sqlite3.Error as e:
+        print(f"⚠️ Memo de clasificación no disponible ({e}); se clasifica sin memo")
+        return None
+
+def analizar_boletin(df, directorio=None, id_corrida=None):
+    if df.empty: return df, None, pd.DataFrame()
+    ahora = datetime.now()
+    id_corrida = id_corrida or nuevo_id_corrida()
+    path = os.path.join(directorio or DATA_DIR, f"reporte_fenomenos_{ahora:%Y%m%d}.xlsx")
+    data_dir = directorio_raiz(path)
+
+    # Los textos ya clasificados con estas reglas se resuelven con una consulta
+    memo = abrir_memo(data_dir)
+    try:
+        df = clasificar_decisiones(df, memo)
+    finally:
+        if memo is not None:
+            memo.close()
+    if MODELO_LINEAL_HABILITADO:
+        # Segunda etapa: escenario sugerido por el modelo, al lado de tipo_decision
+        df = aplicar_esquema(agregar_prediccion(df, data_dir))
+
+    # Una corrida por día a la vez: anomalías, reporte, catálogo e instantánea
+    # quedan de la misma corrida aunque el robot y main.py corran juntos
+    with bloqueo_particion(data_dir, ahora.strftime("%Y-%m-%d")):
+        # Picos en la cantidad diaria por escenario / transferencia / organismo
+        anomalias = detectar_anomalias(df, ahora.strftime("%Y-%m-%d"), data_dir)
+        exportar_reporte_excel(
+            df, path, hojas_extra={HOJA_ANOMALIAS: anomalias_a_tabla(anomalias)}, id_corrida=id_corrida
+        )
+        # Antes del catálogo: cuando la API ve la versión nueva, los índices ya la tienen
+        reporte = os.path.relpath(path, data_dir)
+        actualizar_top(df, ahora.strftime("%Y-%m-%d"), data_dir, reporte)
+        actualizar_calendario(df, ahora.strftime("%Y-%m-%d"), data_dir, reporte)
+        registrar_reporte(
+            path,
+            df,
+            version_reglas=VERSION_REGLAS,
+            version_esquema=VERSION_ESQUEMA,
+            anomalias=anomalias,
+            id_corrida=id_corrida,
+        )
+        # Figuras y tablas del dashboard precalculadas una sola vez por reporte
+        try:
+            generar_instantanea(path, df)
+        except Exception as e:
+            print(f"⚠️ No se pudo generar la instantánea del reporte: {e}")
+    return df, path, anomalias_a_tabla(anomalias)
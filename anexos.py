@@ -0,0 +1,351 @@
+import os
+import re
+import html
+import json
+import signal
+import time
+import hashlib
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as TiempoAgotado
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urljoin, urlsplit
+from bs4 import BeautifulSoup
+from cliente_http import obtener_cliente
+from escritura_atomica import archivo_atomico
+
+try:
+    import resource
+except ImportError:  # Windows: sin límite de memoria por worker
+    resource = None
+
+try:
+    from pypdf import PdfReader, __version__ as VERSION_PYPDF
+except ImportError:  # Sin pypdf los PDF se descargan pero no se leen
+    PdfReader = VERSION_PYPDF = None
+
+# ==========================================
+# ANEXOS: PLIEGOS, CUADROS TARIFARIOS, ETC.
+# ==========================================
+# La evidencia más rica vive en los adjuntos: los anexos del BORA
+# (detalleAviso/...?anexos=1) y los pliegos de cada proceso de Comprar.
+# Esta etapa, opcional (ANEXOS=1), corre antes de la matriz:
+#
+#   1. Descarga (hilos, E/S): página del proceso -> enlaces .pdf/.docx ->
+#      documentos, con caché en data/anexos/ (no se bajan dos veces).
+#   2. Extracción (procesos, CPU): un pool de procesos con límite de
+#      memoria por worker y timeout por documento; el texto extraído
+#      también queda en caché junto al documento. Si la extracción falla,
+#      vence o mata a su worker, se deja <documento>.error y el documento no
+#      se reintenta hasta que cambie el archivo, VERSION_EXTRACTOR o la
+#      versión de pypdf. Tras un pool roto, los pendientes corren de a uno
+#      para identificar al culpable.
+#   3. El texto se agrega al DataFrame como 'texto_anexos' y la matriz lo
+#      lee junto con el detalle (no se persiste en el reporte).
+#
+# Todo tiene un presupuesto total de tiempo: si se agota, el robot sigue
+# con lo que haya y los documentos pendientes quedan para la próxima.
+
+DATA_DIR = "/app/data" if os.path.exists("/app") else "data"
+DIRECTORIO_ANEXOS = "anexos"
+
+HABILITADO = os.environ.get("ANEXOS", "0") == "1"
+WORKERS = int(os.environ.get("ANEXOS_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+TIMEOUT_DOCUMENTO = float(os.environ.get("ANEXOS_TIMEOUT_DOCUMENTO", "60"))
+MEMORIA_MAXIMA_MB = int(os.environ.get("ANEXOS_MEMORIA_MB", "512"))
+PRESUPUESTO_TOTAL = float(os.environ.get("ANEXOS_PRESUPUESTO", "900"))
+MAX_BYTES = 25 * 1024 * 1024
+MAX_ANEXOS_POR_PROCESO = 5
+MAX_PAGINAS_PDF = 200
+MAX_CARACTERES = 20000  # Texto por proceso que se pasa a la matriz
+# Subir al cambiar los extractores: los documentos que fallaron se reintentan
+VERSION_EXTRACTOR = 1
+
+PATRON_DOCUMENTO = re.compile(r"\.(pdf|docx)(?:$|[?#])", re.IGNORECASE)
+TIPOS_CONTENIDO = {
+    "application/pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+}
+
+
+# ==========================================
+# 1. DESCARGA CON CACHÉ
+# ==========================================
+def url_listado_anexos(link):
+    """Página donde están los adjuntos: el aviso del BORA con ?anexos=1 o el pliego de Comprar"""
+    if "/detalleAviso/" in link and "anexos=" not in link:
+        return link + ("&" if "?" in link else "?") + "anexos=1"
+    return link
+
+
+def enlaces_de_anexos(html_pagina, url_base):
+    """Enlaces a documentos .pdf / .docx de la página (sin repetir)"""
+    soup = BeautifulSoup(html_pagina, "html.parser")
+    enlaces = []
+    for a in soup.find_all("a", href=True):
+        url = urljoin(url_base, a["href"])
+        if PATRON_DOCUMENTO.search(urlsplit(url).path + "?") and url not in enlaces:
+            enlaces.append(url)
+    return enlaces[:MAX_ANEXOS_POR_PROCESO]
+
+
+def ruta_en_cache(url, directorio, tipo):
+    return os.path.join(directorio, f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.{tipo}")
+
+
+def _tipo_de(url, respuesta=None):
+    m = PATRON_DOCUMENTO.search(urlsplit(url).path + "?")
+    if m:
+        return m.group(1).lower()
+    if respuesta is not None:
+        return TIPOS_CONTENIDO.get(respuesta.headers.get("Content-Type", "").split(";")[0].strip())
+    return None
+
+
+def descargar_documento(url, cliente, directorio):
+    """Ruta local del documento (desde la caché si ya se bajó) o None"""
+    tipo = _tipo_de(url)
+    if tipo and os.path.exists(ruta_en_cache(url, directorio, tipo)):
+        return ruta_en_cache(url, directorio, tipo), tipo
+
+    respuesta = cliente.get(url)
+    respuesta.raise_for_status()
+    tipo = tipo or _tipo_de(url, respuesta)
+    if tipo is None or len(respuesta.content) > MAX_BYTES:
+        return None, None
+    ruta = ruta_en_cache(url, directorio, tipo)
+    with archivo_atomico(ruta) as temporal:
+        with open(temporal, "wb") as f:
+            f.write(respuesta.content)
+    return ruta, tipo
+
+
+def documentos_del_proceso(link, cliente, directorio):
+    """[(ruta, tipo), ...] de los adjuntos de un proceso; los errores no cortan el resto"""
+    try:
+        listado = url_listado_anexos(link)
+        respuesta = cliente.get(listado)
+        respuesta.raise_for_status()
+        enlaces = enlaces_de_anexos(respuesta.text, listado)
+    except Exception as e:
+        print(f"⚠️ Anexos no disponibles para {link}: {e}")
+        return []
+
+    documentos = []
+    for url in enlaces:
+        try:
+            ruta, tipo = descargar_documento(url, cliente, directorio)
+        except Exception as e:
+            print(f"⚠️ No se pudo descargar {url}: {e}")
+            continue
+        if ruta:
+            documentos.append((ruta, tipo))
+    return documentos
+
+
+# ==========================================
+# 2. EXTRACCIÓN DE TEXTO (POOL DE PROCESOS)
+# ==========================================
+def texto_pdf(ruta):
+    if PdfReader is None:
+        raise RuntimeError("pypdf no está instalado")
+    lector = PdfReader(ruta)
+    return "\n".join((pagina.extract_text() or "") for pagina in lector.pages[:MAX_PAGINAS_PDF])
+
+
+def texto_docx(ruta):
+    """Texto de word/document.xml (sin dependencias: un .docx es un zip)"""
+    with zipfile.ZipFile(ruta) as z:
+        xml = z.read("word/document.xml").decode("utf-8", errors="ignore")
+    xml = re.sub(r"</w:p>", "\n", xml)
+    return html.unescape(re.sub(r"<[^>]+>", "", xml))
+
+
+EXTRACTORES = {"pdf": texto_pdf, "docx": texto_docx}
+
+
+def _memoria_virtual_actual():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _limitar_worker(memoria_mb):
+    """Inicializador de cada worker: tope de memoria sobre lo que ya ocupa al arrancar"""
+    if resource is None or not memoria_mb:
+        return
+    actual = _memoria_virtual_actual()
+    if actual is None:
+        return
+    limite = actual + memoria_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+
+
+def _al_vencer(signum, frame):
+    raise TimeoutError("tiempo de extracción agotado")
+
+
+def extraer_texto(ruta, tipo, timeout=TIMEOUT_DOCUMENTO):
+    """Corre dentro del worker. Retorna (texto, error)"""
+    usa_alarma = hasattr(signal, "setitimer") and timeout
+    if usa_alarma:
+        signal.signal(signal.SIGALRM, _al_vencer)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return EXTRACTORES[tipo](ruta), None
+    except MemoryError:
+        return "", "memoria excedida"
+    except Exception as e:
+        return "", f"{type(e).__name__}: {e}"
+    finally:
+        if usa_alarma:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _identidad(ruta):
+    """Lo que invalida una falla registrada: el archivo y la versión de los extractores"""
+    estado = os.stat(ruta)
+    return {
+        "version": VERSION_EXTRACTOR,
+        "pypdf": VERSION_PYPDF,
+        "tamano": estado.st_size,
+        "modificado": estado.st_mtime_ns,
+    }
+
+
+def falla_registrada(ruta):
+    """Error de una extracción anterior del mismo documento, o None"""
+    try:
+        with open(ruta + ".error", encoding="utf-8") as f:
+            marca = json.load(f)
+        if {k: marca.get(k) for k in ("version", "pypdf", "tamano", "modificado")} == _identidad(ruta):
+            return marca.get("error")
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def registrar_falla(ruta, error):
+    with archivo_atomico(ruta + ".error") as temporal:
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({**_identidad(ruta), "error": error}, f, ensure_ascii=False)
+
+
+def _pool_de_extraccion(workers):
+    # spawn: los workers no heredan los hilos ni las sesiones HTTP del robot
+    return ProcessPoolExecutor(
+        max_workers=max(1, workers),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_limitar_worker,
+        initargs=(MEMORIA_MAXIMA_MB,),
+    )
+
+
+def extraer_textos(documentos, workers=WORKERS, timeout=TIMEOUT_DOCUMENTO, presupuesto=PRESUPUESTO_TOTAL):
+    """
+    {ruta: texto} para los documentos [(ruta, tipo)]. El texto ya extraído
+    se lee de la caché (<ruta>.txt); los que ya fallaron se saltean y el
+    resto va al pool de procesos.
+    """
+    textos, pendientes, salteados = {}, [], 0
+    for ruta, tipo in dict(documentos).items():
+        cache = ruta + ".txt"
+        if os.path.exists(cache):
+            with open(cache, encoding="utf-8") as f:
+                textos[ruta] = f.read()
+        elif falla_registrada(ruta) is not None:
+            salteados += 1
+        else:
+            pendientes.append((ruta, tipo))
+    if salteados:
+        print(f"📎 {salteados} documento(s) salteados por fallas anteriores (ver <documento>.error)")
+    if not pendientes:
+        return textos
+
+    errores = 0
+    resueltos = set()
+    limite = time.monotonic() + presupuesto
+
+    def resolver(ruta, texto, error):
+        nonlocal errores
+        resueltos.add(ruta)
+        if error:
+            errores += 1
+            print(f"⚠️ Sin texto para {os.path.basename(ruta)}: {error}")
+            registrar_falla(ruta, error)
+            return
+        textos[ruta] = texto
+        with archivo_atomico(ruta + ".txt") as temporal:
+            with open(temporal, "w", encoding="utf-8") as f:
+                f.write(texto)
+
+    pool = _pool_de_extraccion(min(workers, len(pendientes)))
+    futuros = {pool.submit(extraer_texto, ruta, tipo, timeout): ruta for ruta, tipo in pendientes}
+    roto = False
+    try:
+        for futuro in as_completed(futuros, timeout=presupuesto):
+            try:
+                resolver(futuros[futuro], *futuro.result())
+            except BrokenProcessPool:
+                print("❌ Un documento interrumpió el pool de extracción; los pendientes se reintentan de a uno")
+                roto = True
+                break
+    except TiempoAgotado:
+        print(f"⏱️ Presupuesto de anexos agotado ({presupuesto:.0f}s); el resto queda para la próxima corrida")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    # De a uno en un pool propio: el documento que lo vuelve a romper queda marcado
+    for ruta, tipo in pendientes if roto else []:
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            print(f"⏱️ Presupuesto de anexos agotado ({presupuesto:.0f}s); el resto queda para la próxima corrida")
+            break
+        if ruta in resueltos:
+            continue
+        aislado = _pool_de_extraccion(1)
+        try:
+            resolver(ruta, *aislado.submit(extraer_texto, ruta, tipo, timeout).result(timeout=restante))
+        except BrokenProcessPool:
+            resolver(ruta, "", "el proceso de extracción terminó abruptamente (¿memoria?)")
+        except TiempoAgotado:
+            print(f"⏱️ Presupuesto de anexos agotado ({presupuesto:.0f}s); el resto queda para la próxima corrida")
+            break
+        finally:
+            aislado.shutdown(wait=False, cancel_futures=True)
+
+    print(f"📎 Texto extraído de {len(textos)} documento(s); {errores} con error")
+    return textos
+
+
+# ==========================================
+# 3. ENRIQUECIMIENTO DEL LOTE
+# ==========================================
+def agregar_texto_anexos(df, cliente=None, data_dir=None, workers=WORKERS, hilos=8):
+    """Agrega 'texto_anexos' y 'anexos' (documentos leídos) por proceso"""
+    if df.empty or "link" not in df.columns:
+        return df
+    cliente = cliente or obtener_cliente()
+    directorio = os.path.join(data_dir or DATA_DIR, DIRECTORIO_ANEXOS)
+    os.makedirs(directorio, exist_ok=True)
+
+    links = [l for l in df["link"].dropna().astype(str).unique() if l.startswith("http")]
+    print(f"📎 Buscando anexos de {len(links)} procesos...")
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        por_link = dict(zip(links, pool.map(lambda l: documentos_del_proceso(l, cliente, directorio), links)))
+
+    textos = extraer_textos([d for docs in por_link.values() for d in docs], workers=workers)
+
+    texto_por_link, cantidad_por_link = {}, {}
+    for link, documentos in por_link.items():
+        leidos = [textos[ruta] for ruta, _ in documentos if textos.get(ruta)]
+        texto_por_link[link] = re.sub(r"\s+", " ", " ".join(leidos)).strip()[:MAX_CARACTERES]
+        cantidad_por_link[link] = len(leidos)
+
+    df = df.copy()
+    df["texto_anexos"] = df["link"].map(texto_por_link).fillna("")
+    df["anexos"] = df["link"].map(cantidad_por_link).fillna(0).astype("int16")
+    return df
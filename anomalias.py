@@ -0,0 +1,225 @@
+import os
+import json
+import math
+import pandas as pd
+from catalogo import cargar_catalogo, escribir_json_atomico, todos_los_reportes
+from cubo import NO_IDENTIFICADO, construir_cubo, cubo_desde_registros, rollup
+from deltas import leer_dia
+from escritura_atomica import bloqueo
+
+# ==========================================
+# DETECCIÓN INCREMENTAL DE ANOMALÍAS
+# ==========================================
+# El peso de la matriz es fijo por escenario: una ráfaga de
+# redeterminaciones de un mismo organismo no se distingue de un día normal.
+# Esta etapa mantiene, por cada escenario, transferencia y organismo, una
+# media y una varianza móviles exponenciales (EWMA) de la cantidad diaria
+# de decisiones, y marca el día cuando la cantidad se aleja de lo esperado.
+#
+# Cada reporte nuevo actualiza el estado en O(1) por serie (no se recorre
+# el historial). El estado vive en data/anomalias.json; se puede rehacer
+# desde el catálogo con: python anomalias.py reconstruir
+
+NOMBRE_ESTADO = "anomalias.json"
+VERSION_ESTADO = 1
+BLOQUEO_ESTADO = "anomalias"
+
+ALFA = 0.2  # Peso del día nuevo (~ ventana efectiva de 9 días)
+UMBRAL_Z = 3.0
+MIN_OBSERVACIONES = 5  # Días de historia antes de empezar a marcar
+MIN_CANTIDAD = 3  # Ignora "picos" de una o dos decisiones
+DESVIO_MINIMO = 1.0  # Evita z infinitos en series que nunca variaron
+MEDIA_OLVIDO = 0.05  # Series sin actividad por semanas se descartan
+
+DIMENSIONES = {
+    "escenario": "tipo_decision",
+    "transferencia": "transferencia",
+    "organismo": "organismo",
+}
+
+
+def ruta_estado(data_dir):
+    return os.path.join(data_dir, NOMBRE_ESTADO)
+
+
+def estado_vacio():
+    return {
+        "version": VERSION_ESTADO,
+        "alfa": ALFA,
+        "ultimo_reporte": None,
+        "dias": 0,
+        "series": {},
+        "series_previas": {},
+    }
+
+
+def cargar_estado(data_dir):
+    ruta = ruta_estado(data_dir)
+    if not os.path.exists(ruta):
+        return estado_vacio()
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            estado = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Estado de anomalías ilegible ({ruta}): {e}")
+        return estado_vacio()
+    if estado.get("version") != VERSION_ESTADO or estado.get("alfa") != ALFA:
+        return estado_vacio()
+    return estado
+
+
+def guardar_estado(estado, data_dir):
+    escribir_json_atomico(ruta_estado(data_dir), estado)
+
+
+# ==========================================
+# CONTEOS DEL DÍA
+# ==========================================
+def conteos_del_reporte(df, cubo=None):
+    """{'escenario|Obra Pública / Contratos': 12, ...} solo para lo detectado"""
+    cubo = construir_cubo(df) if cubo is None else cubo
+    conteos = {}
+    for dimension in ("escenario", "transferencia"):
+        columna = DIMENSIONES[dimension]
+        for fila in rollup(cubo, [columna]).itertuples(index=False):
+            valor = getattr(fila, columna)
+            if valor != NO_IDENTIFICADO:
+                conteos[f"{dimension}|{valor}"] = int(fila.cantidad)
+
+    if "organismo" in df.columns and "tipo_decision" in df.columns:
+        detectados = df.loc[df["tipo_decision"] != NO_IDENTIFICADO, "organismo"].dropna()
+        for valor, cantidad in detectados.astype(str).value_counts().items():
+            conteos[f"organismo|{valor}"] = int(cantidad)
+    return conteos
+
+
+# ==========================================
+# ACTUALIZACIÓN EWMA
+# ==========================================
+def actualizar_serie(serie, x, alfa=ALFA):
+    """
+    Compara x con lo esperado ANTES de incorporarlo y luego actualiza la
+    media/varianza exponenciales. Retorna (serie_nueva, esperado, desvio, z).
+    """
+    if serie is None:
+        return {"media": float(x), "var": 0.0, "n": 1}, None, None, None
+
+    media, var = serie["media"], serie["var"]
+    desvio = max(math.sqrt(var), DESVIO_MINIMO)
+    z = (x - media) / desvio
+
+    diferencia = x - media
+    incremento = alfa * diferencia
+    nueva = {
+        "media": media + incremento,
+        "var": (1 - alfa) * (var + diferencia * incremento),
+        "n": serie["n"] + 1,
+    }
+    return nueva, media, desvio, z
+
+
+def procesar_reporte(conteos, fecha, estado):
+    """
+    Avanza el estado con los conteos del día 'fecha' y retorna las anomalías.
+    Reprocesar el mismo día parte del estado previo a ese día (idempotente);
+    un día anterior al último procesado no modifica el estado.
+    """
+    ultimo = estado["ultimo_reporte"]
+    if ultimo is not None and fecha < ultimo:
+        print(f"⚠️ Reporte {fecha} anterior al estado ({ultimo}): no se actualizan las anomalías")
+        return []
+    repetido = fecha == ultimo
+    base = estado["series_previas"] if repetido else estado["series"]
+    dias = estado["dias"] - 1 if repetido else estado["dias"]
+
+    nuevas, anomalias = {}, []
+    # Las series que no aparecen hoy también avanzan, con cantidad 0; una
+    # serie nueva equivale a una que estuvo en 0 todos los días anteriores
+    implicita = {"media": 0.0, "var": 0.0, "n": dias} if dias else None
+    for clave in set(base) | set(conteos):
+        x = conteos.get(clave, 0)
+        previa = base.get(clave, implicita)
+        serie, esperado, desvio, z = actualizar_serie(previa, x)
+        if x == 0 and serie["media"] < MEDIA_OLVIDO:
+            continue  # Serie apagada: se olvida para acotar el estado
+        nuevas[clave] = serie
+        if (
+            z is not None
+            and previa["n"] >= MIN_OBSERVACIONES
+            and z >= UMBRAL_Z
+            and x >= MIN_CANTIDAD
+        ):
+            dimension, valor = clave.split("|", 1)
+            anomalias.append(
+                {
+                    "dimension": dimension,
+                    "valor": valor,
+                    "cantidad": x,
+                    "esperado": round(esperado, 2),
+                    "desvio": round(desvio, 2),
+                    "z": round(z, 2),
+                }
+            )
+
+    estado["series_previas"] = base
+    estado["series"] = nuevas
+    estado["ultimo_reporte"] = fecha
+    estado["dias"] = dias + 1
+    return sorted(anomalias, key=lambda a: a["z"], reverse=True)
+
+
+def detectar_anomalias(df, fecha, data_dir, cubo=None):
+    """Punto de entrada del pipeline: actualiza el estado persistido"""
+    conteos = conteos_del_reporte(df, cubo)
+    with bloqueo(data_dir, BLOQUEO_ESTADO):
+        estado = cargar_estado(data_dir)
+        anomalias = procesar_reporte(conteos, fecha, estado)
+        guardar_estado(estado, data_dir)
+    if anomalias:
+        print(f"📈 {len(anomalias)} anomalía(s) en la cantidad diaria de decisiones")
+    return anomalias
+
+
+def anomalias_a_tabla(anomalias):
+    columnas = ["dimension", "valor", "cantidad", "esperado", "desvio", "z"]
+    return pd.DataFrame(anomalias, columns=columnas)
+
+
+# ==========================================
+# RECONSTRUCCIÓN DESDE EL CATÁLOGO
+# ==========================================
+def reconstruir_estado(data_dir):
+    """
+    Recorre los reportes del catálogo en orden cronológico y rehace el estado.
+    Escenarios y transferencias salen de los cubos persistidos; el reporte
+    (sidecar) se abre solo para contar organismos. Retorna {fecha: anomalías}.
+    """
+    estado = estado_vacio()
+    resultado = {}
+    for entrada in reversed(todos_los_reportes(data_dir) or []):
+        if not entrada.get("fecha"):
+            continue
+        df = leer_dia(os.path.join(data_dir, entrada["ruta"]), data_dir)
+        cubo = cubo_desde_registros(entrada.get("cubo"))
+        resultado[entrada["fecha"]] = procesar_reporte(conteos_del_reporte(df, cubo), entrada["fecha"], estado)
+    with bloqueo(data_dir, BLOQUEO_ESTADO):
+        guardar_estado(estado, data_dir)
+    return resultado
+
+
+if __name__ == "__main__":
+    import sys
+
+    data_dir = "/app/data" if os.path.exists("/app/data") else "data"
+    if sys.argv[1:2] == ["reconstruir"]:
+        if cargar_catalogo(data_dir) is None:
+            print("❌ No hay catálogo; ejecutar antes: python catalogo.py")
+            sys.exit(1)
+        por_dia = reconstruir_estado(data_dir)
+        marcados = {f: a for f, a in por_dia.items() if a}
+        print(f"✅ Estado rehecho con {len(por_dia)} reportes; {len(marcados)} día(s) con anomalías.")
+        for fecha, anomalias in marcados.items():
+            for a in anomalias:
+                print(f"   {fecha} · {a['dimension']} '{a['valor']}': {a['cantidad']} (esperado {a['esperado']}, z={a['z']})")
+    else:
+        print("USO: python anomalias.py reconstruir")
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+API de Consultas - Acceso de solo lectura a los datos analizados
+=================================================================
+
+Servidor HTTP liviano (biblioteca estándar) para consumidores automáticos,
+que así no necesitan scrapear el dashboard ni descargar los xlsx:
+
+    GET /salud
+    GET /reportes?desde=&hasta=
+    GET /procesos?desde=&hasta=&escenario=&transferencia=&nivel=&limite=&despues=
+    GET /agregados?desde=&hasta=&por=escenario|transferencia|nivel
+    GET /top?desde=&hasta=&escenario=&limite=
+
+- Filtros: fechas YYYY-MM-DD; escenario, transferencia y nivel admiten
+  varios valores separados por coma.
+- /procesos pagina por keyset: cada respuesta trae "siguiente", un cursor
+  opaco que se pasa como ?despues= para pedir la página que sigue. El costo
+  no crece con el número de página (no hay OFFSET).
+- /agregados suma los cubos guardados en el catálogo (ver cubo.py) sin
+  abrir ningún reporte.
+- /top responde las decisiones de mayor índice del rango desde el índice
+  persistido de top_riesgo.py, también sin abrir reportes.
+- Todas las respuestas llevan ETag (derivado de la versión del catálogo y
+  de la consulta) y Cache-Control; un If-None-Match vigente responde 304.
+  Además hay un caché en memoria de respuestas ya serializadas.
+
+USO:
+    python api_consultas.py --puerto 8600
+    curl "http://127.0.0.1:8600/procesos?nivel=Alto&desde=2026-02-01&limite=50"
+"""
+
+import os
+import json
+import base64
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+from catalogo import ruta_catalogo, todos_los_reportes
+from consultas_dashboard import filtrar_reporte
+from cubo import NO_IDENTIFICADO, construir_cubo, cubo_desde_registros, rollup
+from deltas import calcular_claves, leer_dia
+from top_riesgo import COLUMNAS_TOP, K as TOP_K, consultar_top
+
+DATA_DIR = "/app/data" if os.path.exists("/app") else "data"
+
+LIMITE_DEFECTO = 100
+LIMITE_MAXIMO = 1000
+MAX_AGE = int(os.environ.get("API_MAX_AGE", "60"))
+TAMANO_CACHE = 256
+
+DIMENSIONES_AGREGADO = {
+    "escenario": "tipo_decision",
+    "transferencia": "transferencia",
+    "nivel": "nivel_riesgo_teorico",
+}
+COLUMNAS_PUBLICAS = [
+    "fecha_reporte",
+    "nro_proceso",
+    "detalle",
+    "tipo_proceso",
+    "fecha_apertura",
+    "link",
+    "tipo_decision",
+    "transferencia",
+    "indice_fenomeno_corruptivo",
+    "nivel_riesgo_teorico",
+]
+
+
+class ConsultaInvalida(ValueError):
+    pass
+
+
+# ==========================================
+# LECTURA DE DATOS
+# ==========================================
+@lru_cache(maxsize=32)
+def _reporte_indexado(ruta, data_dir, sha256):
+    """Reporte con su clave de keyset, ordenado por clave (sha256 invalida el caché)"""
+    df = leer_dia(ruta, data_dir)
+    claves = calcular_claves(df).astype(str)
+    # Filas repetidas en el mismo día: se desambiguan por orden de aparición
+    repetidas = claves.groupby(claves).cumcount()
+    df = df.assign(_clave=claves.where(repetidas == 0, claves + "#" + repetidas.astype(str)))
+    return df.sort_values("_clave", kind="stable").reset_index(drop=True)
+
+
+def _lista(parametros, nombre):
+    valores = []
+    for valor in parametros.get(nombre, []):
+        valores += [v.strip() for v in valor.split(",") if v.strip()]
+    return valores or None
+
+
+def _fecha(parametros, nombre):
+    valor = parametros.get(nombre, [None])[0]
+    if valor is None:
+        return None
+    try:
+        return pd.Timestamp(valor).strftime("%Y-%m-%d")
+    except ValueError:
+        raise ConsultaInvalida(f"Fecha inválida en '{nombre}': {valor}")
+
+
+def reportes_en_rango(data_dir, desde=None, hasta=None):
+    """Entradas del catálogo dentro del rango, más reciente primero"""
+    entradas = todos_los_reportes(data_dir) or []
+    return [
+        e
+        for e in entradas
+        if e.get("fecha")
+        and (desde is None or e["fecha"] >= desde)
+        and (hasta is None or e["fecha"] <= hasta)
+    ]
+
+
+def codificar_cursor(fecha, clave):
+    crudo = json.dumps([fecha, clave], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(crudo).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        fecha, clave = json.loads(crudo)
+        return str(fecha), str(clave)
+    except (ValueError, TypeError):
+        raise ConsultaInvalida("Cursor 'despues' inválido")
+
+
+# ==========================================
+# CONSULTAS
+# ==========================================
+def consultar_reportes(parametros, data_dir):
+    entradas = reportes_en_rango(data_dir, _fecha(parametros, "desde"), _fecha(parametros, "hasta"))
+    campos = ["fecha", "filas", "detectados", "riesgo", "intensidad_max", "intensidad_promedio", "version_reglas"]
+    return {"datos": [{c: e.get(c) for c in campos} for e in entradas]}
+
+
+def consultar_procesos(parametros, data_dir):
+    """
+    Keyset sobre (fecha del reporte desc, clave asc). Solo se abren los
+    reportes necesarios para completar la página.
+    """
+    try:
+        limite = int(parametros.get("limite", [LIMITE_DEFECTO])[0])
+    except ValueError:
+        raise ConsultaInvalida("'limite' debe ser un entero")
+    limite = min(max(1, limite), LIMITE_MAXIMO)
+
+    cursor = parametros.get("despues", [None])[0]
+    fecha_cursor, clave_cursor = decodificar_cursor(cursor) if cursor else (None, None)
+    filtros = {
+        "escenarios": _lista(parametros, "escenario"),
+        "transferencias": _lista(parametros, "transferencia"),
+        "niveles": _lista(parametros, "nivel"),
+    }
+
+    paginas, faltan = [], limite + 1
+    for entrada in reportes_en_rango(data_dir, _fecha(parametros, "desde"), _fecha(parametros, "hasta")):
+        if fecha_cursor is not None and entrada["fecha"] > fecha_cursor:
+            continue
+        ruta = os.path.join(data_dir, entrada["ruta"])
+        df = _reporte_indexado(ruta, data_dir, entrada.get("sha256"))
+        if fecha_cursor is not None and entrada["fecha"] == fecha_cursor:
+            df = df.iloc[df["_clave"].searchsorted(clave_cursor, side="right") :]
+        df = filtrar_reporte(df, **filtros).head(faltan)
+        if df.empty:
+            continue
+        paginas.append(df.assign(fecha_reporte=entrada["fecha"]))
+        faltan -= len(df)
+        if faltan == 0:
+            break
+
+    filas = pd.concat(paginas, ignore_index=True) if paginas else pd.DataFrame(columns=COLUMNAS_PUBLICAS)
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas.iloc[:limite]
+        ultimo = filas.iloc[-1]
+        siguiente = codificar_cursor(ultimo["fecha_reporte"], ultimo["_clave"])
+
+    columnas = [c for c in COLUMNAS_PUBLICAS if c in filas.columns]
+    # to_json resuelve categorías, float32 y NaN (null) en una pasada
+    datos = json.loads(filas[columnas].to_json(orient="records", force_ascii=False))
+    return {"datos": datos, "limite": limite, "siguiente": siguiente}
+
+
+def consultar_agregados(parametros, data_dir):
+    por = parametros.get("por", ["escenario"])[0]
+    if por not in DIMENSIONES_AGREGADO:
+        raise ConsultaInvalida(f"'por' debe ser uno de: {', '.join(DIMENSIONES_AGREGADO)}")
+    dimension = DIMENSIONES_AGREGADO[por]
+
+    cubos = []
+    entradas = reportes_en_rango(data_dir, _fecha(parametros, "desde"), _fecha(parametros, "hasta"))
+    for entrada in entradas:
+        cubo = cubo_desde_registros(entrada.get("cubo"))
+        if cubo is None:
+            # Entrada de una versión anterior del catálogo: se recalcula
+            ruta = os.path.join(data_dir, entrada["ruta"])
+            cubo = construir_cubo(_reporte_indexado(ruta, data_dir, entrada.get("sha256")))
+        cubos.append(cubo)
+
+    if not cubos:
+        return {"por": por, "reportes": 0, "datos": []}
+    vista = rollup(pd.concat(cubos, ignore_index=True), [dimension], solo_detectados=por != "nivel")
+    vista = vista[vista[dimension] != NO_IDENTIFICADO].sort_values("cantidad", ascending=False)
+    vista = vista.rename(columns={dimension: por})
+    datos = [
+        {por: f[por], "cantidad": int(f["cantidad"]), "media": round(float(f["media"]), 3), "maximo": float(f["maximo"])}
+        for f in vista.to_dict(orient="records")
+    ]
+    return {"por": por, "reportes": len(cubos), "datos": datos}
+
+
+def consultar_mayor_riesgo(parametros, data_dir):
+    try:
+        limite = int(parametros.get("limite", [50])[0])
+    except ValueError:
+        raise ConsultaInvalida("'limite' debe ser un entero")
+    if not 1 <= limite <= TOP_K:
+        raise ConsultaInvalida(f"'limite' debe estar entre 1 y {TOP_K}")
+    escenario = parametros.get("escenario", [None])[0]
+    decisiones = consultar_top(data_dir, limite, _fecha(parametros, "desde"), _fecha(parametros, "hasta"), escenario)
+    return {"datos": [{c: d.get(c) for c in ["fecha"] + COLUMNAS_TOP} for d in decisiones], "limite": limite}
+
+
+RUTAS = {
+    "/reportes": consultar_reportes,
+    "/procesos": consultar_procesos,
+    "/agregados": consultar_agregados,
+    "/top": consultar_mayor_riesgo,
+}
+
+
+# ==========================================
+# CACHÉ DE RESPUESTAS
+# ==========================================
+class CacheRespuestas:
+    """LRU de cuerpos ya serializados, indexado por versión de datos + consulta"""
+
+    def __init__(self, tamano=TAMANO_CACHE):
+        self.tamano = tamano
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                return self._datos[clave]
+            return None
+
+    def guardar(self, clave, cuerpo):
+        with self._lock:
+            self._datos[clave] = cuerpo
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.tamano:
+                self._datos.popitem(last=False)
+
+
+def version_datos(data_dir):
+    """Cambia cada vez que se reescribe el catálogo (nuevo reporte, migración)"""
+    try:
+        stat = os.stat(ruta_catalogo(data_dir))
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+    except OSError:
+        return "sin-catalogo"
+
+
+def calcular_etag(version, ruta, parametros):
+    consulta = json.dumps(sorted(parametros.items()), ensure_ascii=False)
+    return '"' + hashlib.sha256(f"{version}|{ruta}|{consulta}".encode("utf-8")).hexdigest()[:20] + '"'
+
+
+# ==========================================
+# SERVIDOR HTTP
+# ==========================================
+def crear_manejador(data_dir, cache):
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _responder(self, codigo, cuerpo=b"", etag=None):
+            self.send_response(codigo)
+            if etag:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", f"public, max-age={MAX_AGE}")
+            else:
+                self.send_header("Cache-Control", "no-store")
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(cuerpo)
+
+        def _error(self, codigo, mensaje):
+            self._responder(codigo, json.dumps({"error": mensaje}, ensure_ascii=False).encode("utf-8"))
+
+        def do_GET(self):
+            partes = urlsplit(self.path)
+            ruta = partes.path.rstrip("/") or "/"
+            if ruta == "/salud":
+                return self._responder(200, json.dumps({"estado": "ok", "version": version_datos(data_dir)}).encode())
+            if ruta not in RUTAS:
+                return self._error(404, "Ruta desconocida")
+
+            parametros = parse_qs(partes.query)
+            etag = calcular_etag(version_datos(data_dir), ruta, parametros)
+            if self.headers.get("If-None-Match") == etag:
+                return self._responder(304, etag=etag)
+
+            cuerpo = cache.obtener(etag)
+            if cuerpo is None:
+                try:
+                    resultado = RUTAS[ruta](parametros, data_dir)
+                except ConsultaInvalida as e:
+                    return self._error(400, str(e))
+                except Exception as e:
+                    print(f"❌ Error en {self.path}: {e}")
+                    return self._error(500, "Error interno")
+                cuerpo = json.dumps(resultado, ensure_ascii=False, default=str).encode("utf-8")
+                cache.guardar(etag, cuerpo)
+            self._responder(200, cuerpo, etag)
+
+        do_HEAD = do_GET
+
+        def log_message(self, *args):
+            pass
+
+    return Manejador
+
+
+def crear_servidor(data_dir=None, host="127.0.0.1", puerto=0):
+    servidor = ThreadingHTTPServer((host, puerto), crear_manejador(data_dir or DATA_DIR, CacheRespuestas()))
+    servidor.daemon_threads = True
+    return servidor
+
+
+def iniciar_api(data_dir=None, host="127.0.0.1", puerto=0):
+    """Levanta la API en un hilo. Retorna (servidor, url_base)."""
+    servidor = crear_servidor(data_dir, host, puerto)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://{host}:{servidor.server_port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API de consultas de solo lectura")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8600)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args()
+
+    servidor = crear_servidor(args.data_dir, args.host, args.puerto)
+    print(f"🌐 API de consultas en http://{args.host}:{args.puerto} (datos: {args.data_dir})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 API detenida")
@@ -0,0 +1,126 @@
+import os
+import hashlib
+import pandas as pd
+from escritura_atomica import archivo_atomico
+from esquema import VERSION_ESQUEMA, aplicar_esquema
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # Sin pyarrow se lee siempre el Excel original
+    pa = None
+    feather = None
+
+# ==========================================
+# CACHÉ COLUMNAR (SIDECAR ARROW) PARA REPORTES XLSX
+# ==========================================
+# Los reportes .xlsx se conservan intactos para los auditores. La primera
+# lectura de cada reporte deja al lado un archivo .arrow con el esquema
+# (esquema.py) ya aplicado; las lecturas siguientes (de cualquier proceso)
+# lo abren con memory-map en lugar de volver a parsear y tipar el Excel.
+
+EXTENSION_SIDECAR = ".arrow"
+
+def ruta_sidecar(ruta_xlsx):
+    """data/2026-01/reporte_fenomenos_20260121.xlsx -> ...20260121.arrow"""
+    return os.path.splitext(ruta_xlsx)[0] + EXTENSION_SIDECAR
+
+
+def calcular_sha256(ruta, bloque=1 << 20):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for chunk in iter(lambda: f.read(bloque), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def leer_excel_normalizado(ruta_xlsx):
+    """Lee la hoja Analisis (o la primera, en reportes antiguos) y aplica el esquema"""
+    xl = pd.ExcelFile(ruta_xlsx)
+    hoja = "Analisis" if "Analisis" in xl.sheet_names else xl.sheet_names[0]
+    return aplicar_esquema(xl.parse(hoja))
+
+
+def _metadatos_sidecar(ruta):
+    """Lee solo el esquema del sidecar (sin cargar los datos)"""
+    with pa.memory_map(ruta, "r") as fuente:
+        meta = pa.ipc.open_file(fuente).schema.metadata or {}
+    return {k.decode(): v.decode() for k, v in meta.items()}
+
+
+def sidecar_vigente(ruta_xlsx):
+    """
+    Un sidecar es vigente si corresponde a la misma versión del esquema y al
+    mismo contenido del xlsx. Primero se compara mtime/tamaño (barato) y,
+    si difieren (p. ej. tras un checkout de git), el hash del contenido.
+    """
+    sidecar = ruta_sidecar(ruta_xlsx)
+    if pa is None or not os.path.exists(sidecar):
+        return False
+
+    try:
+        meta = _metadatos_sidecar(sidecar)
+    except (OSError, pa.ArrowInvalid):
+        return False
+
+    if meta.get("version_esquema") != str(VERSION_ESQUEMA):
+        return False
+
+    stat = os.stat(ruta_xlsx)
+    if meta.get("origen_mtime_ns") == str(stat.st_mtime_ns) and meta.get(
+        "origen_tamano"
+    ) == str(stat.st_size):
+        return True
+
+    return meta.get("origen_sha256") == calcular_sha256(ruta_xlsx)
+
+
+def preparar_para_arrow(df):
+    """Las columnas object con tipos mezclados se guardan como texto"""
+    df = df.reset_index(drop=True)
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def escribir_sidecar(ruta_xlsx, df):
+    """Escribe el sidecar de forma atómica (archivo temporal + rename)"""
+    stat = os.stat(ruta_xlsx)
+    tabla = pa.Table.from_pandas(preparar_para_arrow(df), preserve_index=False)
+    tabla = tabla.replace_schema_metadata(
+        {
+            **(tabla.schema.metadata or {}),
+            "version_esquema": str(VERSION_ESQUEMA),
+            "origen_mtime_ns": str(stat.st_mtime_ns),
+            "origen_tamano": str(stat.st_size),
+            "origen_sha256": calcular_sha256(ruta_xlsx),
+        }
+    )
+
+    sidecar = ruta_sidecar(ruta_xlsx)
+    with archivo_atomico(sidecar) as temporal:
+        # Sin compresión para que la lectura pueda ser zero-copy vía memory-map
+        feather.write_feather(tabla, temporal, compression="uncompressed")
+    return sidecar
+
+
+def leer_reporte(ruta_xlsx):
+    """
+    Lectura read-through: usa el sidecar si está vigente; si no, parsea el
+    xlsx, aplica el esquema y deja el sidecar listo para la próxima lectura.
+    """
+    if sidecar_vigente(ruta_xlsx):
+        tabla = feather.read_table(ruta_sidecar(ruta_xlsx), memory_map=True)
+        return tabla.to_pandas()
+
+    df = leer_excel_normalizado(ruta_xlsx)
+
+    if pa is not None:
+        try:
+            escribir_sidecar(ruta_xlsx, df)
+        except (OSError, pa.ArrowException) as e:
+            # Volumen de solo lectura o datos no convertibles: se sigue sin caché
+            print(f"⚠️ No se pudo escribir el sidecar de {ruta_xlsx}: {e}")
+
+    return df
@@ -0,0 +1,202 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from catalogo import cargar_catalogo, todos_los_reportes
+from deltas import calcular_claves, leer_dia
+from escritura_atomica import archivo_atomico, bloqueo
+from esquema import COLUMNA_APERTURA, COLUMNA_INDICE, COLUMNA_NIVEL
+
+# ==========================================
+# CALENDARIO DE APERTURAS (ÍNDICE ORDENADO POR FECHA)
+# ==========================================
+# "¿Qué procesos de riesgo Alto abren sus ofertas en los próximos 7 días?"
+# La fecha de apertura se parsea una sola vez al ingresar (columna
+# 'apertura', ver esquema.py). Este índice junta las aperturas de todo el
+# archivo en una tabla ordenada por fecha: un rango se resuelve con dos
+# búsquedas binarias (O(log n)) y se devuelve como un corte contiguo, sin
+# abrir ningún reporte.
+#
+# Un mismo proceso aparece en los reportes de varios días mientras sigue
+# abierto: queda la versión del reporte más reciente. Cada reporte nuevo se
+# fusiona al llegar; se puede rehacer desde el catálogo con:
+#   python calendario_aperturas.py reconstruir
+# Si el índice falta (clon nuevo) o es de otra versión, cargar_calendario lo
+# rehace solo desde el catálogo. El robot además lo versiona en cada corrida.
+
+NOMBRE_INDICE = "calendario_aperturas.arrow"
+VERSION_INDICE = 1
+BLOQUEO_INDICE = "calendario_aperturas"
+
+COL_CLAVE = "_clave"
+COLUMNAS_CALENDARIO = [
+    COLUMNA_APERTURA,
+    "fecha_apertura",
+    "nro_proceso",
+    "detalle",
+    "tipo_proceso",
+    "organismo",
+    "tipo_decision",
+    COLUMNA_INDICE,
+    COLUMNA_NIVEL,
+    "link",
+]
+
+
+def ruta_indice(data_dir):
+    return os.path.join(data_dir, NOMBRE_INDICE)
+
+
+def aperturas_del_reporte(df, fecha, reporte=None):
+    """Filas con fecha de apertura, listas para el índice (textos planos, sin categorías)"""
+    if COLUMNA_APERTURA not in df.columns:
+        return pd.DataFrame(columns=["fecha", "reporte", COL_CLAVE] + COLUMNAS_CALENDARIO)
+    con_fecha = df[df[COLUMNA_APERTURA].notna()]
+    filas = con_fecha.reindex(columns=COLUMNAS_CALENDARIO)
+    for col in filas.columns:
+        if isinstance(filas[col].dtype, pd.CategoricalDtype):
+            filas[col] = filas[col].astype("string")
+    filas[COLUMNA_APERTURA] = filas[COLUMNA_APERTURA].astype("datetime64[s]")
+    filas.insert(0, COL_CLAVE, calcular_claves(con_fecha).astype(str).to_numpy())
+    filas.insert(0, "reporte", reporte)
+    filas.insert(0, "fecha", fecha)
+    return filas.reset_index(drop=True)
+
+
+def fusionar_aperturas(tabla, nuevas):
+    """Reemplaza el reporte (si se reescribió) y las versiones viejas de cada proceso"""
+    if len(tabla) and len(nuevas):
+        tabla = tabla[tabla["reporte"] != nuevas["reporte"].iloc[0]]
+    partes = [t for t in (tabla, nuevas) if len(t)]
+    if not partes:
+        return nuevas
+    todo = pd.concat(partes, ignore_index=True)
+    todo = todo.sort_values("fecha", kind="stable").drop_duplicates(subset=COL_CLAVE, keep="last")
+    return todo.sort_values(COLUMNA_APERTURA, kind="stable").reset_index(drop=True)
+
+
+# ==========================================
+# ÍNDICE EN MEMORIA
+# ==========================================
+class CalendarioAperturas:
+    """
+    Uso:
+        calendario = cargar_calendario(data_dir)
+        calendario.proximas(dias=7, niveles=["Alto"])
+    """
+
+    def __init__(self, tabla=None):
+        self.tabla = tabla if tabla is not None else aperturas_del_reporte(pd.DataFrame(), None)
+        self.aperturas = self.tabla[COLUMNA_APERTURA].to_numpy(dtype="datetime64[s]")
+
+    def __len__(self):
+        return len(self.tabla)
+
+    def entre(self, desde=None, hasta=None, niveles=None, escenarios=None):
+        """Aperturas en [desde, hasta] (inclusive); dos búsquedas binarias y un corte"""
+        inicio = 0 if desde is None else np.searchsorted(self.aperturas, np.datetime64(pd.Timestamp(desde), "s"), "left")
+        fin = len(self.aperturas) if hasta is None else np.searchsorted(
+            self.aperturas, np.datetime64(pd.Timestamp(hasta), "s"), "right"
+        )
+        vista = self.tabla.iloc[inicio:fin]
+        if niveles:
+            vista = vista[vista[COLUMNA_NIVEL].isin(niveles)]
+        if escenarios:
+            vista = vista[vista["tipo_decision"].isin(escenarios)]
+        return vista
+
+    def proximas(self, dias=7, desde=None, niveles=None, escenarios=None):
+        """Aperturas desde ahora (o 'desde') hasta dentro de 'dias' días"""
+        desde = pd.Timestamp(desde) if desde is not None else pd.Timestamp.now().floor("s")
+        return self.entre(desde, desde + pd.Timedelta(days=dias), niveles, escenarios)
+
+
+def _desde_catalogo(data_dir):
+    """Índice rehecho desde el catálogo (vacío si no hay catálogo)"""
+    if cargar_catalogo(data_dir) is None:
+        return CalendarioAperturas()
+    print("🗓️ Calendario de aperturas ausente o desactualizado; se rehace desde el catálogo")
+    calendario = armar_desde_catalogo(data_dir)
+    try:
+        with bloqueo(data_dir, BLOQUEO_INDICE):
+            guardar_calendario(calendario, data_dir)
+    except OSError as e:  # Disco de solo lectura: se usa solo en memoria
+        print(f"⚠️ No se pudo guardar el calendario de aperturas: {e}")
+    return calendario
+
+
+def cargar_calendario(data_dir):
+    ruta = ruta_indice(data_dir)
+    if not os.path.exists(ruta):
+        return _desde_catalogo(data_dir)
+    try:
+        tabla = feather.read_table(ruta, memory_map=True)
+    except (OSError, pa.ArrowInvalid) as e:
+        print(f"⚠️ Calendario de aperturas ilegible ({ruta}): {e}")
+        return _desde_catalogo(data_dir)
+    meta = {k.decode(): v.decode() for k, v in (tabla.schema.metadata or {}).items()}
+    if meta.get("version_indice") != str(VERSION_INDICE):
+        return _desde_catalogo(data_dir)
+    return CalendarioAperturas(tabla.to_pandas())
+
+
+def guardar_calendario(calendario, data_dir):
+    tabla = pa.Table.from_pandas(calendario.tabla, preserve_index=False)
+    tabla = tabla.replace_schema_metadata({**(tabla.schema.metadata or {}), "version_indice": str(VERSION_INDICE)})
+    with archivo_atomico(ruta_indice(data_dir)) as temporal:
+        feather.write_feather(tabla, temporal, compression="uncompressed")
+
+
+def actualizar_calendario(df, fecha, data_dir, reporte=None):
+    """Punto de entrada del pipeline: fusiona las aperturas del reporte en el índice"""
+    nuevas = aperturas_del_reporte(df, fecha, reporte)
+    with bloqueo(data_dir, BLOQUEO_INDICE):
+        calendario = cargar_calendario(data_dir)
+        calendario = CalendarioAperturas(fusionar_aperturas(calendario.tabla, nuevas))
+        guardar_calendario(calendario, data_dir)
+    return calendario
+
+
+def armar_desde_catalogo(data_dir):
+    """Índice en memoria con los reportes del catálogo, en orden cronológico"""
+    tabla = CalendarioAperturas().tabla
+    for entrada in reversed(todos_los_reportes(data_dir) or []):
+        if not entrada.get("fecha"):
+            continue
+        df = leer_dia(os.path.join(data_dir, entrada["ruta"]), data_dir)
+        tabla = fusionar_aperturas(tabla, aperturas_del_reporte(df, entrada["fecha"], entrada["ruta"]))
+    return CalendarioAperturas(tabla)
+
+
+def reconstruir_calendario(data_dir):
+    """Rehace y guarda el índice desde el catálogo"""
+    calendario = armar_desde_catalogo(data_dir)
+    with bloqueo(data_dir, BLOQUEO_INDICE):
+        guardar_calendario(calendario, data_dir)
+    return calendario
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Próximas aperturas de ofertas de todo el archivo")
+    parser.add_argument("accion", nargs="?", choices=["consultar", "reconstruir"], default="consultar")
+    parser.add_argument("--dias", type=int, default=7)
+    parser.add_argument("--nivel", action="append", help="Alto, Medio o Bajo (se puede repetir)")
+    parser.add_argument("--data-dir", default="/app/data" if os.path.exists("/app/data") else "data")
+    args = parser.parse_args()
+
+    if args.accion == "reconstruir":
+        if cargar_catalogo(args.data_dir) is None:
+            print("❌ No hay catálogo; ejecutar antes: python catalogo.py")
+            raise SystemExit(1)
+        calendario = reconstruir_calendario(args.data_dir)
+        print(f"✅ Calendario rehecho: {len(calendario)} procesos con fecha de apertura.")
+    else:
+        proximas = cargar_calendario(args.data_dir).proximas(args.dias, niveles=args.nivel)
+        if proximas.empty:
+            print(f"No hay aperturas en los próximos {args.dias} días.")
+        else:
+            with pd.option_context("display.max_colwidth", 70, "display.width", 200):
+                print(proximas[[COLUMNA_APERTURA, "nro_proceso", "tipo_decision", COLUMNA_NIVEL, "detalle"]].to_string(index=False))
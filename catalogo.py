@@ -0,0 +1,292 @@
+import os
+import re
+import json
+from datetime import datetime
+from cache_columnar import calcular_sha256, leer_reporte
+from cubo import construir_cubo, conteo_por_nivel, cubo_a_registros, cubo_desde_registros, totales
+from escritura_atomica import archivo_atomico, bloqueo
+
+# ==========================================
+# CATÁLOGO (MANIFIESTO) DEL ARCHIVO data/
+# ==========================================
+# El robot mantiene data/catalogo.json con mes -> reportes y, por cada
+# reporte, filas, resumen de riesgo, versión de reglas/esquema y checksum.
+# Los lectores obtienen listados y métricas de cabecera sin abrir ningún
+# reporte. Cada escritura es atómica (archivo temporal + rename) y las
+# corridas concurrentes se turnan con un bloqueo (escritura_atomica.py).
+#
+# {
+#   "version_catalogo": 1,
+#   "actualizado": "2026-02-07T10:00:12",
+#   "meses": {
+#     "2026-02": {
+#       "reporte_fenomenos_20260207.xlsx": {"ruta": "2026-02/...", "filas": 12, ...}
+#     }
+#   }
+# }
+
+NOMBRE_CATALOGO = "catalogo.json"
+VERSION_CATALOGO = 1
+BLOQUEO_CATALOGO = "catalogo"
+
+PATRON_FECHA = re.compile(r"(?<!\d)(\d{4})(\d{2})(\d{2})(?!\d)")
+PATRON_MES = re.compile(r"^\d{4}-\d{2}$")
+NIVELES_RIESGO = ["Alto", "Medio", "Bajo"]
+
+
+def fecha_desde_nombre(nombre_archivo):
+    """reporte_fenomenos_20260130.xlsx -> '2026-01-30' (o None)"""
+    m = PATRON_FECHA.search(os.path.basename(nombre_archivo))
+    if not m:
+        return None
+    try:
+        return datetime(*map(int, m.groups())).strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def directorio_raiz(ruta_reporte):
+    """data/2026-02/reporte.xlsx -> data ; data/reporte.xlsx -> data"""
+    carpeta = os.path.dirname(os.path.abspath(ruta_reporte))
+    if PATRON_MES.match(os.path.basename(carpeta)):
+        return os.path.dirname(carpeta)
+    return carpeta
+
+
+def ruta_catalogo(data_dir):
+    return os.path.join(data_dir, NOMBRE_CATALOGO)
+
+
+def catalogo_vacio():
+    return {"version_catalogo": VERSION_CATALOGO, "actualizado": None, "meses": {}}
+
+
+def cargar_catalogo(data_dir):
+    """Retorna el catálogo o None si todavía no fue generado"""
+    ruta = ruta_catalogo(data_dir)
+    if not os.path.exists(ruta):
+        return None
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Catálogo ilegible ({ruta}): {e}")
+        return None
+
+
+def escribir_json_atomico(ruta, datos):
+    """Escribe en un temporal del mismo directorio, fsync y rename"""
+    with archivo_atomico(ruta) as temporal:
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+
+def guardar_catalogo(catalogo, data_dir):
+    catalogo["actualizado"] = datetime.now().isoformat(timespec="seconds")
+    escribir_json_atomico(ruta_catalogo(data_dir), catalogo)
+
+
+# ==========================================
+# RESUMEN DE UN REPORTE
+# ==========================================
+def resumir_reporte(df):
+    """Métricas de cabecera y cubo de agregados, calculados en una sola pasada"""
+    cubo = construir_cubo(df)
+    total = totales(cubo)
+    resumen = {
+        "filas": total["normas"],
+        "detectados": total["detectados"],
+        "riesgo": conteo_por_nivel(cubo, NIVELES_RIESGO),
+        "cubo": cubo_a_registros(cubo),
+    }
+    if total["normas"]:
+        resumen["intensidad_max"] = total["intensidad_max"]
+        resumen["intensidad_promedio"] = round(total["intensidad_promedio"], 3)
+    return resumen
+
+
+def entrada_del_reporte(ruta_reporte, data_dir):
+    """Entrada del catálogo para ese reporte (None si no está o quedó vieja)"""
+    nombre = os.path.basename(ruta_reporte)
+    fecha = fecha_desde_nombre(nombre)
+    catalogo = cargar_catalogo(data_dir)
+    if catalogo is None or fecha is None:
+        return None
+    entrada = catalogo["meses"].get(fecha[:7], {}).get(nombre)
+    if not entrada:
+        return None
+    # Si el xlsx fue reescrito después de registrarse, la entrada ya no sirve
+    if os.path.exists(ruta_reporte) and os.path.getsize(ruta_reporte) != entrada.get("tamano"):
+        return None
+    return entrada
+
+
+def cubo_del_reporte(ruta_reporte, data_dir):
+    """Cubo persistido en el catálogo para ese reporte (None si no está)"""
+    entrada = entrada_del_reporte(ruta_reporte, data_dir)
+    return cubo_desde_registros(entrada.get("cubo")) if entrada else None
+
+
+def armar_entrada(
+    ruta_reporte, df, data_dir, version_reglas=None, version_esquema=None, anomalias=None, id_corrida=None
+):
+    stat = os.stat(ruta_reporte)
+    entrada = {
+        "ruta": os.path.relpath(os.path.abspath(ruta_reporte), os.path.abspath(data_dir)),
+        "fecha": fecha_desde_nombre(ruta_reporte),
+        "tamano": stat.st_size,
+        "sha256": calcular_sha256(ruta_reporte),
+        "version_reglas": version_reglas,
+        "version_esquema": version_esquema,
+        "registrado": datetime.now().isoformat(timespec="seconds"),
+        "corrida": id_corrida,
+    }
+    entrada.update(resumir_reporte(df))
+    if anomalias is not None:
+        entrada["anomalias"] = anomalias
+    return entrada
+
+
+def _agregar_entrada(catalogo, entrada):
+    nombre = os.path.basename(entrada["ruta"])
+    mes = entrada["fecha"][:7] if entrada["fecha"] else "sin-fecha"
+    # Un mismo reporte puede haber cambiado de carpeta (migración)
+    for reportes in catalogo["meses"].values():
+        reportes.pop(nombre, None)
+    catalogo["meses"].setdefault(mes, {})[nombre] = entrada
+    catalogo["meses"] = {m: r for m, r in catalogo["meses"].items() if r}
+
+
+# ==========================================
+# ESCRITURA
+# ==========================================
+def registrar_reporte(
+    ruta_reporte, df=None, data_dir=None, version_reglas=None, version_esquema=None, anomalias=None, id_corrida=None
+):
+    """
+    Agrega o actualiza la entrada de un reporte. Si el catálogo no existe,
+    primero se reconstruye desde disco para no ocultar meses anteriores.
+    """
+    data_dir = data_dir or directorio_raiz(ruta_reporte)
+    if df is None:
+        df = leer_reporte(ruta_reporte)
+
+    entrada = armar_entrada(ruta_reporte, df, data_dir, version_reglas, version_esquema, anomalias, id_corrida)
+    # Leer-modificar-escribir del catálogo de a una corrida por vez
+    with bloqueo(data_dir, BLOQUEO_CATALOGO):
+        catalogo = cargar_catalogo(data_dir)
+        if catalogo is None:
+            catalogo = escanear_archivo(data_dir)
+        _agregar_entrada(catalogo, entrada)
+        guardar_catalogo(catalogo, data_dir)
+    return entrada
+
+
+def registrar_entradas(entradas, data_dir):
+    """Registra varias entradas ya armadas con una sola escritura del catálogo"""
+    with bloqueo(data_dir, BLOQUEO_CATALOGO):
+        catalogo = cargar_catalogo(data_dir)
+        if catalogo is None:
+            catalogo = escanear_archivo(data_dir)
+        for entrada in entradas:
+            _agregar_entrada(catalogo, entrada)
+        guardar_catalogo(catalogo, data_dir)
+    return catalogo
+
+
+def listar_reportes_en_disco(data_dir):
+    """Reportes .xlsx en la raíz de data/ y en las carpetas YYYY-MM"""
+    organizados, sueltos = [], []
+    if not os.path.exists(data_dir):
+        return organizados
+    for item in sorted(os.listdir(data_dir)):
+        item_path = os.path.join(data_dir, item)
+        if os.path.isdir(item_path) and PATRON_MES.match(item):
+            organizados += [
+                os.path.join(item_path, f)
+                for f in sorted(os.listdir(item_path))
+                if f.endswith(".xlsx")
+            ]
+        elif item.endswith(".xlsx") and os.path.isfile(item_path):
+            sueltos.append(item_path)
+
+    # Si un reporte suelto ya fue copiado a su carpeta mensual, manda la copia
+    nombres = {os.path.basename(r) for r in organizados}
+    return organizados + [r for r in sueltos if os.path.basename(r) not in nombres]
+
+
+def escanear_archivo(data_dir):
+    """Arma un catálogo nuevo abriendo cada reporte una única vez"""
+    catalogo = catalogo_vacio()
+    for ruta in listar_reportes_en_disco(data_dir):
+        try:
+            df = leer_reporte(ruta)
+        except Exception as e:
+            print(f"⚠️ Saltando {ruta}: {e}")
+            continue
+        _agregar_entrada(catalogo, armar_entrada(ruta, df, data_dir))
+    return catalogo
+
+
+def reconstruir_catalogo(data_dir):
+    with bloqueo(data_dir, BLOQUEO_CATALOGO):
+        anterior = cargar_catalogo(data_dir) or catalogo_vacio()
+        catalogo = escanear_archivo(data_dir)
+        # Lo que no se deduce del xlsx (anomalías del día) se conserva si el archivo es el mismo
+        for mes, reportes in catalogo["meses"].items():
+            for nombre, entrada in reportes.items():
+                previa = anterior["meses"].get(mes, {}).get(nombre, {})
+                if previa.get("sha256") == entrada["sha256"] and "anomalias" in previa:
+                    entrada["anomalias"] = previa["anomalias"]
+        guardar_catalogo(catalogo, data_dir)
+    return catalogo
+
+
+# ==========================================
+# LECTURA (sin abrir reportes)
+# ==========================================
+def meses_disponibles(data_dir):
+    """Meses del catálogo, más reciente primero (None si no hay catálogo)"""
+    catalogo = cargar_catalogo(data_dir)
+    if catalogo is None:
+        return None
+    return sorted((m for m in catalogo["meses"] if PATRON_MES.match(m)), reverse=True)
+
+
+def reportes_del_mes(mes, data_dir):
+    """Entradas del mes ordenadas por nombre, más reciente primero"""
+    catalogo = cargar_catalogo(data_dir)
+    if catalogo is None:
+        return None
+    reportes = catalogo["meses"].get(mes, {})
+    return [reportes[n] for n in sorted(reportes, reverse=True)]
+
+
+def todos_los_reportes(data_dir):
+    """Todas las entradas del catálogo, más reciente primero"""
+    catalogo = cargar_catalogo(data_dir)
+    if catalogo is None:
+        return None
+    entradas = [e for reportes in catalogo["meses"].values() for e in reportes.values()]
+    return sorted(entradas, key=lambda e: os.path.basename(e["ruta"]), reverse=True)
+
+
+def resumen_del_mes(mes, data_dir):
+    """Totales del mes calculados sobre las entradas del catálogo"""
+    entradas = reportes_del_mes(mes, data_dir) or []
+    total = {"reportes": len(entradas), "filas": 0, "detectados": 0}
+    total["riesgo"] = {n: 0 for n in NIVELES_RIESGO}
+    for e in entradas:
+        total["filas"] += e.get("filas", 0)
+        total["detectados"] += e.get("detectados", 0)
+        for nivel, cantidad in e.get("riesgo", {}).items():
+            total["riesgo"][nivel] = total["riesgo"].get(nivel, 0) + cantidad
+    return total
+
+
+if __name__ == "__main__":
+    data_dir = "/app/data" if os.path.exists("/app/data") else "data"
+    print(f"🗂️ Reconstruyendo catálogo de {data_dir}...")
+    catalogo = reconstruir_catalogo(data_dir)
+    total = sum(len(r) for r in catalogo["meses"].values())
+    print(f"✅ Catálogo actualizado: {len(catalogo['meses'])} meses, {total} reportes.")
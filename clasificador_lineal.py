@@ -0,0 +1,325 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from catalogo import todos_los_reportes
+from escritura_atomica import archivo_atomico, bloqueo
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # Sin pyarrow se tokeniza con str.split de pandas (más lento)
+    pc = None
+
+# ==========================================
+# SEGUNDA ETAPA: CLASIFICADOR LINEAL SOBRE EL HISTÓRICO
+# ==========================================
+# La matriz solo reconoce sus palabras clave: "ampliación de la ruta
+# nacional 40" no dice "obra publica" y queda como "No identificado". Esta
+# etapa opcional (MODELO_LINEAL=1) aprende del archivo ya etiquetado por la
+# matriz qué otras palabras acompañan a cada escenario:
+#
+#   texto -> tokens y bigramas -> hashing (2**18 columnas, signo por hash)
+#         -> matriz dispersa CSR normalizada (L2)
+#         -> regresión logística multiclase entrenada por SGD (AdaGrad)
+#
+# El modelo se actualiza de forma incremental: cada reporte del catálogo se
+# usa una sola vez (se recuerda su sha256) y los pesos quedan en
+# data/modelo_lineal.npz. La predicción es un producto disperso x denso
+# por lote y no cambia tipo_decision: agrega 'tipo_decision_modelo' y
+# 'confianza_modelo' al lado, para revisar lo que la matriz no cubre.
+#
+# Sin dependencias nuevas: numpy + scipy.sparse (ya usado por el grafo).
+# scipy se importa recién al vectorizar: con MODELO_LINEAL apagado, importar
+# este módulo (analisis.py, diario.py) no lo carga.
+
+DATA_DIR = "/app/data" if os.path.exists("/app") else "data"
+NOMBRE_MODELO = "modelo_lineal.npz"
+BLOQUEO_MODELO = "modelo_lineal"
+VERSION_MODELO = 1
+
+HABILITADO = os.environ.get("MODELO_LINEAL", "0") == "1"
+BITS_HASH = 18
+TASA_APRENDIZAJE = 0.5
+REGULARIZACION = 1e-6
+EPOCAS = 3
+TAMANO_LOTE = 1024
+# Sugerencias por debajo de esta confianza no cuentan como cobertura nueva
+UMBRAL_CONFIANZA = 0.6
+LONGITUD_MINIMA_TOKEN = 2
+NO_IDENTIFICADO = "No identificado"
+
+COLUMNA_PREDICCION = "tipo_decision_modelo"
+COLUMNA_CONFIANZA = "confianza_modelo"
+
+_PRIMO_BIGRAMA = np.uint64(0x9E3779B97F4A7C15)
+
+
+def ruta_modelo(data_dir):
+    return os.path.join(data_dir, NOMBRE_MODELO)
+
+
+# ==========================================
+# 1. VECTORIZACIÓN POR HASHING
+# ==========================================
+def _tokens(textos):
+    """
+    Tokens del lote separados por espacios: (fila de cada token, código del
+    token, tokens distintos). Lo costoso (tildes, puntuación) se hace después
+    sobre los tokens distintos, que son muchos menos que las apariciones.
+    """
+    if pc is None:
+        tokens = textos.reset_index(drop=True).astype("string").fillna("").str.lower().str.split().explode().dropna()
+        codigos, distintos = pd.factorize(tokens)
+        return tokens.index.to_numpy(), codigos, pd.Series(distintos, dtype="string")
+
+    arreglo = pa.array(textos.astype("string").fillna(""))
+    if isinstance(arreglo, pa.ChunkedArray):
+        arreglo = arreglo.combine_chunks()
+    listas = pc.utf8_split_whitespace(pc.utf8_lower(arreglo))
+    codificado = pc.dictionary_encode(pc.list_flatten(listas))
+    return (
+        pc.list_parent_indices(listas).to_numpy(),
+        codificado.indices.to_numpy(zero_copy_only=False),
+        codificado.dictionary,
+    )
+
+
+def _normalizar_tokens(distintos):
+    """Sin tildes ni signos: 'pública,' -> 'publica'"""
+    if pc is None:
+        return (
+            distintos.str.normalize("NFD")
+            .str.replace(r"[^a-z0-9]+", "", regex=True)
+            .to_numpy(dtype=object)
+        )
+    limpio = pc.replace_substring_regex(pc.utf8_normalize(distintos, "NFD"), r"[^a-z0-9]+", "")
+    return limpio.to_numpy(zero_copy_only=False)
+
+
+def vectorizar(textos, bits=BITS_HASH):
+    """CSR (filas x 2**bits) con unigramas y bigramas, filas normalizadas (L2)"""
+    from scipy import sparse
+
+    n = len(textos)
+    filas, codigos, distintos = _tokens(textos)
+    normalizados = _normalizar_tokens(distintos)
+    # Un hash de 64 bits por token distinto; los muy cortos se descartan
+    largo_ok = pd.Series(normalizados, dtype="object").str.len().to_numpy() >= LONGITUD_MINIMA_TOKEN
+    validos = largo_ok[codigos]
+    filas = filas[validos]
+    if len(filas) == 0:
+        return sparse.csr_matrix((n, 1 << bits), dtype=np.float32)
+    h = pd.util.hash_array(normalizados)[codigos[validos]]
+
+    # Bigramas: tokens consecutivos de la misma fila
+    misma_fila = filas[1:] == filas[:-1]
+    h_bigramas = (h[:-1][misma_fila] * _PRIMO_BIGRAMA) ^ h[1:][misma_fila]
+    todos = np.concatenate([h, h_bigramas])
+    filas_todas = np.concatenate([filas, filas[:-1][misma_fila]])
+
+    columnas = (todos & np.uint64((1 << bits) - 1)).astype(np.int64)
+    signos = np.where(todos >> np.uint64(63), -1.0, 1.0).astype(np.float32)
+    matriz = sparse.csr_matrix((signos, (filas_todas, columnas)), shape=(n, 1 << bits), dtype=np.float32)
+    # Normalización L2 por fila directamente sobre los datos del CSR
+    por_fila = np.diff(matriz.indptr)
+    normas = np.sqrt(np.bincount(np.repeat(np.arange(n), por_fila), weights=matriz.data**2, minlength=n))
+    normas[normas == 0] = 1.0
+    matriz.data /= np.repeat(normas, por_fila).astype(np.float32)
+    return matriz
+
+
+# ==========================================
+# 2. REGRESIÓN LOGÍSTICA MULTICLASE (SGD)
+# ==========================================
+def _softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+class ClasificadorLineal:
+    """
+    Uso:
+        modelo = ClasificadorLineal(clases)
+        modelo.entrenar(vectorizar(textos), etiquetas)
+        prediccion, confianza = modelo.predecir(vectorizar(nuevos))
+    """
+
+    def __init__(self, clases, bits=BITS_HASH, tasa=TASA_APRENDIZAJE, regularizacion=REGULARIZACION):
+        self.clases = list(clases)
+        self.bits = bits
+        self.tasa = tasa
+        self.regularizacion = regularizacion
+        self.pesos = np.zeros((1 << bits, len(self.clases)), dtype=np.float32)
+        self.sesgo = np.zeros(len(self.clases), dtype=np.float32)
+        # AdaGrad: acumulado de gradientes al cuadrado por peso
+        self._acumulado = np.full_like(self.pesos, 1e-8)
+        self._acumulado_sesgo = np.full_like(self.sesgo, 1e-8)
+        self.ejemplos = 0
+        self.reportes = {}
+
+    def probabilidades(self, X):
+        return _softmax(np.asarray(X @ self.pesos) + self.sesgo)
+
+    def predecir(self, X):
+        """(clase, confianza) por fila"""
+        if X.shape[0] == 0:
+            return np.array([], dtype=object), np.array([], dtype=np.float32)
+        p = self.probabilidades(X)
+        mejor = p.argmax(axis=1)
+        return np.asarray(self.clases, dtype=object)[mejor], p[np.arange(len(mejor)), mejor].astype(np.float32)
+
+    def entrenar(self, X, etiquetas, epocas=EPOCAS, lote=TAMANO_LOTE, semilla=0):
+        """Pasadas de SGD sobre (X, etiquetas); las etiquetas fuera de self.clases se ignoran"""
+        indice_clase = {c: i for i, c in enumerate(self.clases)}
+        y = pd.Series(etiquetas, dtype="object").map(indice_clase).to_numpy()
+        conocidas = ~pd.isna(y)
+        X, y = X[conocidas], y[conocidas].astype(np.int64)
+        if len(y) == 0:
+            return 0
+        objetivo = np.eye(len(self.clases), dtype=np.float32)
+        azar = np.random.default_rng(semilla)
+        for _ in range(epocas):
+            orden = azar.permutation(len(y))
+            for inicio in range(0, len(y), lote):
+                filas = orden[inicio : inicio + lote]
+                Xb = X[filas]
+                error = (self.probabilidades(Xb) - objetivo[y[filas]]) / len(filas)
+                # Solo se tocan las columnas (features) presentes en el lote
+                usadas = np.unique(Xb.indices)
+                gradiente = np.asarray(Xb[:, usadas].T @ error) + self.regularizacion * self.pesos[usadas]
+                self._acumulado[usadas] += gradiente**2
+                self.pesos[usadas] -= self.tasa * gradiente / np.sqrt(self._acumulado[usadas])
+                gradiente_sesgo = error.sum(axis=0)
+                self._acumulado_sesgo += gradiente_sesgo**2
+                self.sesgo -= self.tasa * gradiente_sesgo / np.sqrt(self._acumulado_sesgo)
+        self.ejemplos += len(y)
+        return len(y)
+
+    # ---------- persistencia ----------
+    def guardar(self, ruta):
+        meta = {
+            "version": VERSION_MODELO,
+            "clases": self.clases,
+            "bits": self.bits,
+            "ejemplos": self.ejemplos,
+            "reportes": self.reportes,
+        }
+        # Solo las filas con algún peso: el resto de la tabla de hashing está vacía
+        usadas = np.flatnonzero(self.pesos.any(axis=1))
+        with archivo_atomico(ruta) as temporal:
+            with open(temporal, "wb") as f:
+                np.savez_compressed(
+                    f,
+                    meta=np.array(json.dumps(meta, ensure_ascii=False)),
+                    usadas=usadas,
+                    pesos=self.pesos[usadas],
+                    acumulado=self._acumulado[usadas],
+                    sesgo=self.sesgo,
+                    acumulado_sesgo=self._acumulado_sesgo,
+                )
+
+    @classmethod
+    def cargar(cls, ruta):
+        """Modelo guardado o None si no existe / es de otra versión"""
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with np.load(ruta) as datos:
+                meta = json.loads(str(datos["meta"]))
+                if meta.get("version") != VERSION_MODELO:
+                    return None
+                modelo = cls(meta["clases"], bits=meta["bits"])
+                usadas = datos["usadas"]
+                modelo.pesos[usadas] = datos["pesos"]
+                modelo._acumulado[usadas] = datos["acumulado"]
+                modelo.sesgo[:] = datos["sesgo"]
+                modelo._acumulado_sesgo[:] = datos["acumulado_sesgo"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Modelo lineal ilegible ({ruta}): {e}")
+            return None
+        modelo.ejemplos = meta["ejemplos"]
+        modelo.reportes = meta["reportes"]
+        return modelo
+
+
+# ==========================================
+# 3. ENTRENAMIENTO INCREMENTAL SOBRE data/
+# ==========================================
+def clases_de_la_matriz():
+    from analisis import MATRIZ_TEORICA
+
+    return [NO_IDENTIFICADO] + list(MATRIZ_TEORICA)
+
+
+def actualizar_modelo(data_dir=None, leer=None):
+    """
+    Entrena con los reportes del catálogo que el modelo todavía no vio (en
+    orden cronológico) y lo guarda. Retorna la cantidad de filas usadas.
+    """
+    from deltas import leer_dia
+
+    data_dir = data_dir or DATA_DIR
+    leer = leer or (lambda ruta: leer_dia(ruta, data_dir))
+    with bloqueo(data_dir, BLOQUEO_MODELO):
+        clases = clases_de_la_matriz()
+        modelo = ClasificadorLineal.cargar(ruta_modelo(data_dir))
+        if modelo is None or modelo.clases != clases:
+            # Escenarios nuevos en la matriz: se reentrena desde cero
+            modelo = ClasificadorLineal(clases)
+
+        filas = 0
+        for entrada in reversed(todos_los_reportes(data_dir) or []):
+            if modelo.reportes.get(entrada["ruta"]) == entrada.get("sha256"):
+                continue
+            try:
+                df = leer(os.path.join(data_dir, entrada["ruta"]))
+            except Exception as e:
+                print(f"⚠️ {entrada['ruta']}: {e}")
+                continue
+            if len(df) and "detalle" in df.columns and "tipo_decision" in df.columns:
+                filas += modelo.entrenar(vectorizar(df["detalle"]), df["tipo_decision"].astype("object"))
+            modelo.reportes[entrada["ruta"]] = entrada.get("sha256")
+
+        if filas or not os.path.exists(ruta_modelo(data_dir)):
+            modelo.guardar(ruta_modelo(data_dir))
+    print(f"🤖 Modelo lineal: {filas} filas nuevas ({modelo.ejemplos} en total, {len(modelo.reportes)} reportes)")
+    return filas
+
+
+# ==========================================
+# 4. PREDICCIÓN POR LOTE
+# ==========================================
+def agregar_prediccion(df, data_dir=None, modelo=None, columna="detalle"):
+    """
+    Agrega tipo_decision_modelo y confianza_modelo (sin tocar tipo_decision).
+    Usa solo el detalle, igual que el entrenamiento: el texto de los anexos
+    no se guarda en el histórico.
+    """
+    modelo = modelo or ClasificadorLineal.cargar(ruta_modelo(data_dir or DATA_DIR))
+    if modelo is None or df.empty or columna not in df.columns:
+        return df
+    prediccion, confianza = modelo.predecir(vectorizar(df[columna]))
+    df = df.copy()
+    df[COLUMNA_PREDICCION] = pd.Categorical(prediccion, categories=modelo.clases)
+    df[COLUMNA_CONFIANZA] = confianza
+
+    if "tipo_decision" in df.columns:
+        nuevas = (
+            (df["tipo_decision"].astype("object") == NO_IDENTIFICADO)
+            & (df[COLUMNA_PREDICCION].astype("object") != NO_IDENTIFICADO)
+            & (df[COLUMNA_CONFIANZA] >= UMBRAL_CONFIANZA)
+        )
+        print(f"🤖 Modelo lineal: {int(nuevas.sum())} decisiones no identificadas por la matriz con escenario sugerido")
+    return df
+
+
+if __name__ == "__main__":
+    import sys
+
+    data_dir = "/app/data" if os.path.exists("/app/data") else "data"
+    if sys.argv[1:2] != ["entrenar"]:
+        print("Uso: python clasificador_lineal.py entrenar")
+        sys.exit(1)
+    actualizar_modelo(data_dir)
@@ -0,0 +1,223 @@
+import os
+import time
+import random
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ==========================================
+# CLIENTE HTTP COMPARTIDO PARA TODAS LAS FUENTES
+# ==========================================
+# Un único cliente por proceso con, para cada host:
+#   - Session con pool de conexiones keep-alive
+#   - Reintentos con backoff exponencial y jitter (respeta Retry-After)
+#   - Concurrencia adaptativa AIMD según latencia y errores observados
+#   - Disyuntor (circuit breaker) que deja de golpear un portal degradado
+
+USER_AGENT = os.environ.get(
+    "MONITOR_USER_AGENT",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+)
+
+# Respuestas que indican saturación o falla transitoria del portal
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+
+class CircuitoAbierto(Exception):
+    """El host acumuló demasiadas fallas y está en período de enfriamiento"""
+
+
+class LimitadorAIMD:
+    """
+    Límite de requests simultáneos por host. Crece de a uno por "ventana"
+    mientras las respuestas son rápidas y correctas (aumento aditivo) y se
+    reduce a la mitad ante errores o latencia alta (disminución multiplicativa).
+    """
+
+    def __init__(self, inicial=4, minimo=1, maximo=16, latencia_objetivo=5.0):
+        self.limite = float(inicial)
+        self.minimo = minimo
+        self.maximo = maximo
+        self.latencia_objetivo = latencia_objetivo
+        self.en_vuelo = 0
+        self._cond = threading.Condition()
+
+    def adquirir(self):
+        with self._cond:
+            while self.en_vuelo >= int(self.limite):
+                self._cond.wait()
+            self.en_vuelo += 1
+
+    def liberar(self, latencia, exito):
+        with self._cond:
+            self.en_vuelo -= 1
+            if not exito or latencia > self.latencia_objetivo:
+                self.limite = max(self.minimo, self.limite / 2)
+            else:
+                self.limite = min(self.maximo, self.limite + 1 / self.limite)
+            self._cond.notify_all()
+
+
+class Disyuntor:
+    """
+    cerrado -> (umbral_fallas fallas seguidas) -> abierto
+    abierto -> (pasado tiempo_reapertura) -> semiabierto: deja pasar una prueba
+    semiabierto -> éxito: cerrado / falla: abierto otra vez
+    """
+
+    def __init__(self, umbral_fallas=5, tiempo_reapertura=60.0):
+        self.umbral_fallas = umbral_fallas
+        self.tiempo_reapertura = tiempo_reapertura
+        self.estado = "cerrado"
+        self.fallas = 0
+        self.abierto_desde = 0.0
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        with self._lock:
+            if self.estado == "semiabierto":
+                return False  # Ya hay una prueba en curso
+            if self.estado == "abierto":
+                if time.monotonic() - self.abierto_desde < self.tiempo_reapertura:
+                    return False
+                self.estado = "semiabierto"
+            return True
+
+    def registrar_exito(self):
+        with self._lock:
+            self.estado = "cerrado"
+            self.fallas = 0
+
+    def registrar_falla(self):
+        with self._lock:
+            self.fallas += 1
+            if self.estado == "semiabierto" or self.fallas >= self.umbral_fallas:
+                self.estado = "abierto"
+                self.abierto_desde = time.monotonic()
+
+
+class _EstadoHost:
+    def __init__(self, cliente):
+        self.session = requests.Session()
+        adaptador = HTTPAdapter(
+            pool_connections=1, pool_maxsize=cliente.concurrencia_maxima
+        )
+        self.session.mount("http://", adaptador)
+        self.session.mount("https://", adaptador)
+        self.session.headers["User-Agent"] = cliente.user_agent
+        self.limitador = LimitadorAIMD(
+            inicial=cliente.concurrencia_inicial,
+            maximo=cliente.concurrencia_maxima,
+            latencia_objetivo=cliente.latencia_objetivo,
+        )
+        self.disyuntor = Disyuntor(cliente.umbral_fallas, cliente.tiempo_reapertura)
+
+
+class ClienteHTTP:
+    def __init__(
+        self,
+        user_agent=USER_AGENT,
+        timeout=30,
+        reintentos=3,
+        backoff_base=1.0,
+        backoff_max=30.0,
+        concurrencia_inicial=4,
+        concurrencia_maxima=16,
+        latencia_objetivo=5.0,
+        umbral_fallas=5,
+        tiempo_reapertura=60.0,
+    ):
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.concurrencia_inicial = concurrencia_inicial
+        self.concurrencia_maxima = concurrencia_maxima
+        self.latencia_objetivo = latencia_objetivo
+        self.umbral_fallas = umbral_fallas
+        self.tiempo_reapertura = tiempo_reapertura
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def estado_host(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = _EstadoHost(self)
+            return self._hosts[host]
+
+    def _espera(self, intento, respuesta=None):
+        """Backoff exponencial con full jitter; Retry-After tiene prioridad"""
+        if respuesta is not None:
+            retry_after = respuesta.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(self.backoff_max, float(retry_after))
+        tope = min(self.backoff_max, self.backoff_base * (2**intento))
+        return random.uniform(0, tope)
+
+    def request(self, metodo, url, **kwargs):
+        """
+        Respuesta del primer intento exitoso. Agotados los reintentos, relanza
+        el último error de red o HTTPError si el portal siguió respondiendo
+        429/5xx (nunca devuelve en silencio una respuesta reintentable).
+        """
+        estado = self.estado_host(url)
+        kwargs.setdefault("timeout", self.timeout)
+        ultimo_error = None
+        respuesta = None
+
+        for intento in range(self.reintentos + 1):
+            if not estado.disyuntor.permitir():
+                raise CircuitoAbierto(f"Circuito abierto para {urlsplit(url).netloc}")
+
+            estado.limitador.adquirir()
+            inicio = time.monotonic()
+            exito = False
+            try:
+                respuesta = estado.session.request(metodo, url, **kwargs)
+                exito = respuesta.status_code not in ESTADOS_REINTENTABLES
+                ultimo_error = None
+            except requests.RequestException as e:
+                respuesta, ultimo_error = None, e
+            except BaseException:
+                # Cualquier otra excepción (urllib3, Ctrl+C, un hook) también cuenta
+                # como falla: si no, un semiabierto quedaría bloqueado para siempre
+                estado.disyuntor.registrar_falla()
+                raise
+            finally:
+                estado.limitador.liberar(time.monotonic() - inicio, exito)
+
+            if exito:
+                estado.disyuntor.registrar_exito()
+                return respuesta
+
+            estado.disyuntor.registrar_falla()
+            if intento < self.reintentos:
+                time.sleep(self._espera(intento, respuesta))
+
+        if ultimo_error is not None:
+            raise ultimo_error
+        respuesta.raise_for_status()
+        return respuesta
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+_cliente_compartido = None
+_lock_cliente = threading.Lock()
+
+
+def obtener_cliente():
+    """Cliente único por proceso, compartido por todas las fuentes"""
+    global _cliente_compartido
+    with _lock_cliente:
+        if _cliente_compartido is None:
+            _cliente_compartido = ClienteHTTP()
+        return _cliente_compartido
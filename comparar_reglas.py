@@ -0,0 +1,210 @@
+import os
+import copy
+import json
+import argparse
+import numpy as np
+import pandas as pd
+from analisis import MATRIZ_TEORICA, aviso_sin_anexos, calcular_version_reglas, puntuar_versiones, texto_para_clasificar
+from catalogo import todos_los_reportes
+from escritura_atomica import archivo_atomico
+from rasgos_numericos import PARAMETROS_PONDERACION
+
+# ==========================================
+# COMPARACIÓN A/B DE VERSIONES DE LA MATRIZ
+# ==========================================
+# Para discutir un cambio en MATRIZ_TEORICA (otro peso para "Jubilaciones /
+# Pensiones", una categoría nueva) hay que ver lado a lado qué cambia. En
+# lugar de correr analizar_boletin una vez por versión, todas las versiones
+# se evalúan juntas con puntuar_versiones(): el texto se normaliza y se
+# recorre una sola vez, y cada versión solo combina las máscaras de sus
+# keywords. Comparar N versiones cuesta casi lo mismo que una corrida.
+#
+#   python comparar_reglas.py propuesta.json
+#   python comparar_reglas.py --peso "Jubilaciones / Pensiones=8" --desde 2026-01-01
+#   python comparar_reglas.py propuesta.json otra.json --salida comparacion.xlsx
+#
+# Cada archivo .json tiene el mismo formato que MATRIZ_TEORICA. La versión
+# vigente siempre entra como base de la comparación.
+
+DATA_DIR = "/app/data" if os.path.exists("/app") else "data"
+BASE = "vigente"
+NO_IDENTIFICADO = "No identificado"
+NIVELES = ["Alto", "Medio", "Bajo"]
+MAX_TRANSICIONES = 15
+
+
+def validar_matriz(matriz, origen="matriz"):
+    """Misma forma que MATRIZ_TEORICA: {categoría: {keywords, transferencia, peso}}"""
+    if not isinstance(matriz, dict) or not matriz:
+        raise ValueError(f"{origen}: se esperaba un objeto con al menos una categoría")
+    for categoria, info in matriz.items():
+        faltan = {"keywords", "transferencia", "peso"} - set(info)
+        if faltan:
+            raise ValueError(f"{origen}: a '{categoria}' le falta {', '.join(sorted(faltan))}")
+        if not isinstance(info["keywords"], list) or not all(isinstance(k, str) and k for k in info["keywords"]):
+            raise ValueError(f"{origen}: las keywords de '{categoria}' deben ser una lista de textos")
+        if not 0 <= float(info["peso"]) <= 10:
+            raise ValueError(f"{origen}: el peso de '{categoria}' debe estar entre 0 y 10")
+    return matriz
+
+
+def cargar_matriz(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return validar_matriz(json.load(f), ruta)
+
+
+def con_pesos(matriz, pesos):
+    """Variante de la matriz con otros pesos: {categoría: peso}"""
+    variante = copy.deepcopy(matriz)
+    for categoria, peso in pesos.items():
+        if categoria not in variante:
+            raise ValueError(f"Categoría desconocida: {categoria!r}")
+        variante[categoria]["peso"] = float(peso)
+    return validar_matriz(variante)
+
+
+def nivel_riesgo(indice):
+    """Mismos umbrales que clasificar_decisiones"""
+    return np.select([indice >= 8, indice >= 5], ["Alto", "Medio"], default="Bajo")
+
+
+# ==========================================
+# COMPARACIÓN
+# ==========================================
+def clasificar_versiones(detalles, matrices):
+    """
+    Una columna de escenario, índice y nivel por versión, en una sola pasada.
+    matrices: {nombre: matriz}; la primera es la base de las diferencias.
+    """
+    resultados = puntuar_versiones(detalles, matrices)
+    columnas = {"detalle": detalles}
+    for nombre, resultado in resultados.items():
+        indice = resultado["indice_fenomeno_corruptivo"].to_numpy(dtype="float64")
+        columnas[f"tipo_decision[{nombre}]"] = resultado["tipo_decision"]
+        columnas[f"indice[{nombre}]"] = indice
+        columnas[f"nivel[{nombre}]"] = nivel_riesgo(indice)
+    return pd.DataFrame(columnas, index=detalles.index)
+
+
+def resumir_diferencias(clasificaciones, matrices):
+    """Diferencias de cada versión contra la primera (la base)"""
+    nombres = list(matrices)
+    base = nombres[0]
+    antes = clasificaciones[f"tipo_decision[{base}]"]
+    niveles_base = clasificaciones[f"nivel[{base}]"].value_counts()
+    resumen = {
+        "filas": len(clasificaciones),
+        "base": base,
+        "versiones": {n: calcular_version_reglas(m, PARAMETROS_PONDERACION) for n, m in matrices.items()},
+        "niveles": {base: {n: int(niveles_base.get(n, 0)) for n in NIVELES}},
+        "diferencias": {},
+    }
+    for nombre in nombres[1:]:
+        despues = clasificaciones[f"tipo_decision[{nombre}]"]
+        cambia_escenario = antes != despues
+        delta_indice = clasificaciones[f"indice[{nombre}]"] - clasificaciones[f"indice[{base}]"]
+        cambia_nivel = clasificaciones[f"nivel[{nombre}]"] != clasificaciones[f"nivel[{base}]"]
+        niveles = clasificaciones[f"nivel[{nombre}]"].value_counts()
+        transiciones = (
+            pd.DataFrame({"antes": antes[cambia_escenario], "despues": despues[cambia_escenario]})
+            .value_counts()
+            .head(MAX_TRANSICIONES)
+        )
+        resumen["niveles"][nombre] = {n: int(niveles.get(n, 0)) for n in NIVELES}
+        resumen["diferencias"][nombre] = {
+            "cambian_escenario": int(cambia_escenario.sum()),
+            "nuevas": int((cambia_escenario & (antes == NO_IDENTIFICADO)).sum()),
+            "sin_clasificar": int((cambia_escenario & (despues == NO_IDENTIFICADO)).sum()),
+            "cambian_indice": int((delta_indice.abs() > 0).sum()),
+            "cambian_nivel": int(cambia_nivel.sum()),
+            "delta_indice_medio": round(float(delta_indice.mean()), 4) if len(delta_indice) else 0.0,
+            "transiciones": [
+                {"antes": a, "despues": d, "filas": int(c)} for (a, d), c in transiciones.items()
+            ],
+        }
+    return resumen
+
+
+def comparar(detalles, matrices):
+    """Retorna (clasificaciones por versión, resumen de diferencias contra la base)"""
+    detalles = pd.Series(detalles).reset_index(drop=True)
+    clasificaciones = clasificar_versiones(detalles, matrices)
+    return clasificaciones, resumir_diferencias(clasificaciones, matrices)
+
+
+def detalles_del_archivo(data_dir, desde=None, hasta=None):
+    """Textos a clasificar (como en analizar_boletin) de los reportes del catálogo dentro del rango"""
+    from deltas import leer_dia
+
+    partes = []
+    for entrada in todos_los_reportes(data_dir) or []:
+        fecha = entrada.get("fecha")
+        if not fecha or (desde and fecha < desde) or (hasta and fecha > hasta):
+            continue
+        df = leer_dia(os.path.join(data_dir, entrada["ruta"]), data_dir)
+        if "detalle" in df.columns:
+            partes.append(texto_para_clasificar(df).astype("string"))
+    return pd.concat(partes, ignore_index=True) if partes else pd.Series([], dtype="string")
+
+
+def exportar_comparacion(clasificaciones, resumen, ruta):
+    """Hoja Resumen (conteos por versión) y hoja Diferencias (solo filas que cambian)"""
+    base = resumen["base"]
+    filas_resumen = [
+        {"version": nombre, "huella": huella, **resumen["niveles"][nombre], **{
+            k: v for k, v in resumen["diferencias"].get(nombre, {}).items() if k != "transiciones"
+        }}
+        for nombre, huella in resumen["versiones"].items()
+    ]
+    cambian = np.zeros(len(clasificaciones), dtype=bool)
+    for nombre in resumen["diferencias"]:
+        cambian |= (clasificaciones[f"tipo_decision[{nombre}]"] != clasificaciones[f"tipo_decision[{base}]"]).to_numpy()
+        cambian |= (clasificaciones[f"indice[{nombre}]"] != clasificaciones[f"indice[{base}]"]).to_numpy()
+    with archivo_atomico(ruta) as temporal:
+        with open(temporal, "wb") as f, pd.ExcelWriter(f, engine="openpyxl") as writer:
+            pd.DataFrame(filas_resumen).to_excel(writer, sheet_name="Resumen", index=False)
+            clasificaciones[cambian].to_excel(writer, sheet_name="Diferencias", index=False)
+
+
+def imprimir_resumen(resumen):
+    print(f"\n=== COMPARACIÓN DE VERSIONES DE LA MATRIZ ({resumen['filas']} filas) ===")
+    for nombre, niveles in resumen["niveles"].items():
+        print(f"{nombre:<20} [{resumen['versiones'][nombre]}] " + " · ".join(f"{n} {v}" for n, v in niveles.items()))
+    for nombre, d in resumen["diferencias"].items():
+        print(f"\n➡️ {resumen['base']} -> {nombre}")
+        print(f"   Cambian de escenario: {d['cambian_escenario']} (nuevas {d['nuevas']}, sin clasificar {d['sin_clasificar']})")
+        print(f"   Cambian de índice: {d['cambian_indice']} · de nivel: {d['cambian_nivel']} · delta medio {d['delta_indice_medio']:+.3f}")
+        for t in d["transiciones"]:
+            print(f"      {t['antes']} -> {t['despues']}: {t['filas']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara versiones de MATRIZ_TEORICA sobre el archivo en una sola pasada")
+    parser.add_argument("propuestas", nargs="*", help="Archivos .json con el formato de MATRIZ_TEORICA")
+    parser.add_argument("--peso", action="append", default=[], metavar="CATEGORIA=PESO", help="Variante de la vigente con otro peso")
+    parser.add_argument("--desde", help="YYYY-MM-DD")
+    parser.add_argument("--hasta", help="YYYY-MM-DD")
+    parser.add_argument("--salida", help="Exportar el resumen y las filas que cambian a un .xlsx")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args()
+
+    matrices = {BASE: MATRIZ_TEORICA}
+    for ruta in args.propuestas:
+        matrices[os.path.splitext(os.path.basename(ruta))[0]] = cargar_matriz(ruta)
+    if args.peso:
+        pesos = dict(p.rsplit("=", 1) for p in args.peso)
+        matrices["pesos"] = con_pesos(MATRIZ_TEORICA, pesos)
+    if len(matrices) == 1:
+        parser.error("indicar al menos una propuesta (.json) o un --peso")
+
+    detalles = detalles_del_archivo(args.data_dir, args.desde, args.hasta)
+    if detalles.empty:
+        print("No hay reportes en el catálogo para ese rango.")
+        raise SystemExit(1)
+    clasificaciones, resumen = comparar(detalles, matrices)
+    imprimir_resumen(resumen)
+    if aviso_sin_anexos(args.data_dir):
+        print(f"\n{aviso_sin_anexos(args.data_dir)}")
+    if args.salida:
+        exportar_comparacion(clasificaciones, resumen, args.salida)
+        print(f"\n📄 Comparación exportada a {args.salida}")
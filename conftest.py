@@ -0,0 +1,21 @@
+import os
+import sys
+import pytest
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+
+# ==========================================
+# DIRECTORIO DE DATOS AISLADO POR TEST
+# ==========================================
+# analizar_boletin() y los CLIs escriben en DATA_DIR: índices, catálogo,
+# estado EWMA, instantáneas y memo. Son los archivos que el robot versiona,
+# así que ningún test puede tocar el data/ real (ni /app/data).
+@pytest.fixture(autouse=True)
+def data_dir_temporal(tmp_path_factory, monkeypatch):
+    directorio = tmp_path_factory.mktemp("data")
+    for modulo in list(sys.modules.values()):
+        archivo = getattr(modulo, "__file__", None) or ""
+        if os.path.dirname(os.path.abspath(archivo)) == RAIZ and hasattr(modulo, "DATA_DIR"):
+            monkeypatch.setattr(modulo, "DATA_DIR", str(directorio))
+    return directorio
@@ -0,0 +1,46 @@
+import math
+import pandas as pd
+
+# ==========================================
+# CONSULTAS DEL LADO DEL SERVIDOR PARA LOS DASHBOARDS
+# ==========================================
+# Filtrado, orden y paginación se resuelven en pandas antes de llegar a
+# Streamlit: el navegador solo recibe la página visible de la tabla, sin
+# importar el tamaño del reporte. Los gráficos se alimentan del cubo de
+# agregados (ver cubo.py).
+
+TAMANOS_PAGINA = [25, 50, 100, 250]
+
+
+def filtrar_reporte(df, escenarios=None, transferencias=None, niveles=None, texto=None):
+    """Aplica los filtros elegidos (None o lista vacía = sin filtro)"""
+    mascara = pd.Series(True, index=df.index)
+    if escenarios and "tipo_decision" in df.columns:
+        mascara &= df["tipo_decision"].isin(escenarios)
+    if transferencias and "transferencia" in df.columns:
+        mascara &= df["transferencia"].isin(transferencias)
+    if niveles and "nivel_riesgo_teorico" in df.columns:
+        mascara &= df["nivel_riesgo_teorico"].isin(niveles)
+    if texto and "detalle" in df.columns:
+        mascara &= df["detalle"].astype(str).str.contains(texto, case=False, regex=False, na=False)
+    return df[mascara]
+
+
+def paginar(df, pagina=1, tamano=TAMANOS_PAGINA[0], orden=None, ascendente=False):
+    """
+    Ordena y retorna solo la página pedida.
+    Retorna (df_pagina, total_paginas). Para ordenar se usa nlargest/nsmallest
+    cuando alcanza con los primeros registros, evitando ordenar todo el reporte.
+    """
+    total_paginas = max(1, math.ceil(len(df) / tamano))
+    pagina = min(max(1, int(pagina)), total_paginas)
+    fin = pagina * tamano
+
+    if orden and orden in df.columns:
+        if pd.api.types.is_numeric_dtype(df[orden]) and fin < len(df) // 4:
+            primeros = df.nsmallest(fin, orden) if ascendente else df.nlargest(fin, orden)
+        else:
+            primeros = df.sort_values(orden, ascending=ascendente, kind="stable")
+        return primeros.iloc[fin - tamano : fin], total_paginas
+
+    return df.iloc[fin - tamano : fin], total_paginas
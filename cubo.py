@@ -0,0 +1,104 @@
+import pandas as pd
+
+# ==========================================
+# CUBO DE AGREGADOS POR REPORTE
+# ==========================================
+# Una sola pasada sobre las filas del reporte produce el cubo
+# escenario x transferencia x nivel con cantidad / suma / máximo.
+# Todas las métricas, gráficos y recomendaciones de los dashboards se
+# derivan del cubo (unas decenas de celdas) en lugar de volver a recorrer
+# el DataFrame. El cubo también se guarda en el catálogo (catalogo.py).
+
+DIMENSIONES = ["tipo_decision", "transferencia", "nivel_riesgo_teorico"]
+NO_IDENTIFICADO = "No identificado"
+
+# Cambiar si cambia la estructura del cubo (invalida los cubos persistidos)
+VERSION_CUBO = 1
+
+
+def construir_cubo(df):
+    """Agrupa todas las filas por las tres dimensiones en una única pasada"""
+    datos = pd.DataFrame(
+        {
+            "tipo_decision": df["tipo_decision"] if "tipo_decision" in df.columns else NO_IDENTIFICADO,
+            "transferencia": df["transferencia"] if "transferencia" in df.columns else NO_IDENTIFICADO,
+            "nivel_riesgo_teorico": df["nivel_riesgo_teorico"] if "nivel_riesgo_teorico" in df.columns else "Bajo",
+            "indice": pd.to_numeric(df["indice_fenomeno_corruptivo"], errors="coerce").fillna(0.0)
+            if "indice_fenomeno_corruptivo" in df.columns
+            else 0.0,
+        },
+        index=df.index,
+    )
+    datos[DIMENSIONES] = datos[DIMENSIONES].astype(str).where(datos[DIMENSIONES].notna(), NO_IDENTIFICADO)
+
+    cubo = (
+        datos.groupby(DIMENSIONES, observed=True, sort=False)["indice"]
+        .agg(cantidad="size", suma="sum", maximo="max")
+        .reset_index()
+    )
+    cubo["cantidad"] = cubo["cantidad"].astype(int)
+    return cubo
+
+
+def cubo_a_registros(cubo):
+    """Forma serializable (JSON) del cubo"""
+    return {"version": VERSION_CUBO, "celdas": cubo.to_dict(orient="records")}
+
+
+def cubo_desde_registros(registros):
+    """Retorna el cubo persistido o None si falta o es de otra versión"""
+    if not registros or registros.get("version") != VERSION_CUBO:
+        return None
+    return pd.DataFrame(registros["celdas"], columns=DIMENSIONES + ["cantidad", "suma", "maximo"])
+
+
+# ==========================================
+# VISTAS DERIVADAS (operan sobre el cubo, no sobre las filas)
+# ==========================================
+def detectados(cubo):
+    return cubo[cubo["tipo_decision"] != NO_IDENTIFICADO]
+
+
+def totales(cubo):
+    det = detectados(cubo)
+    cantidad = int(cubo["cantidad"].sum())
+    return {
+        "normas": cantidad,
+        "detectados": int(det["cantidad"].sum()),
+        "intensidad_max": float(cubo["maximo"].max()) if cantidad else 0.0,
+        "intensidad_promedio": float(cubo["suma"].sum() / cantidad) if cantidad else 0.0,
+    }
+
+
+def rollup(cubo, dimensiones, solo_detectados=True):
+    """Colapsa el cubo a las dimensiones pedidas con cantidad/suma/media/máximo"""
+    base = detectados(cubo) if solo_detectados else cubo
+    vista = (
+        base.groupby(dimensiones, observed=True)
+        .agg(cantidad=("cantidad", "sum"), suma=("suma", "sum"), maximo=("maximo", "max"))
+        .reset_index()
+    )
+    vista["media"] = vista["suma"] / vista["cantidad"]
+    return vista
+
+
+def por_escenario(cubo):
+    return rollup(cubo, ["tipo_decision"]).sort_values("cantidad", ascending=False)
+
+
+def por_transferencia(cubo):
+    return rollup(cubo, ["transferencia"]).sort_values("cantidad", ascending=False)
+
+
+def por_nivel(cubo, solo_detectados=True):
+    return rollup(cubo, ["nivel_riesgo_teorico"], solo_detectados).set_index("nivel_riesgo_teorico")
+
+
+def conteo_por_nivel(cubo, niveles=("Alto", "Medio", "Bajo"), solo_detectados=False):
+    vista = por_nivel(cubo, solo_detectados)
+    return {n: int(vista["cantidad"].get(n, 0)) for n in niveles}
+
+
+def top_escenarios(cubo, n=3):
+    """Escenarios con mayor intensidad promedio"""
+    return por_escenario(cubo).sort_values("media", ascending=False).head(n)
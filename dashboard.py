@@ -1,8 +1,15 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import os
 from datetime import datetime
+import catalogo
+import calendario_aperturas
+from deltas import leer_dia
+import cubo as cubo_agregados
+import grafo_entidades
+import instantaneas
+import top_riesgo as mayor_riesgo
+from consultas_dashboard import TAMANOS_PAGINA, filtrar_reporte, paginar
 
 # ===============================
 # CONFIGURACIÓN Y ESTILO
@@ -17,7 +24,11 @@ DATA_DIR = "/app/data" if os.path.exists("/app/data") else "data"
 # FUNCIONES DE GESTIÓN DE ARCHIVOS MENSUALES
 # ===============================
 def obtener_meses_disponibles():
-    """Escanea el directorio de datos y retorna una lista de meses disponibles"""
+    """Meses desde el catálogo; si no existe, escanea el directorio de datos"""
+    meses = catalogo.meses_disponibles(DATA_DIR)
+    if meses is not None:
+        return meses
+
     if not os.path.exists(DATA_DIR):
         return []
 
@@ -32,13 +43,20 @@ def obtener_meses_disponibles():
 
 
 def obtener_archivos_del_mes(mes):
-    """Retorna todos los archivos .xlsx de un mes específico"""
+    """Retorna {nombre: ruta} de los reportes .xlsx de un mes específico"""
+    entradas = catalogo.reportes_del_mes(mes, DATA_DIR)
+    if entradas is not None:
+        return {
+            os.path.basename(e["ruta"]): os.path.join(DATA_DIR, e["ruta"])
+            for e in entradas
+        }
+
     mes_dir = os.path.join(DATA_DIR, mes)
     if not os.path.exists(mes_dir):
-        return []
+        return {}
 
     archivos = [f for f in os.listdir(mes_dir) if f.endswith(".xlsx")]
-    return sorted(archivos, reverse=True)
+    return {f: os.path.join(mes_dir, f) for f in sorted(archivos, reverse=True)}
 
 
 def formatear_nombre_mes(mes_codigo):
@@ -68,31 +86,29 @@ def formatear_nombre_mes(mes_codigo):
 # ===============================
 # TRATAMIENTO DE DATOS (COMPATIBILIDAD SEGURA)
 # ===============================
-def cargar_y_limpiar(ruta):
-    df = pd.read_excel(ruta)
+@st.cache_data(show_spinner=False)
+def obtener_cubo(ruta, mtime, _df):
+    """Cubo del reporte: el persistido en el catálogo o, si no está, una pasada"""
+    cubo = catalogo.cubo_del_reporte(ruta, DATA_DIR)
+    return cubo if cubo is not None else cubo_agregados.construir_cubo(_df)
 
-    # Mapeo de nombres antiguos a nuevos para compatibilidad histórica
-    mapeo = {
-        "indice_total": "indice_fenomeno_corruptivo",
-        "nivel_riesgo": "nivel_riesgo_teorico",
-        "origen": "transferencia",
-    }
 
-    # RENOMBRADO SEGURO
-    for viejo, nuevo in mapeo.items():
-        if viejo in df.columns and nuevo not in df.columns:
-            df = df.rename(columns={viejo: nuevo})
+@st.cache_data(show_spinner=False)
+def metricas_organismos(ruta, mtime, _df):
+    """HHI, ganadores repetidos y contratación directa por organismo (grafo disperso)"""
+    return grafo_entidades.metricas_por_organismo(grafo_entidades.construir_grafo(_df))
 
-    # Eliminar duplicados
-    df = df.loc[:, ~df.columns.duplicated()]
 
-    # Asegurar columnas críticas
-    if "indice_fenomeno_corruptivo" not in df.columns:
-        df["indice_fenomeno_corruptivo"] = 0.0
-    if "tipo_decision" not in df.columns:
-        df["tipo_decision"] = "No identificado"
+@st.cache_resource(show_spinner=False)
+def obtener_calendario(mtime):
+    """Índice ordenado de aperturas (se recarga solo cuando cambia el archivo)"""
+    return calendario_aperturas.cargar_calendario(DATA_DIR)
 
-    return df
+
+def cargar_y_limpiar(ruta):
+    # El esquema (esquema.py) se aplica una sola vez y queda en el sidecar .arrow.
+    # En modo deltas el xlsx no se versiona y el día se reconstruye.
+    return leer_dia(ruta, DATA_DIR)
 
 
 # ===============================
@@ -202,17 +218,37 @@ if not archivos_del_mes:
 
 archivo_selec = st.sidebar.selectbox(
     "Reporte Diario",
-    archivos_del_mes,
+    list(archivos_del_mes),
     format_func=lambda x: x.replace("reporte_fenomenos_", "").replace(".xlsx", ""),
 )
 
-ruta_completa = os.path.join(DATA_DIR, mes_seleccionado, archivo_selec)
-df = cargar_y_limpiar(ruta_completa)
+ruta_completa = archivos_del_mes[archivo_selec]
+mtime = os.path.getmtime(ruta_completa) if os.path.exists(ruta_completa) else None
+
+# Si el robot dejó una instantánea vigente (instantaneas.py), las métricas,
+# los gráficos y las tablas salen de ella sin abrir el reporte
+instantanea = instantaneas.cargar_instantanea(ruta_completa, DATA_DIR)
+if instantanea is not None:
+    df = None
+    cubo = cubo_agregados.cubo_desde_registros(instantanea["cubo"])
+    figuras = {nombre: instantaneas.figura(instantanea, nombre) for nombre in instantaneas.FIGURAS}
+else:
+    df = cargar_y_limpiar(ruta_completa)
+    # Todas las métricas y gráficos salen del cubo (escenario x transferencia x nivel)
+    cubo = obtener_cubo(ruta_completa, mtime, df)
+    figuras = instantaneas.construir_figuras(cubo)
+totales = cubo_agregados.totales(cubo)
+hay_detectados = totales["detectados"] > 0
+
+# Totales del mes leídos del catálogo (sin abrir los demás reportes)
+resumen_mes = catalogo.resumen_del_mes(mes_seleccionado, DATA_DIR)
 
 st.sidebar.divider()
 st.sidebar.info(f"""
 **Período:** {formatear_nombre_mes(mes_seleccionado)}  
-**Total reportes:** {len(archivos_del_mes)} días
+**Total reportes:** {len(archivos_del_mes)} días  
+**Fenómenos en el mes:** {resumen_mes["detectados"]}  
+**Alertas de riesgo alto:** {resumen_mes["riesgo"]["Alto"]}
 """)
 
 # ===============================
@@ -221,15 +257,28 @@ st.sidebar.info(f"""
 st.title("⚖️ Monitor de Fenómenos Corruptivos Legales")
 st.markdown("### Implementación de la Teoría del **Ph.D. Vicente Humberto Monteverde**")
 
-df_detectados = df[df["tipo_decision"] != "No identificado"]
-
 m1, m2, m3, m4 = st.columns(4)
-m1.metric("Normas Analizadas", len(df))
-m2.metric("Fenómenos Detectados", len(df_detectados))
-m3.metric("Riesgo Máximo", f"{df['indice_fenomeno_corruptivo'].max()}/10")
+m1.metric("Normas Analizadas", totales["normas"])
+m2.metric("Fenómenos Detectados", totales["detectados"])
+m3.metric("Riesgo Máximo", f"{totales['intensidad_max']}/10")
 fecha_label = archivo_selec.split("_")[-1].split(".")[0]
 m4.metric("Fecha del Reporte", fecha_label)
 
+# Picos respecto de la media móvil (EWMA) de días anteriores, ver anomalias.py
+entrada_reporte = catalogo.entrada_del_reporte(ruta_completa, DATA_DIR) or {}
+anomalias_dia = entrada_reporte.get("anomalias") or []
+if anomalias_dia:
+    st.write("### 📈 Anomalías del Día")
+    etiquetas = {"escenario": "Escenario", "transferencia": "Transferencia", "organismo": "Organismo"}
+    for a in anomalias_dia[:5]:
+        st.warning(
+            f"**{etiquetas.get(a['dimension'], a['dimension'])}: {a['valor']}** · "
+            f"{a['cantidad']} decisiones (esperado ≈ {a['esperado']:.1f}, z = {a['z']:.1f})"
+        )
+    if len(anomalias_dia) > 5:
+        with st.expander(f"Ver las {len(anomalias_dia)} anomalías"):
+            st.dataframe(pd.DataFrame(anomalias_dia), hide_index=True)
+
 st.divider()
 
 # ===============================
@@ -239,37 +288,15 @@ col_g1, col_g2 = st.columns(2)
 
 with col_g1:
     st.write("### 📊 Intensidad por Escenario Teórico")
-    if not df_detectados.empty:
-        fig_bar = px.bar(
-            df_detectados,
-            x="indice_fenomeno_corruptivo",
-            y="tipo_decision",
-            color="nivel_riesgo_teorico",
-            orientation="h",
-            color_discrete_map={
-                "Alto": "#EF553B",
-                "Medio": "#FECB52",
-                "Bajo": "#636EFA",
-            },
-            labels={
-                "indice_fenomeno_corruptivo": "Índice de Intensidad (0-10)",
-                "tipo_decision": "Escenario de la Teoría",
-            },
-        )
-        st.plotly_chart(fig_bar, use_container_width=True)
+    if hay_detectados:
+        st.plotly_chart(figuras["intensidad_por_nivel"], use_container_width=True)
     else:
         st.info("No hay fenómenos detectados en este reporte.")
 
 with col_g2:
     st.write("### 💸 Sectores de Transferencia Regresiva")
-    if not df_detectados.empty:
-        fig_pie = px.pie(
-            df_detectados,
-            names="transferencia",
-            hole=0.4,
-            title="Distribución de Impacto Económico",
-        )
-        st.plotly_chart(fig_pie, use_container_width=True)
+    if hay_detectados:
+        st.plotly_chart(figuras["transferencias"], use_container_width=True)
 
 # ===============================
 # TABLA DE AUDITORÍA
@@ -279,17 +306,70 @@ cols_visibles = [
     "fecha",
     "tipo_decision",
     "transferencia",
+    "tipo_decision_modelo",
+    "confianza_modelo",
+    "monto_ars",
     "indice_fenomeno_corruptivo",
     "nivel_riesgo_teorico",
     "link",
 ]
-df_display = df[[c for c in cols_visibles if c in df.columns]]
+
+# Con instantánea se muestran las decisiones de mayor intensidad ya
+# precalculadas; el reporte completo se abre solo si se pide explorarlo
+explorar_todo = df is not None or st.toggle(
+    "Explorar todas las decisiones del reporte (filtros y búsqueda)", value=False
+)
+if not explorar_todo:
+    df_display = pd.DataFrame(instantanea["principales"])
+    df_display = df_display[[c for c in cols_visibles if c in df_display.columns]]
+    st.caption(f"Las {len(df_display)} decisiones de mayor intensidad de {totales['normas']} analizadas")
+else:
+    if df is None:
+        df = cargar_y_limpiar(ruta_completa)
+
+    # Filtros, orden y paginación se resuelven en el servidor: al navegador
+    # solo llega la página visible
+    col_f1, col_f2, col_f3, col_f4 = st.columns(4)
+    filtro_escenarios = col_f1.multiselect(
+        "Escenario", sorted(df["tipo_decision"].dropna().unique())
+    )
+    filtro_transferencias = col_f2.multiselect(
+        "Transferencia",
+        sorted(df["transferencia"].dropna().unique()) if "transferencia" in df.columns else [],
+    )
+    filtro_niveles = col_f3.multiselect("Nivel de riesgo", ["Alto", "Medio", "Bajo"])
+    filtro_texto = col_f4.text_input("Buscar en el detalle")
+
+    df_filtrado = filtrar_reporte(
+        df, filtro_escenarios, filtro_transferencias, filtro_niveles, filtro_texto
+    )
+
+    col_o1, col_o2, col_o3, col_o4 = st.columns(4)
+    columnas_orden = [c for c in cols_visibles if c in df.columns]
+    orden = col_o1.selectbox(
+        "Ordenar por",
+        columnas_orden,
+        index=columnas_orden.index("indice_fenomeno_corruptivo")
+        if "indice_fenomeno_corruptivo" in columnas_orden
+        else 0,
+    )
+    ascendente = col_o2.radio("Sentido", ["Descendente", "Ascendente"], horizontal=True) == "Ascendente"
+    tamano_pagina = col_o3.selectbox("Filas por página", TAMANOS_PAGINA)
+    total_paginas = max(1, -(-len(df_filtrado) // tamano_pagina))
+    pagina = col_o4.number_input("Página", min_value=1, max_value=total_paginas, value=1)
+
+    df_pagina, total_paginas = paginar(df_filtrado, pagina, tamano_pagina, orden, ascendente)
+    df_display = df_pagina[[c for c in cols_visibles if c in df_pagina.columns]]
+    st.caption(f"{len(df_filtrado)} decisiones filtradas · página {pagina} de {total_paginas}")
 
 st.dataframe(
     df_display,
     use_container_width=True,
     column_config={
         "link": st.column_config.LinkColumn("Norma Original"),
+        "monto_ars": st.column_config.NumberColumn("Monto ($)", format="%.0f"),
+        "tipo_decision_modelo": st.column_config.TextColumn("Sugerencia del modelo"),
+        "confianza_modelo": st.column_config.ProgressColumn("Confianza", min_value=0, max_value=1),
         "indice_fenomeno_corruptivo": st.column_config.ProgressColumn(
             "Intensidad", min_value=0, max_value=10
         ),
@@ -369,102 +449,41 @@ st.write("### ⏱️ Análisis de Acumulación Temporal de Fenómenos")
 col_temp1, col_temp2 = st.columns(2)
 
 with col_temp1:
-    if not df_detectados.empty:
-        acumulacion = (
-            df_detectados.groupby("tipo_decision").size().reset_index(name="cantidad")
-        )
-        acumulacion = acumulacion.sort_values("cantidad", ascending=False)
-
-        fig_acum = px.bar(
-            acumulacion,
-            x="cantidad",
-            y="tipo_decision",
-            orientation="h",
-            title="Frecuencia de Fenómenos por Escenario",
-            labels={"cantidad": "Cantidad de Casos", "tipo_decision": "Escenario"},
-            color="cantidad",
-            color_continuous_scale="Reds",
-        )
-        st.plotly_chart(fig_acum, use_container_width=True)
+    if hay_detectados:
+        st.plotly_chart(figuras["frecuencia"], use_container_width=True)
 
 with col_temp2:
-    if not df_detectados.empty:
-        intensidad_prom = (
-            df_detectados.groupby("tipo_decision")["indice_fenomeno_corruptivo"]
-            .mean()
-            .reset_index()
-        )
-        intensidad_prom = intensidad_prom.sort_values(
-            "indice_fenomeno_corruptivo", ascending=False
-        )
-
-        fig_int = px.bar(
-            intensidad_prom,
-            x="indice_fenomeno_corruptivo",
-            y="tipo_decision",
-            orientation="h",
-            title="Intensidad Promedio por Escenario",
-            labels={
-                "indice_fenomeno_corruptivo": "Intensidad Promedio",
-                "tipo_decision": "Escenario",
-            },
-            color="indice_fenomeno_corruptivo",
-            color_continuous_scale="Oranges",
-        )
-        st.plotly_chart(fig_int, use_container_width=True)
+    if hay_detectados:
+        st.plotly_chart(figuras["intensidad_promedio"], use_container_width=True)
 
 # 2. MATRIZ DE RIESGO
 st.write("### 🎯 Matriz de Riesgo: Intensidad vs Transferencia")
 
-if not df_detectados.empty:
+if hay_detectados:
     col_matriz1, col_matriz2 = st.columns([2, 1])
 
     with col_matriz1:
-        fig_scatter = px.scatter(
-            df_detectados,
-            x="indice_fenomeno_corruptivo",
-            y="transferencia",
-            color="nivel_riesgo_teorico",
-            size="indice_fenomeno_corruptivo",
-            hover_data=["tipo_decision"],
-            color_discrete_map={
-                "Alto": "#EF553B",
-                "Medio": "#FECB52",
-                "Bajo": "#636EFA",
-            },
-            title="Distribución de Fenómenos",
-            labels={
-                "indice_fenomeno_corruptivo": "Índice de Intensidad",
-                "transferencia": "Dirección de Transferencia",
-            },
-        )
-        fig_scatter.update_layout(height=500)
-        st.plotly_chart(fig_scatter, use_container_width=True)
+        st.plotly_chart(figuras["matriz_riesgo"], use_container_width=True)
 
     with col_matriz2:
         st.markdown("#### 📊 Estadísticas por Transferencia")
-        for transferencia in df_detectados["transferencia"].unique():
-            df_trans = df_detectados[df_detectados["transferencia"] == transferencia]
-            st.markdown(f"**{transferencia}:**")
-            st.metric("Casos", len(df_trans))
-            st.metric(
-                "Intensidad Promedio",
-                f"{df_trans['indice_fenomeno_corruptivo'].mean():.1f}/10",
-            )
+        for fila in cubo_agregados.por_transferencia(cubo).itertuples():
+            st.markdown(f"**{fila.transferencia}:**")
+            st.metric("Casos", int(fila.cantidad))
+            st.metric("Intensidad Promedio", f"{fila.media:.1f}/10")
             st.divider()
 
 # 3. CONCENTRACIÓN DE RIESGO
 st.write("### 🔥 Concentración de Riesgo por Nivel")
 
-if not df_detectados.empty:
+if hay_detectados:
     col_conc1, col_conc2, col_conc3 = st.columns(3)
 
     riesgo_stats = (
-        df_detectados.groupby("nivel_riesgo_teorico")
-        .agg({"indice_fenomeno_corruptivo": ["count", "mean", "sum"]})
+        cubo_agregados.por_nivel(cubo)
         .reset_index()
+        .rename(columns={"nivel_riesgo_teorico": "nivel_riesgo", "media": "promedio", "suma": "total"})
     )
-    riesgo_stats.columns = ["nivel_riesgo", "cantidad", "promedio", "total"]
 
     with col_conc1:
         if "Alto" in riesgo_stats["nivel_riesgo"].values:
@@ -499,33 +518,118 @@ if not df_detectados.empty:
         else:
             st.metric("🔵 Riesgo BAJO", "0 casos")
 
-# 4. RECOMENDACIONES
+# 4. CONCENTRACIÓN POR ORGANISMO
+st.write("### 🕸️ Concentración por Organismo")
+if instantanea is not None:
+    metricas_org = pd.DataFrame(instantanea["organismos"]) if instantanea["organismos"] else None
+    con_proveedores = instantanea["con_proveedores"]
+elif "organismo" in df.columns and df["organismo"].notna().any():
+    metricas_org = metricas_organismos(ruta_completa, mtime, df)
+    con_proveedores = "proveedor" in df.columns
+else:
+    metricas_org = None
+
+if metricas_org is not None:
+    if not con_proveedores or metricas_org["adjudicados"].sum() == 0:
+        st.caption("Este reporte no trae adjudicatarios: solo se muestra el peso de la contratación directa.")
+    st.dataframe(
+        metricas_org.head(20),
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "hhi": st.column_config.NumberColumn("HHI", format="%.0f", help="Herfindahl-Hirschman (0-10000)"),
+            "ratio_repetidos": st.column_config.ProgressColumn("Ganadores repetidos", min_value=0, max_value=1),
+            "ratio_directa": st.column_config.ProgressColumn("Contratación directa", min_value=0, max_value=1),
+            "share_principal": st.column_config.ProgressColumn("Share del principal", min_value=0, max_value=1),
+        },
+    )
+else:
+    st.info("Este reporte no identifica organismos (p. ej. solo Comprar.gob.ar).")
+
+# 5. RECOMENDACIONES
 st.write("### 💡 Recomendaciones Basadas en la Teoría")
 
-if not df_detectados.empty:
+if hay_detectados:
     col_rec1, col_rec2 = st.columns(2)
 
     with col_rec1:
         st.markdown("#### 🎯 Escenarios de Mayor Riesgo")
-        top_riesgo = (
-            df_detectados.groupby("tipo_decision")["indice_fenomeno_corruptivo"]
-            .mean()
-            .sort_values(ascending=False)
-            .head(3)
-        )
+        top_riesgo = cubo_agregados.top_escenarios(cubo, 3)
 
-        for i, (escenario, intensidad) in enumerate(top_riesgo.items(), 1):
-            st.markdown(f"{i}. **{escenario}**: {intensidad:.1f}/10")
+        for i, fila in enumerate(top_riesgo.itertuples(), 1):
+            st.markdown(f"{i}. **{fila.tipo_decision}**: {fila.media:.1f}/10")
 
     with col_rec2:
         st.markdown("#### 📊 Direcciones de Transferencia")
-        trans_dist = df_detectados["transferencia"].value_counts()
+        trans_dist = cubo_agregados.por_transferencia(cubo)
 
-        for transferencia, cantidad in trans_dist.items():
-            porcentaje = (cantidad / len(df_detectados) * 100)
+        for transferencia, cantidad in zip(trans_dist["transferencia"], trans_dist["cantidad"]):
+            porcentaje = (cantidad / totales["detectados"] * 100)
             st.markdown(f"• **{transferencia}**: {cantidad} casos ({porcentaje:.1f}%)")
 
     st.info("""
     **Según la teoría de Monteverde**, estos fenómenos corruptivos son **legales** pero generan 
     **transferencias regresivas de ingresos**, afectando la distribución económica y la equidad social.
     """)
+
+# 6. MAYOR RIESGO DEL ARCHIVO
+# Del índice persistido (top_riesgo.py): no abre ningún reporte
+st.write("### 🏆 Decisiones de Mayor Riesgo del Archivo")
+estado_top = mayor_riesgo.cargar_estado(DATA_DIR)
+if estado_top["global"]:
+    col_top1, col_top2 = st.columns(2)
+    with col_top1:
+        periodo = st.radio(
+            "Período", ["Mes seleccionado", "Trimestre", "Todo el archivo"], horizontal=True, key="periodo_top"
+        )
+    with col_top2:
+        escenario_top = st.selectbox("Escenario", ["Todos"] + sorted(estado_top["escenarios"]), key="escenario_top")
+
+    anio, numero_mes = (int(p) for p in mes_seleccionado.split("-"))
+    rangos = {
+        "Mes seleccionado": (f"{mes_seleccionado}-01", mayor_riesgo.ultimo_dia(mes_seleccionado)),
+        "Trimestre": mayor_riesgo.trimestre(anio, (numero_mes - 1) // 3 + 1),
+        "Todo el archivo": (None, None),
+    }
+    desde_top, hasta_top = rangos[periodo]
+    decisiones = mayor_riesgo.consultar_top(
+        DATA_DIR,
+        min(50, estado_top["k"]),
+        desde_top,
+        hasta_top,
+        None if escenario_top == "Todos" else escenario_top,
+        estado=estado_top,
+    )
+    st.dataframe(
+        mayor_riesgo.top_a_tabla(decisiones),
+        hide_index=True,
+        use_container_width=True,
+        column_config={"link": st.column_config.LinkColumn("Norma Original")},
+    )
+else:
+    st.caption("El índice de mayor riesgo se arma con cada reporte nuevo (o con: python top_riesgo.py reconstruir).")
+
+# 7. PRÓXIMAS APERTURAS
+# Búsqueda binaria sobre el calendario de todo el archivo (calendario_aperturas.py)
+st.write("### 📆 Próximas Aperturas de Ofertas")
+ruta_calendario = calendario_aperturas.ruta_indice(DATA_DIR)
+calendario = obtener_calendario(os.path.getmtime(ruta_calendario) if os.path.exists(ruta_calendario) else 0)
+if len(calendario):
+    col_ap1, col_ap2 = st.columns(2)
+    with col_ap1:
+        dias_adelante = st.slider("Días hacia adelante", 1, 60, 7, key="dias_aperturas")
+    with col_ap2:
+        niveles_apertura = st.multiselect("Nivel de riesgo", ["Alto", "Medio", "Bajo"], default=["Alto"], key="niveles_aperturas")
+    proximas = calendario.proximas(dias_adelante, niveles=niveles_apertura)
+    st.caption(f"{len(proximas)} apertura(s) en los próximos {dias_adelante} días")
+    st.dataframe(
+        proximas[[c for c in calendario_aperturas.COLUMNAS_CALENDARIO if c != "fecha_apertura"]],
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "apertura": st.column_config.DatetimeColumn("Apertura", format="DD/MM/YYYY HH:mm"),
+            "link": st.column_config.LinkColumn("Norma Original"),
+        },
+    )
+else:
+    st.caption("Todavía no hay procesos con fecha de apertura (o falta: python calendario_aperturas.py reconstruir).")
@@ -0,0 +1,263 @@
+import os
+import sys
+import glob
+import hashlib
+import pandas as pd
+from datetime import datetime, timedelta
+from cache_columnar import preparar_para_arrow, leer_reporte
+from catalogo import fecha_desde_nombre
+from escritura_atomica import archivo_atomico
+from esquema import COLUMNA_APERTURA, aplicar_esquema
+
+# ==========================================
+# ALMACENAMIENTO POR DELTAS DIARIOS + COMPACTACIÓN MENSUAL
+# ==========================================
+# En lugar de versionar el xlsx completo de cada día, se guardan solo las
+# filas nuevas, modificadas o dadas de baja respecto del día anterior:
+#
+#   data/deltas/2026-02/delta_20260207.parquet   (delta diario, zstd)
+#   data/deltas/compactado/2026-01.parquet       (todas las operaciones del mes)
+#   data/deltas/compactado/2026-01.cierre.parquet (snapshot al cierre del mes)
+#
+# reconstruir_snapshot(fecha) parte del último cierre mensual y aplica las
+# operaciones posteriores, por lo que el costo de lectura depende del cambio
+# real y no del tamaño total del historial.
+
+DIRECTORIO_DELTAS = "deltas"
+DIRECTORIO_COMPACTADO = "compactado"
+COMPRESION = "zstd"
+
+# Columnas de control agregadas a cada operación
+COL_CLAVE = "_clave"
+COL_HASH = "_hash"
+COL_DIA = "_dia"
+COL_OP = "_op"
+COLUMNAS_CONTROL = [COL_CLAVE, COL_HASH, COL_DIA, COL_OP]
+
+# "fecha" es la fecha de extracción: cambia todos los días sin que el
+# proceso cambie, por eso no participa del hash de contenido. "apertura" se
+# deriva de fecha_apertura, que ya participa.
+COLUMNAS_VOLATILES = {"fecha", COLUMNA_APERTURA}
+
+
+def _hash_texto(*partes):
+    return hashlib.sha1("\x1f".join(partes).encode("utf-8")).hexdigest()
+
+
+def calcular_claves(df):
+    """Identidad de cada fila: nro_proceso si existe, si no link + detalle"""
+    def clave(fila):
+        nro = fila.get("nro_proceso")
+        if isinstance(nro, str) and nro.strip():
+            return "proc:" + nro.strip()
+        return _hash_texto(str(fila.get("link", "")), str(fila.get("detalle", "")))
+
+    return df.apply(clave, axis=1) if len(df) else pd.Series([], dtype=object)
+
+
+def calcular_hashes(df):
+    """Hash del contenido de cada fila, sin las columnas volátiles"""
+    columnas = sorted(c for c in df.columns if c not in COLUMNAS_VOLATILES)
+    valores = df[columnas].astype(str).itertuples(index=False, name=None)
+    return pd.Series([_hash_texto(*fila) for fila in valores], index=df.index)
+
+
+def _dir_deltas(data_dir):
+    return os.path.join(data_dir, DIRECTORIO_DELTAS)
+
+
+def ruta_delta(fecha, data_dir):
+    """'2026-02-07' -> data/deltas/2026-02/delta_20260207.parquet"""
+    return os.path.join(
+        _dir_deltas(data_dir), fecha[:7], f"delta_{fecha.replace('-', '')}.parquet"
+    )
+
+
+def _rutas_compactado(mes, data_dir):
+    base = os.path.join(_dir_deltas(data_dir), DIRECTORIO_COMPACTADO, mes)
+    return base + ".parquet", base + ".cierre.parquet"
+
+
+def _escribir_parquet(df, ruta):
+    """Escritura atómica: temporal + rename"""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with archivo_atomico(ruta) as temporal:
+        preparar_para_arrow(df).to_parquet(temporal, index=False, compression=COMPRESION)
+
+
+def _leer_parquets(rutas):
+    partes = [pd.read_parquet(r) for r in rutas if os.path.exists(r)]
+    partes = [p for p in partes if len(p)]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+
+# ==========================================
+# LECTURA: RECONSTRUCCIÓN DE UN DÍA
+# ==========================================
+def meses_con_deltas(data_dir):
+    """Meses con operaciones (compactadas o diarias), en orden cronológico"""
+    meses = set()
+    for ruta in glob.glob(os.path.join(_dir_deltas(data_dir), "*", "delta_*.parquet")):
+        meses.add(os.path.basename(os.path.dirname(ruta)))
+    compactado = os.path.join(_dir_deltas(data_dir), DIRECTORIO_COMPACTADO)
+    for ruta in glob.glob(os.path.join(compactado, "????-??.parquet")):
+        meses.add(os.path.basename(ruta)[:7])
+    return sorted(meses)
+
+
+def _deltas_diarios(mes, data_dir):
+    return sorted(glob.glob(os.path.join(_dir_deltas(data_dir), mes, "delta_*.parquet")))
+
+
+def operaciones_del_mes(mes, data_dir):
+    """Operaciones compactadas del mes más los deltas diarios pendientes"""
+    ruta_ops, _ = _rutas_compactado(mes, data_dir)
+    return _leer_parquets([ruta_ops] + _deltas_diarios(mes, data_dir))
+
+
+def _aplicar_operaciones(base, operaciones):
+    """La última operación por clave gana; las bajas eliminan la fila"""
+    if operaciones.empty:
+        return base
+    todo = pd.concat([base, operaciones], ignore_index=True) if len(base) else operaciones
+    todo = todo.sort_values(COL_DIA, kind="stable")
+    todo = todo.drop_duplicates(subset=COL_CLAVE, keep="last")
+    return todo[todo[COL_OP] != "baja"].reset_index(drop=True)
+
+
+def reconstruir_snapshot(fecha, data_dir, incluir_control=False):
+    """Contenido del reporte del día 'fecha' (YYYY-MM-DD) a partir de los deltas"""
+    mes_objetivo = fecha[:7]
+    meses = [m for m in meses_con_deltas(data_dir) if m <= mes_objetivo]
+
+    # Punto de partida: el último cierre mensual vigente anterior al mes pedido
+    base = pd.DataFrame()
+    desde = 0
+    for i in range(len(meses) - 1, -1, -1):
+        mes = meses[i]
+        _, ruta_cierre = _rutas_compactado(mes, data_dir)
+        # Un cierre deja de ser vigente si llegaron deltas diarios después
+        if mes < mes_objetivo and os.path.exists(ruta_cierre) and not _deltas_diarios(mes, data_dir):
+            base = pd.read_parquet(ruta_cierre)
+            desde = i + 1
+            break
+
+    snapshot = base
+    for mes in meses[desde:]:
+        ops = operaciones_del_mes(mes, data_dir)
+        if not ops.empty:
+            ops = ops[ops[COL_DIA] <= fecha]
+        snapshot = _aplicar_operaciones(snapshot, ops)
+
+    if snapshot.empty:
+        return snapshot
+    if "fecha" in snapshot.columns:
+        snapshot["fecha"] = fecha
+    if not incluir_control:
+        snapshot = snapshot.drop(columns=COLUMNAS_CONTROL)
+    return snapshot.reset_index(drop=True)
+
+
+def leer_dia(ruta_reporte, data_dir):
+    """
+    Lector para los dashboards: usa el xlsx si existe y, si no (modo deltas,
+    donde el xlsx no se versiona), reconstruye el día desde los deltas.
+    """
+    if os.path.exists(ruta_reporte):
+        return leer_reporte(ruta_reporte)
+    snapshot = reconstruir_snapshot(fecha_desde_nombre(ruta_reporte), data_dir)
+    return aplicar_esquema(snapshot) if len(snapshot) else snapshot
+
+
+# ==========================================
+# ESCRITURA: DELTA DIARIO
+# ==========================================
+def calcular_delta(df, anterior, fecha):
+    """Altas, cambios y bajas de 'df' respecto del snapshot 'anterior'"""
+    actual = df.copy()
+    actual[COL_CLAVE] = calcular_claves(actual)
+    actual[COL_HASH] = calcular_hashes(df)
+    actual = actual.drop_duplicates(subset=COL_CLAVE, keep="last")
+
+    previos = {}
+    if not anterior.empty:
+        previos = dict(zip(anterior[COL_CLAVE], anterior[COL_HASH]))
+
+    hash_previo = actual[COL_CLAVE].map(previos)
+    actual[COL_OP] = "cambio"
+    actual.loc[hash_previo.isna(), COL_OP] = "alta"
+    altas_y_cambios = actual[hash_previo.isna() | (hash_previo != actual[COL_HASH])]
+
+    bajas = pd.DataFrame()
+    if not anterior.empty:
+        bajas = anterior[~anterior[COL_CLAVE].isin(actual[COL_CLAVE])][[COL_CLAVE]].copy()
+        bajas[COL_HASH] = None
+        bajas[COL_OP] = "baja"
+
+    delta = pd.concat([altas_y_cambios, bajas], ignore_index=True)
+    delta[COL_DIA] = fecha
+    return delta
+
+
+def escribir_delta(df, fecha, data_dir):
+    """Guarda solo lo que cambió respecto del día anterior. Retorna la ruta."""
+    dia_previo = (datetime.strptime(fecha, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+    anterior = reconstruir_snapshot(dia_previo, data_dir, incluir_control=True)
+    delta = calcular_delta(df, anterior, fecha)
+
+    ruta = ruta_delta(fecha, data_dir)
+    _escribir_parquet(delta, ruta)
+    altas = int((delta[COL_OP] == "alta").sum())
+    cambios = int((delta[COL_OP] == "cambio").sum())
+    bajas = int((delta[COL_OP] == "baja").sum())
+    print(f"🧩 Delta {fecha}: {altas} altas, {cambios} cambios, {bajas} bajas -> {ruta}")
+    return ruta
+
+
+# ==========================================
+# COMPACTACIÓN MENSUAL
+# ==========================================
+def compactar_mes(mes, data_dir):
+    """
+    Une los deltas diarios del mes en un único archivo columnar, guarda el
+    snapshot de cierre y borra los diarios. Es idempotente.
+    """
+    diarios = _deltas_diarios(mes, data_dir)
+    if not diarios:
+        return None
+
+    ops = operaciones_del_mes(mes, data_dir).sort_values(COL_DIA, kind="stable")
+    ultimo_dia = ops[COL_DIA].max()
+    cierre = reconstruir_snapshot(ultimo_dia, data_dir, incluir_control=True)
+
+    ruta_ops, ruta_cierre = _rutas_compactado(mes, data_dir)
+    _escribir_parquet(ops, ruta_ops)
+    _escribir_parquet(cierre, ruta_cierre)
+    for ruta in diarios:
+        os.remove(ruta)
+
+    print(f"🗜️ Compactado {mes}: {len(diarios)} deltas, {len(ops)} operaciones.")
+    return ruta_ops
+
+
+def compactar_meses_cerrados(data_dir, mes_actual=None):
+    """Compacta todos los meses anteriores al mes en curso"""
+    mes_actual = mes_actual or datetime.now().strftime("%Y-%m")
+    compactados = []
+    for mes in meses_con_deltas(data_dir):
+        if mes < mes_actual and compactar_mes(mes, data_dir):
+            compactados.append(mes)
+    return compactados
+
+
+if __name__ == "__main__":
+    data_dir = "/app/data" if os.path.exists("/app/data") else "data"
+    comando = sys.argv[1] if len(sys.argv) > 1 else ""
+
+    if comando == "compactar":
+        hechos = compactar_meses_cerrados(data_dir)
+        print(f"✅ Meses compactados: {len(hechos)}")
+    elif comando == "snapshot" and len(sys.argv) > 2:
+        print(reconstruir_snapshot(sys.argv[2], data_dir).to_string())
+    else:
+        print("Uso: python deltas.py compactar | snapshot YYYY-MM-DD")
@@ -1,16 +1,28 @@
 import os
-import shutil
-import requests
 import pandas as pd
 from bs4 import BeautifulSoup
 from datetime import datetime
+from urllib.parse import urljoin
 from analisis import analizar_boletin
+from clasificador_lineal import HABILITADO as MODELO_LINEAL_HABILITADO, actualizar_modelo
+from anexos import HABILITADO as ANEXOS_HABILITADO, agregar_texto_anexos
+from cliente_http import obtener_cliente
+from deltas import escribir_delta
+from escritura_atomica import bloqueo_particion, nuevo_id_corrida
+from esquema import aplicar_esquema
+from fuentes import Fuente, ejecutar_fuentes, fuentes_habilitadas, registrar_fuente
+from top_riesgo import consultar_top, top_a_tabla, ultimo_dia
 
 # ==========================================
 # CONFIGURACIÓN DE RUTAS CON ARCHIVADO MENSUAL
 # ==========================================
 DATA_DIR = "data"
 
+# "xlsx" (por defecto) guarda solo el reporte completo; "deltas" además
+# guarda las filas nuevas/modificadas del día (ver deltas.py), que es lo
+# que versiona el workflow diario en lugar del xlsx binario.
+MODO_ALMACENAMIENTO = os.environ.get("MODO_ALMACENAMIENTO", "xlsx")
+
 def obtener_directorio_mes_actual():
     """
     Crea y retorna el directorio del mes actual en formato YYYY-MM
@@ -21,78 +33,166 @@ def obtener_directorio_mes_actual():
     ruta_mes = os.path.join(DATA_DIR, mes_carpeta)
 
     if not os.path.exists(ruta_mes):
-        os.makedirs(ruta_mes)
+        os.makedirs(ruta_mes, exist_ok=True)
         print(f"📁 Creada nueva carpeta mensual: {ruta_mes}")
 
     return ruta_mes
 
 # Asegurar que el directorio base existe
-if not os.path.exists(DATA_DIR):
-    os.makedirs(DATA_DIR)
+os.makedirs(DATA_DIR, exist_ok=True)
 
 # ==========================================
 # PASO 1 Y 2: SCRAPER DE COMPRAR.GOB.AR
 # ==========================================
-def extraer_licitaciones():
-    print("🔍 Conectando con Comprar.gob.ar...")
-    url = "https://comprar.gob.ar/Compras.aspx?qs=W1HXHGHtH10="
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+# COMPRAR_URL permite apuntar el scraper al simulador local
+# (servidor_simulado.py) para pruebas de carga y de regresión.
+URL_COMPRAR = os.environ.get("COMPRAR_URL", "https://comprar.gob.ar/Compras.aspx?qs=W1HXHGHtH10=")
+PAGINAS_MAX = int(os.environ.get("COMPRAR_PAGINAS_MAX", "1"))
+# Vistas adicionales del listado, separadas por coma (fuente "comprar")
+URLS_COMPRAR = [u.strip() for u in os.environ.get("COMPRAR_URLS", URL_COMPRAR).split(",") if u.strip()]
+OBJETIVO_GRILLA = "ctl00$CPH1$GridLicitaciones"
+
+
+def encontrar_grilla(soup):
+    """Tabla principal de licitaciones (o la primera tabla si cambió el id)"""
+    tabla = soup.find("table", {"id": "ctl00_CPH1_GridLicitaciones"})
+    if not tabla:
+        tabla = soup.find("table")
+    return tabla
+
+
+def parsear_grilla(soup, url):
+    """Convierte la grilla de licitaciones en una lista de registros"""
+    tabla = encontrar_grilla(soup)
+    if not tabla:
+        return None
+
+    rows = tabla.find_all("tr")
+    datos = []
+
+    for row in rows[1:]:  # Omitir encabezado
+        # La fila paginadora del GridView trae una tabla anidada
+        if row.find("table") or row.find_parent("table") is not tabla:
+            continue
+        cols = row.find_all("td")
+        if len(cols) > 4:
+            nro_proceso = cols[1].text.strip()
+            detalle_texto = cols[2].text.strip()
+            tipo_proceso = cols[3].text.strip()
+            fecha_apertura = cols[4].text.strip()
+
+            link_tag = cols[2].find("a")
+            link_completo = urljoin(url, link_tag["href"]) if link_tag else url
+
+            datos.append({
+                "fecha": datetime.now().strftime("%Y-%m-%d"),
+                "nro_proceso": nro_proceso,
+                "detalle": detalle_texto,
+                "tipo_proceso": tipo_proceso,
+                "fecha_apertura": fecha_apertura,
+                "link": link_completo,
+                "fuente": "Scraper Automático Comprar",
+            })
+
+    return datos
+
+
+def formulario_pagina(soup, numero):
+    """
+    Arma el postback ASP.NET (__doPostBack) que pide la página 'numero'.
+    Retorna None si la grilla no ofrece esa página.
+    """
+    argumento = f"Page${numero}"
+    if f"'{OBJETIVO_GRILLA}','{argumento}'" not in str(soup):
+        return None
+
+    formulario = {
+        campo["name"]: campo.get("value", "")
+        for campo in soup.find_all("input", {"type": "hidden"})
+        if campo.get("name")
     }
+    formulario["__EVENTTARGET"] = OBJETIVO_GRILLA
+    formulario["__EVENTARGUMENT"] = argumento
+    return formulario
 
-    try:
-        response = requests.get(url, headers=headers, timeout=30)
+
+def recorrer_paginas(url, paginas_max, cliente=None):
+    """
+    Genera (numero, soup) por cada página de la grilla.
+    Paginación por postback: cada página trae el VIEWSTATE de la siguiente,
+    así que quien consume puede cortar el recorrido en cualquier momento.
+    """
+    # Cliente compartido: keep-alive, reintentos con backoff y disyuntor
+    cliente = cliente or obtener_cliente()
+    response = cliente.get(url)
+    soup = BeautifulSoup(response.text, "html.parser")
+    yield 1, soup
+
+    for numero in range(2, paginas_max + 1):
+        formulario = formulario_pagina(soup, numero)
+        if formulario is None:
+            break
+        response = cliente.post(url, data=formulario)
         soup = BeautifulSoup(response.text, "html.parser")
+        yield numero, soup
 
-        # Intentar localizar la tabla principal
-        tabla = soup.find("table", {"id": "ctl00_CPH1_GridLicitaciones"})
-        if not tabla:
-            tabla = soup.find("table")
 
-        if not tabla:
-            print("❌ No se encontró la tabla de licitaciones.")
-            return pd.DataFrame()
+def extraer_licitaciones(url=None, paginas_max=None):
+    print("🔍 Conectando con Comprar.gob.ar...")
+    url = url or URL_COMPRAR
+    paginas_max = paginas_max or PAGINAS_MAX
 
-        rows = tabla.find_all("tr")
+    try:
         datos = []
-
-        for row in rows[1:]:  # Omitir encabezado
-            cols = row.find_all("td")
-            if len(cols) > 4:
-                nro_proceso = cols[1].text.strip()
-                detalle_texto = cols[2].text.strip()
-                tipo_proceso = cols[3].text.strip()
-                fecha_apertura = cols[4].text.strip()
-
-                link_tag = cols[2].find("a")
-                link_completo = "https://comprar.gob.ar" + link_tag["href"] if link_tag else url
-
-                datos.append({
-                    "fecha": datetime.now().strftime("%Y-%m-%d"),
-                    "nro_proceso": nro_proceso,
-                    "detalle": detalle_texto,
-                    "tipo_proceso": tipo_proceso,
-                    "fecha_apertura": fecha_apertura,
-                    "link": link_completo,
-                    "fuente": "Scraper Automático Comprar",
-                })
+        for numero, soup in recorrer_paginas(url, paginas_max):
+            filas = parsear_grilla(soup, url)
+            if filas is None and numero == 1:
+                print("❌ No se encontró la tabla de licitaciones.")
+                return pd.DataFrame()
+            datos += filas or []
 
         print(f"✅ Éxito: Se extrajeron {len(datos)} procesos del portal.")
-        return pd.DataFrame(datos)
+        return aplicar_esquema(pd.DataFrame(datos)) if datos else pd.DataFrame()
 
     except Exception as e:
         print(f"❌ Error en Scraping: {e}")
         return pd.DataFrame()
 
+@registrar_fuente("comprar")
+class FuenteComprar(Fuente):
+    """Listados de Comprar.gob.ar; cada URL (vista del listado) es una tarea"""
+
+    descripcion = "Scraper Automático Comprar"
+
+    def __init__(self, urls=None, paginas_max=None, workers=2):
+        self.urls = urls or URLS_COMPRAR
+        self.paginas_max = paginas_max or PAGINAS_MAX
+        self.workers = workers
+
+    def tareas(self):
+        return self.urls
+
+    def obtener(self, url, cliente):
+        # Las páginas de un mismo listado son secuenciales (VIEWSTATE)
+        return [soup for _, soup in recorrer_paginas(url, self.paginas_max, cliente)]
+
+    def parsear(self, paginas, url):
+        if paginas and encontrar_grilla(paginas[0]) is None:
+            raise ValueError(f"No se encontró la tabla de licitaciones en {url}")
+        return [fila for soup in paginas for fila in parsear_grilla(soup, url) or []]
+
+
 # ==========================================
 # PASO 3: ANÁLISIS Y GENERACIÓN DE REPORTE
 # ==========================================
 def ejecutar_robot():
     start_time = datetime.now()
-    print(f"\n--- INICIO PROCESO DIARIO: {start_time.strftime('%Y-%m-%d %H:%M')} ---")
+    id_corrida = nuevo_id_corrida()
+    print(f"\n--- INICIO PROCESO DIARIO: {start_time.strftime('%Y-%m-%d %H:%M')} (corrida {id_corrida}) ---")
 
     directorio_mes = obtener_directorio_mes_actual()
-    df_portal = extraer_licitaciones()
+    # Todas las fuentes habilitadas (FUENTES) en paralelo, con fallas aisladas
+    df_portal, _ = ejecutar_fuentes(fuentes_habilitadas())
 
     if df_portal.empty:
         print("⚠️ No se obtuvieron datos. Generando registro de control vacío.")
@@ -105,33 +205,36 @@ def ejecutar_robot():
         }])
     else:
         df_portal["detalle"] = df_portal["detalle"].fillna("Sin descripción")
+        if ANEXOS_HABILITADO:
+            # Pliegos y anexos: descarga con caché y extracción en un pool de procesos
+            df_portal = agregar_texto_anexos(df_portal, data_dir=DATA_DIR)
 
     print("🧠 Aplicando Matriz de Análisis XAI (Ph.D. Monteverde)...")
 
-    # Intentar enviar los datos al análisis con manejo de archivado inteligente
-    try:
-        # Intento 1: Análisis con carpeta de destino (Requiere actualización en analisis.py)
-        df_final, path_excel, _ = analizar_boletin(df_portal, directorio_mes)
-    except TypeError:
-        # Intento 2: Fallback si analisis.py no acepta el segundo parámetro
-        print("⚠️ Nota: Usando modo compatibilidad (analisis.py antiguo).")
-        df_final, path_excel, _ = analizar_boletin(df_portal)
-
-        # Si el archivo quedó en 'data/' raíz, moverlo a la carpeta del mes
-        if path_excel and os.path.exists(path_excel):
-            nombre_archivo = os.path.basename(path_excel)
-            nueva_ruta = os.path.join(directorio_mes, nombre_archivo)
-            shutil.move(path_excel, nueva_ruta)
-            path_excel = nueva_ruta
-            print(f"📦 Archivo organizado en: {path_excel}")
+    # Otra corrida del mismo día (servicio scraper, botón de main.py) espera
+    # su turno: el reporte y el delta del día salen de la misma corrida
+    with bloqueo_particion(DATA_DIR, start_time.strftime("%Y-%m-%d")):
+        df_final, path_excel, _ = analizar_boletin(df_portal, directorio_mes, id_corrida)
+
+        if MODO_ALMACENAMIENTO == "deltas" and not df_final.empty:
+            escribir_delta(df_final, start_time.strftime("%Y-%m-%d"), DATA_DIR)
+
+    if MODELO_LINEAL_HABILITADO:
+        # El reporte de hoy (ya etiquetado por la matriz) entrena al modelo para mañana
+        actualizar_modelo(DATA_DIR)
 
     # Resultados Finales
     if path_excel and os.path.exists(path_excel):
         print(f"\n✨ REPORTE GENERADO: {path_excel}")
-        if "indice_total" in df_final.columns:
-            top_riesgo = df_final.sort_values(by="indice_total", ascending=False).head(3)
+        # Del índice persistido (top_riesgo.py): el día y el mes sin reordenar reportes
+        hoy = start_time.strftime("%Y-%m-%d")
+        top_dia = top_a_tabla(consultar_top(DATA_DIR, 3, desde=hoy, hasta=hoy))
+        if not top_dia.empty:
             print("\n🚨 ALERTAS DE MAYOR RIESGO DETECTADAS:")
-            print(top_riesgo[["detalle", "indice_total"]])
+            print(top_dia[["detalle", "tipo_decision", "indice_fenomeno_corruptivo"]])
+            top_mes = top_a_tabla(consultar_top(DATA_DIR, 3, desde=f"{hoy[:7]}-01", hasta=ultimo_dia(hoy[:7])))
+            print("\n📅 MAYOR RIESGO EN LO QUE VA DEL MES:")
+            print(top_mes[["fecha", "detalle", "tipo_decision", "indice_fenomeno_corruptivo"]])
     else:
         print("❌ Error crítico: El reporte no pudo ser generado.")
 
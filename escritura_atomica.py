@@ -0,0 +1,149 @@
+import os
+import time
+import secrets
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: los bloqueos solo excluyen hilos del mismo proceso
+    fcntl = None
+
+# ==========================================
+# ESCRITURAS ATÓMICAS Y BLOQUEOS POR DÍA
+# ==========================================
+# El robot (diario.py), el servicio "scraper" de docker compose y el botón
+# de main.py pueden correr a la vez sobre el mismo volumen data/, mientras
+# los dashboards leen. Reglas para cualquier archivo que se publique ahí:
+#
+#   1. Se escribe en un temporal oculto del mismo directorio, nombrado con
+#      el id de la corrida (.reporte_...xlsx.<id>.tmp), se hace fsync y se
+#      renombra de una vez: un lector ve el archivo anterior o el nuevo
+#      completo, nunca uno a medio escribir.
+#   2. Cada día es una partición con su bloqueo (data/.bloqueos/dia_*.lock,
+#      flock exclusivo): dos corridas del mismo día se turnan y la última
+#      deja el reporte, el catálogo y la instantánea coherentes entre sí.
+#   3. Los archivos compartidos por todos los días (catálogo, estado de
+#      anomalías, índice de instantáneas) se leen-modifican-escriben con su
+#      propio bloqueo, siempre por dentro del bloqueo del día.
+#
+# Los bloqueos son reentrantes dentro de un mismo hilo: diario.py toma el
+# del día y analizar_boletin() vuelve a pedirlo sin trabarse.
+
+DIRECTORIO_BLOQUEOS = ".bloqueos"
+TIMEOUT_BLOQUEO = float(os.environ.get("BLOQUEO_TIMEOUT", "600"))
+ESPERA_REINTENTO = 0.2
+
+
+def nuevo_id_corrida():
+    """Identificador de una corrida: fecha-hora, pid y sufijo aleatorio"""
+    return f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}-{secrets.token_hex(3)}"
+
+
+# ==========================================
+# ESCRITURA ATÓMICA
+# ==========================================
+def ruta_temporal(ruta, id_corrida=None):
+    directorio, nombre = os.path.split(os.path.abspath(ruta))
+    return os.path.join(directorio, f".{nombre}.{id_corrida or nuevo_id_corrida()}.tmp")
+
+
+def _fsync(ruta, directorio=False):
+    banderas = os.O_RDONLY | (getattr(os, "O_DIRECTORY", 0) if directorio else 0)
+    try:
+        fd = os.open(ruta, banderas)
+    except OSError:  # Windows no permite abrir directorios
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def publicar(temporal, ruta):
+    """fsync del temporal, rename atómico sobre 'ruta' y fsync del directorio"""
+    _fsync(temporal)
+    os.replace(temporal, ruta)
+    _fsync(os.path.dirname(os.path.abspath(ruta)), directorio=True)
+
+
+@contextmanager
+def archivo_atomico(ruta, id_corrida=None):
+    """
+    Uso:
+        with archivo_atomico(ruta) as temporal:
+            df.to_parquet(temporal)
+    Si el bloque falla, 'ruta' queda como estaba y el temporal se borra.
+    """
+    temporal = ruta_temporal(ruta, id_corrida)
+    try:
+        yield temporal
+        publicar(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+
+# ==========================================
+# BLOQUEOS ENTRE PROCESOS
+# ==========================================
+_registro = threading.Lock()
+_bloqueos = {}
+
+
+def ruta_bloqueo(data_dir, nombre):
+    return os.path.abspath(os.path.join(data_dir, DIRECTORIO_BLOQUEOS, f"{nombre}.lock"))
+
+
+def _tomar_archivo(ruta, timeout):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    fd = os.open(ruta, os.O_RDWR | os.O_CREAT, 0o644)
+    if fcntl is None:
+        return fd
+    limite = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except BlockingIOError:
+            if limite is not None and time.monotonic() >= limite:
+                os.close(fd)
+                raise TimeoutError(f"{os.path.basename(ruta)} sigue tomado por otra corrida")
+            time.sleep(ESPERA_REINTENTO)
+
+
+def _soltar_archivo(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    os.close(fd)
+
+
+@contextmanager
+def bloqueo(data_dir, nombre, timeout=TIMEOUT_BLOQUEO):
+    """Bloqueo exclusivo y reentrante sobre data/.bloqueos/<nombre>.lock"""
+    ruta = ruta_bloqueo(data_dir, nombre)
+    with _registro:
+        estado = _bloqueos.setdefault(ruta, {"hilos": threading.RLock(), "fd": None, "cuenta": 0})
+    if not estado["hilos"].acquire(timeout=-1 if timeout is None else timeout):
+        raise TimeoutError(f"{nombre} sigue tomado por otro hilo")
+    try:
+        if estado["cuenta"] == 0:
+            estado["fd"] = _tomar_archivo(ruta, timeout)
+        estado["cuenta"] += 1
+        try:
+            yield
+        finally:
+            estado["cuenta"] -= 1
+            if estado["cuenta"] == 0:
+                _soltar_archivo(estado["fd"])
+                estado["fd"] = None
+    finally:
+        estado["hilos"].release()
+
+
+def bloqueo_particion(data_dir, fecha, timeout=TIMEOUT_BLOQUEO):
+    """Bloqueo de la partición de un día (fecha YYYY-MM-DD)"""
+    return bloqueo(data_dir, f"dia_{fecha}", timeout)
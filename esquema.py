@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# ESQUEMA VERSIONADO DE LOS REPORTES
+# ==========================================
+# Definición única de columnas y tipos compartida por el scraper, el motor
+# de análisis, el almacenamiento (xlsx, sidecar .arrow, deltas) y los
+# dashboards. Las columnas de baja cardinalidad se guardan como categorías
+# (códigos int8 en memoria), el índice como float32 y los montos como
+# float64 (los miles de millones no entran con precisión en float32).
+#
+# Los reportes antiguos se actualizan una sola vez: al escribir su sidecar
+# (cache_columnar.py) o al migrarlos; las lecturas siguientes ya reciben
+# los datos tipados y no vuelven a normalizar nada.
+
+# Cambiar este valor invalida todos los sidecars existentes
+VERSION_ESQUEMA = 6
+
+# Mapeo de nombres antiguos a nuevos para compatibilidad histórica
+MAPEO_HISTORICO = {
+    "indice_total": "indice_fenomeno_corruptivo",
+    "nivel_riesgo": "nivel_riesgo_teorico",
+    "origen": "transferencia",
+}
+
+# Columnas auxiliares que no se persisten (texto_clean: versiones anteriores
+# lo guardaban por error; texto_anexos: solo alimenta la matriz)
+COLUMNAS_DESCARTABLES = ["texto_clean", "texto_anexos"]
+
+NIVELES_ORDENADOS = ["Bajo", "Medio", "Alto"]
+
+COLUMNAS_CATEGORICAS = [
+    "tipo_proceso",
+    "fuente",
+    "organismo",
+    "proveedor",
+    "seccion",
+    "tipo_decision",
+    "transferencia",
+    "tipo_decision_modelo",
+]
+COLUMNAS_MONTO = ["monto_ars", "monto_usd", "porcentaje"]
+COLUMNA_NIVEL = "nivel_riesgo_teorico"
+COLUMNA_INDICE = "indice_fenomeno_corruptivo"
+COLUMNA_CONFIANZA = "confianza_modelo"
+# fecha_apertura es texto libre del portal ("30/03/2026 10:00 Hrs."); apertura
+# es la misma fecha ya parseada, para ordenar y filtrar por rango
+COLUMNA_APERTURA = "apertura"
+
+# Día / mes / año (2 o 4 dígitos) y hora opcional, sin tomar pedazos de una fecha ISO
+PATRON_FECHA = (
+    r"(?<!\d)(?P<dia>\d{1,2})[/.-](?P<mes>\d{1,2})[/.-](?P<anio>\d{4}|\d{2})(?!\d)"
+    r"(?:\D{1,3}(?P<hora>\d{1,2})[:.](?P<minuto>\d{2}))?"
+)
+
+# Orden canónico (las columnas extra de reportes viejos van al final)
+COLUMNAS = [
+    "fecha",
+    "nro_proceso",
+    "detalle",
+    "tipo_proceso",
+    "fecha_apertura",
+    COLUMNA_APERTURA,
+    "link",
+    "anexos",
+    "fuente",
+    "organismo",
+    "proveedor",
+    "seccion",
+    "norma",
+    "monto_ars",
+    "monto_usd",
+    "porcentaje",
+    "tipo_decision",
+    "transferencia",
+    "tipo_decision_modelo",
+    COLUMNA_CONFIANZA,
+    COLUMNA_INDICE,
+    COLUMNA_NIVEL,
+]
+
+
+def _como_categoria(serie, categorias=None):
+    """Categoría de textos; los valores no previstos se agregan al final"""
+    texto = serie.where(serie.isna(), serie.astype(str))
+    if categorias is None:
+        return texto.astype("category")
+    extras = sorted(set(texto.dropna().unique()) - set(categorias))
+    return texto.astype(pd.CategoricalDtype(list(categorias) + extras, ordered=True))
+
+
+def fecha_argentina(serie):
+    """
+    '30/03/2026 10:00 Hrs.' -> Timestamp (día primero) sobre toda la Serie;
+    también acepta ISO (2026-03-30). NaT si no parsea ("n/a", vacío). Las
+    fechas se repiten mucho: se parsea cada texto distinto una sola vez.
+    """
+    codigos, valores = pd.factorize(serie.astype("string"))
+    if len(valores) == 0:
+        return pd.Series(pd.NaT, index=serie.index, dtype="datetime64[s]")
+    valores = pd.Series(valores, dtype="string")
+    partes = valores.str.extract(PATRON_FECHA).apply(pd.to_numeric, errors="coerce").astype("float64")
+    con_fecha = partes["dia"].notna()
+    partes = partes[con_fecha].fillna({"hora": 0, "minuto": 0}).astype("int64")
+    partes["anio"] = partes["anio"].where(partes["anio"] >= 100, partes["anio"] + 2000)
+    fechas = pd.Series(pd.NaT, index=valores.index, dtype="datetime64[s]")
+    fechas[con_fecha] = pd.to_datetime(
+        partes.rename(columns={"anio": "year", "mes": "month", "dia": "day", "hora": "hour", "minuto": "minute"}),
+        errors="coerce",
+    )
+    if not con_fecha.all():  # ISO (2026-03-30) u otros formatos que entiende pandas
+        fechas[~con_fecha] = pd.to_datetime(valores[~con_fecha], format="ISO8601", errors="coerce")
+    fechas = fechas.astype("datetime64[s]").to_numpy()
+    resultado = np.where(codigos >= 0, fechas[np.maximum(codigos, 0)], np.datetime64("NaT", "s"))
+    return pd.Series(resultado, index=serie.index, dtype="datetime64[s]")
+
+
+def aplicar_esquema(df):
+    """
+    Renombra columnas históricas, descarta auxiliares y duplicadas, asegura
+    las columnas críticas y aplica los tipos compactos. Es idempotente.
+    """
+    renombres = {}
+    for viejo, nuevo in MAPEO_HISTORICO.items():
+        if viejo in df.columns:
+            if nuevo in df.columns:
+                df = df.drop(columns=viejo)
+            else:
+                renombres[viejo] = nuevo
+    df = df.rename(columns=renombres)
+    df = df.loc[:, ~df.columns.duplicated()]
+    df = df.drop(columns=[c for c in COLUMNAS_DESCARTABLES if c in df.columns])
+
+    if COLUMNA_INDICE not in df.columns:
+        df[COLUMNA_INDICE] = 0.0
+    if "tipo_decision" not in df.columns:
+        df["tipo_decision"] = "No identificado"
+
+    df = df.copy()
+    df[COLUMNA_INDICE] = pd.to_numeric(df[COLUMNA_INDICE], errors="coerce").fillna(0.0).astype("float32")
+    if COLUMNA_CONFIANZA in df.columns and df[COLUMNA_CONFIANZA].dtype != "float32":
+        df[COLUMNA_CONFIANZA] = pd.to_numeric(df[COLUMNA_CONFIANZA], errors="coerce").astype("float32")
+    if "fecha_apertura" in df.columns and not pd.api.types.is_datetime64_any_dtype(df.get(COLUMNA_APERTURA)):
+        df[COLUMNA_APERTURA] = fecha_argentina(df["fecha_apertura"])
+    for col in COLUMNAS_MONTO:
+        if col in df.columns and df[col].dtype != "float64":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    for col in COLUMNAS_CATEGORICAS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = _como_categoria(df[col])
+    if COLUMNA_NIVEL in df.columns and not (
+        isinstance(df[COLUMNA_NIVEL].dtype, pd.CategoricalDtype) and df[COLUMNA_NIVEL].dtype.ordered
+    ):
+        df[COLUMNA_NIVEL] = _como_categoria(df[COLUMNA_NIVEL], NIVELES_ORDENADOS)
+
+    conocidas = [c for c in COLUMNAS if c in df.columns]
+    return df[conocidas + [c for c in df.columns if c not in conocidas]]
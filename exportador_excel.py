@@ -0,0 +1,129 @@
+import pandas as pd
+from openpyxl import Workbook
+from escritura_atomica import archivo_atomico
+
+# ==========================================
+# EXPORTADOR EXCEL EN STREAMING (openpyxl write-only)
+# ==========================================
+# Los consumidores (main.py, dashboard.py, sugeridor_reglas.py) esperan
+# encontrar las hojas "Analisis" y "Glosario". El modo write-only de openpyxl
+# vuelca cada fila a disco a medida que se agrega, por lo que la memoria
+# usada no crece con el tamaño del reporte. El libro se guarda en un
+# temporal y se publica con un rename atómico: los dashboards nunca leen
+# un reporte a medio escribir.
+
+HOJA_ANALISIS = "Analisis"
+HOJA_GLOSARIO = "Glosario"
+HOJA_ANOMALIAS = "Anomalias"
+
+GLOSARIO = {
+    "fecha": "Fecha de extracción del proceso.",
+    "seccion": "Sección del Boletín Oficial.",
+    "nro_proceso": "Número de proceso en Comprar.gob.ar.",
+    "detalle": "Texto de la norma o del proceso de compra.",
+    "tipo_proceso": "Modalidad de contratación.",
+    "fecha_apertura": "Fecha de apertura de ofertas.",
+    "apertura": "Fecha de apertura ya interpretada (día/mes/año y hora), para ordenar y filtrar.",
+    "link": "Enlace a la publicación original.",
+    "anexos": "Documentos adjuntos (pliegos, anexos) leídos por la matriz.",
+    "fuente": "Origen de los datos.",
+    "organismo": "Organismo que emite la norma o convoca el proceso.",
+    "proveedor": "Proveedor adjudicatario, cuando se conoce.",
+    "norma": "Identificador GDE de la norma (p. ej. DECTO-2026-25-APN-PTE).",
+    "monto_ars": "Suma de los montos en pesos mencionados en el detalle.",
+    "monto_usd": "Suma de los montos en dólares mencionados en el detalle.",
+    "porcentaje": "Mayor porcentaje mencionado (aumentos, alícuotas).",
+    "tipo_decision": "Escenario teórico (Monteverde, 2020).",
+    "transferencia": "Dirección de la transferencia regresiva.",
+    "tipo_decision_modelo": "Escenario sugerido por el clasificador lineal entrenado con el histórico.",
+    "confianza_modelo": "Probabilidad (0-1) del escenario sugerido por el clasificador.",
+    "indice_fenomeno_corruptivo": "Intensidad del fenómeno (0-10), ponderada por monto.",
+    "nivel_riesgo_teorico": "Alto (>=8), Medio (>=5) o Bajo.",
+}
+
+
+def tabla_glosario(columnas):
+    """Mismo contenido que la hoja Glosario, sin abrir el libro"""
+    return pd.DataFrame([(c, GLOSARIO.get(c, "")) for c in columnas], columns=["Columna", "Descripción"])
+
+
+class EscritorReporteExcel:
+    """
+    Escribe un reporte por lotes sin mantener el libro en memoria.
+    Uso:
+        with EscritorReporteExcel(path) as escritor:
+            for lote in lotes:
+                escritor.agregar_lote(lote)
+    """
+
+    def __init__(self, path, id_corrida=None):
+        self.path = path
+        self.id_corrida = id_corrida
+        self.columnas = None
+        self.filas = 0
+        self._wb = Workbook(write_only=True)
+        self._hoja_analisis = self._wb.create_sheet(HOJA_ANALISIS)
+        self._hoja_glosario = self._wb.create_sheet(HOJA_GLOSARIO)
+
+    def agregar_lote(self, df):
+        """Agrega las filas del DataFrame a la hoja Analisis"""
+        if self.columnas is None:
+            # El primer lote fija el encabezado y el glosario del reporte
+            self.columnas = list(df.columns)
+            self._hoja_analisis.append(self.columnas)
+            self._escribir_glosario()
+
+        lote = df.reindex(columns=self.columnas).astype(object)
+        lote = lote.where(lote.notna(), None)
+        for fila in lote.itertuples(index=False, name=None):
+            self._hoja_analisis.append(fila)
+        self.filas += len(lote)
+
+    def agregar_hoja(self, nombre, df):
+        """Hoja adicional pequeña (p. ej. anomalías del día), escrita de una vez"""
+        hoja = self._wb.create_sheet(nombre)
+        hoja.append(list(df.columns))
+        datos = df.astype(object).where(df.notna(), None)
+        for fila in datos.itertuples(index=False, name=None):
+            hoja.append(fila)
+
+    def _escribir_glosario(self):
+        glosario = tabla_glosario(self.columnas)
+        self._hoja_glosario.append(list(glosario.columns))
+        for fila in glosario.itertuples(index=False, name=None):
+            self._hoja_glosario.append(list(fila))
+
+    def cerrar(self):
+        if self.columnas is None:
+            # Reporte vacío: igual se dejan ambas hojas con encabezado
+            self._hoja_glosario.append(["Columna", "Descripción"])
+        with archivo_atomico(self.path, self.id_corrida) as temporal:
+            self._wb.save(temporal)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.cerrar()
+        return False
+
+
+def exportar_reporte_excel(df, path, tamano_lote=5000, hojas_extra=None, id_corrida=None):
+    """Exporta un DataFrame completo en lotes de tamano_lote filas"""
+    with EscritorReporteExcel(path, id_corrida) as escritor:
+        for inicio in range(0, len(df), tamano_lote):
+            escritor.agregar_lote(df.iloc[inicio : inicio + tamano_lote])
+        if escritor.columnas is None:
+            escritor.agregar_lote(df)
+        for nombre, extra in (hojas_extra or {}).items():
+            escritor.agregar_hoja(nombre, extra)
+    return path
+
+
+def exportar_lotes_excel(lotes, path, id_corrida=None):
+    """Exporta un iterable de DataFrames (pipeline en streaming)"""
+    with EscritorReporteExcel(path, id_corrida) as escritor:
+        for lote in lotes:
+            escritor.agregar_lote(lote)
+    return path
@@ -0,0 +1,186 @@
+import os
+import re
+import time
+from datetime import datetime
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as TiempoAgotado
+import pandas as pd
+from bs4 import BeautifulSoup
+from cliente_http import obtener_cliente
+from esquema import aplicar_esquema
+
+# ==========================================
+# REGISTRO DE FUENTES DE DATOS
+# ==========================================
+# Cada fuente (un listado de Comprar, el BORA, un portal provincial...)
+# implementa tres pasos: obtener (red), parsear (HTML -> registros) y
+# normalizar (registros -> esquema común). El registro corre todas las
+# fuentes habilitadas a la vez, cada una con su propio pool de workers,
+# su timeout y aislamiento de fallas: el tiempo total lo marca la fuente
+# más lenta y una fuente caída no tira abajo a las demás.
+#
+# Habilitar con FUENTES="comprar,bora" (por defecto solo comprar). La
+# fuente "comprar" se registra en diario.py, junto al parser de la grilla.
+
+TIMEOUT_FUENTE = float(os.environ.get("FUENTES_TIMEOUT", "600"))
+
+FUENTES_REGISTRADAS = {}
+
+
+def registrar_fuente(nombre):
+    """Decorador: expone la clase bajo 'nombre' para FUENTES"""
+    def decorar(clase):
+        clase.nombre = nombre
+        FUENTES_REGISTRADAS[nombre] = clase
+        return clase
+    return decorar
+
+
+class Fuente:
+    nombre = "base"
+    descripcion = ""
+    workers = 1
+    timeout = TIMEOUT_FUENTE
+
+    def tareas(self):
+        """Unidades independientes (URLs, secciones) que se reparten entre los workers"""
+        return [None]
+
+    def obtener(self, tarea, cliente):
+        raise NotImplementedError
+
+    def parsear(self, crudo, tarea):
+        raise NotImplementedError
+
+    def normalizar(self, registros):
+        df = pd.DataFrame(registros)
+        if df.empty:
+            return df
+        if "fecha" not in df.columns:
+            df["fecha"] = datetime.now().strftime("%Y-%m-%d")
+        if "fuente" not in df.columns:
+            df["fuente"] = self.descripcion or self.nombre
+        return aplicar_esquema(df)
+
+    def _procesar(self, tarea, cliente):
+        return self.parsear(self.obtener(tarea, cliente), tarea)
+
+    def extraer(self, cliente):
+        tareas = self.tareas()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(tareas)))) as pool:
+            partes = list(pool.map(lambda t: self._procesar(t, cliente), tareas))
+        return self.normalizar([r for parte in partes for r in parte])
+
+
+# ==========================================
+# BOLETÍN OFICIAL (BORA)
+# ==========================================
+URL_BORA = os.environ.get("BORA_URL", "https://www.boletinoficial.gob.ar")
+SECCIONES_BORA = [s.strip() for s in os.environ.get("BORA_SECCIONES", "primera,tercera").split(",") if s.strip()]
+PATRON_AVISO = re.compile(r"/detalleAviso/([^/]+)/(\d+)")
+PATRON_TIPO_NORMA = re.compile(r"^(.*?)\s+[\d/]+\s*$")
+
+
+@registrar_fuente("bora")
+class FuenteBORA(Fuente):
+    descripcion = "Boletín Oficial"
+
+    def __init__(self, url_base=None, secciones=None, workers=4):
+        self.url_base = url_base or URL_BORA
+        self.secciones = secciones or SECCIONES_BORA
+        self.workers = workers
+
+    def tareas(self):
+        return self.secciones
+
+    def obtener(self, seccion, cliente):
+        url = f"{self.url_base.rstrip('/')}/seccion/{seccion}"
+        respuesta = cliente.get(url)
+        respuesta.raise_for_status()
+        return respuesta.text
+
+    def parsear(self, html, seccion):
+        """Cada div.linea-aviso: p.item = organismo, p.item-detalle = norma y resumen"""
+        soup = BeautifulSoup(html, "html.parser")
+        registros = []
+        for aviso in soup.select("div.linea-aviso"):
+            organismo = aviso.select_one("p.item")
+            detalles = [p.get_text(" ", strip=True) for p in aviso.select("p.item-detalle")]
+            enlace = aviso.find_parent("a")
+            href = enlace.get("href", "") if enlace else ""
+            m = PATRON_AVISO.search(href)
+            tipo = PATRON_TIPO_NORMA.match(detalles[0]) if detalles else None
+
+            registros.append(
+                {
+                    "nro_proceso": f"BORA-{m.group(1)}-{m.group(2)}" if m else None,
+                    "detalle": " - ".join(detalles) or "Sin descripción",
+                    "tipo_proceso": tipo.group(1) if tipo else (detalles[0] if detalles else None),
+                    "link": urljoin(self.url_base, href) if href else self.url_base,
+                    "organismo": organismo.get_text(" ", strip=True) if organismo else None,
+                    "seccion": seccion,
+                    "fuente": f"{self.descripcion} - {seccion}",
+                }
+            )
+        return registros
+
+
+# ==========================================
+# EJECUCIÓN CONCURRENTE
+# ==========================================
+def fuentes_habilitadas(nombres=None):
+    """Instancia las fuentes pedidas (o las de la variable FUENTES)"""
+    if nombres is None:
+        nombres = os.environ.get("FUENTES", "comprar").split(",")
+    fuentes = []
+    for nombre in (n.strip() for n in nombres):
+        if not nombre:
+            continue
+        if nombre not in FUENTES_REGISTRADAS:
+            print(f"⚠️ Fuente desconocida, se ignora: {nombre}")
+            continue
+        fuentes.append(FUENTES_REGISTRADAS[nombre]())
+    return fuentes
+
+
+def _extraer_medido(fuente, cliente):
+    inicio = time.monotonic()
+    df = fuente.extraer(cliente)
+    return df, time.monotonic() - inicio
+
+
+def ejecutar_fuentes(fuentes, cliente=None):
+    """
+    Corre todas las fuentes en paralelo. Retorna (df_unificado, resultados),
+    con un resultado por fuente: estado ok / error / timeout, filas y segundos.
+    """
+    cliente = cliente or obtener_cliente()
+    if not fuentes:
+        return pd.DataFrame(), []
+
+    pool = ThreadPoolExecutor(max_workers=len(fuentes), thread_name_prefix="fuente")
+    inicio = time.monotonic()
+    futuros = [(fuente, pool.submit(_extraer_medido, fuente, cliente)) for fuente in fuentes]
+
+    partes, resultados = [], []
+    for fuente, futuro in futuros:
+        resultado = {"fuente": fuente.nombre, "estado": "ok", "filas": 0, "segundos": None, "error": None}
+        restante = max(0.0, fuente.timeout - (time.monotonic() - inicio))
+        try:
+            df, segundos = futuro.result(timeout=restante)
+            resultado.update(filas=len(df), segundos=round(segundos, 2))
+            if len(df):
+                partes.append(df)
+        except TiempoAgotado:
+            resultado.update(estado="timeout", error=f"Sin respuesta en {fuente.timeout:.0f}s")
+        except Exception as e:
+            resultado.update(estado="error", error=str(e))
+        resultados.append(resultado)
+
+        icono = "✅" if resultado["estado"] == "ok" else "❌"
+        print(f"{icono} Fuente {fuente.nombre}: {resultado['estado']}, {resultado['filas']} filas")
+
+    # No se espera a una fuente colgada; sus pedidos cortan por el timeout del cliente
+    pool.shutdown(wait=False, cancel_futures=True)
+    df = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+    return (aplicar_esquema(df) if len(df) else df), resultados
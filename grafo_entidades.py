@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# ==========================================
+# GRAFO ORGANISMO ↔ PROVEEDOR ↔ PROCESO
+# ==========================================
+# La teoría de Monteverde habla de transferencias regresivas hacia
+# beneficiarios concretos. Este módulo enlaza cada proceso con el organismo
+# que decide y el proveedor que resulta beneficiado, usando matrices de
+# incidencia dispersas (CSR):
+#
+#   O  (organismos x procesos)   P  (proveedores x procesos)
+#   A = O @ P.T                  (organismos x proveedores: adjudicaciones)
+#
+# Todas las métricas por organismo salen de operaciones vectorizadas sobre
+# A, sin bucles por fila, por lo que escala a cientos de miles de procesos.
+
+COL_ORGANISMO = "organismo"
+COL_PROVEEDOR = "proveedor"
+PATRON_DIRECTA = "contrataci[oó]n directa"
+
+
+class GrafoEntidades:
+    def __init__(self, organismos, proveedores, procesos, organismo_proceso, proveedor_proceso, directa):
+        self.organismos = organismos  # Index de etiquetas (filas de O y A)
+        self.proveedores = proveedores  # Index de etiquetas (filas de P, columnas de A)
+        self.procesos = procesos  # Index de claves de proceso (columnas de O y P)
+        self.organismo_proceso = organismo_proceso
+        self.proveedor_proceso = proveedor_proceso
+        self.directa = directa  # Vector 0/1 por proceso
+        self.organismo_proveedor = (organismo_proceso @ proveedor_proceso.T).tocsr()
+
+    @property
+    def forma(self):
+        return len(self.organismos), len(self.proveedores), len(self.procesos)
+
+
+def _incidencia(codigos_fila, codigos_columna, n_filas, n_columnas):
+    """Matriz 0/1: una arista por par (fila, columna) presente"""
+    validos = (codigos_fila >= 0) & (codigos_columna >= 0)
+    datos = np.ones(int(validos.sum()))
+    matriz = sparse.coo_matrix(
+        (datos, (codigos_fila[validos], codigos_columna[validos])), shape=(n_filas, n_columnas)
+    ).tocsr()
+    # Un proceso repetido (mismo día o varios reportes) cuenta una sola vez
+    matriz.data[:] = 1.0
+    return matriz
+
+
+def construir_grafo(df):
+    """Arma el grafo a partir de procesos con organismo y (opcional) proveedor"""
+    if "nro_proceso" in df.columns:
+        claves = df["nro_proceso"].astype(str)
+    else:
+        claves = df["link"].astype(str) + "|" + df["detalle"].astype(str)
+    cod_proceso, procesos = pd.factorize(claves)
+
+    def factorizar(columna):
+        if columna not in df.columns:
+            return np.full(len(df), -1), pd.Index([])
+        return pd.factorize(df[columna].astype("string").str.strip().replace("", pd.NA))
+
+    cod_organismo, organismos = factorizar(COL_ORGANISMO)
+    cod_proveedor, proveedores = factorizar(COL_PROVEEDOR)
+
+    o = _incidencia(cod_organismo, cod_proceso, len(organismos), len(procesos))
+    p = _incidencia(cod_proveedor, cod_proceso, len(proveedores), len(procesos))
+
+    directa = np.zeros(len(procesos))
+    if "tipo_proceso" in df.columns:
+        es_directa = df["tipo_proceso"].astype(str).str.contains(PATRON_DIRECTA, case=False, regex=True).to_numpy()
+        directa[cod_proceso[es_directa]] = 1.0
+
+    return GrafoEntidades(pd.Index(organismos), pd.Index(proveedores), pd.Index(procesos), o, p, directa)
+
+
+def metricas_por_organismo(grafo):
+    """
+    Por organismo:
+      procesos            procesos distintos
+      adjudicados         procesos con proveedor identificado
+      proveedores         proveedores distintos
+      hhi                 Herfindahl-Hirschman de las adjudicaciones (0-10000)
+      ratio_repetidos     share de adjudicaciones a proveedores que ganaron 2+ veces
+      ratio_directa       share de procesos por contratación directa
+      proveedor_principal y share_principal
+    """
+    n_org = len(grafo.organismos)
+    if n_org == 0:
+        return pd.DataFrame(
+            columns=[
+                "organismo", "procesos", "adjudicados", "proveedores", "hhi",
+                "ratio_repetidos", "ratio_directa", "proveedor_principal", "share_principal",
+            ]
+        )
+
+    o = grafo.organismo_proceso
+    a = grafo.organismo_proveedor
+    procesos = np.asarray(o.sum(axis=1)).ravel()
+    adjudicados = np.asarray(a.sum(axis=1)).ravel()
+    proveedores = np.diff(a.indptr)
+    directas = o @ grafo.directa
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cuadrados = np.asarray(a.multiply(a).sum(axis=1)).ravel()
+        hhi = np.where(adjudicados > 0, 10000 * cuadrados / adjudicados**2, np.nan)
+        repetidas = a.multiply(a >= 2)
+        ratio_repetidos = np.where(adjudicados > 0, np.asarray(repetidas.sum(axis=1)).ravel() / adjudicados, np.nan)
+        ratio_directa = np.where(procesos > 0, directas / procesos, np.nan)
+
+    # Proveedor con más adjudicaciones por fila (argmax disperso)
+    principal = np.full(n_org, None, dtype=object)
+    share = np.full(n_org, np.nan)
+    if a.nnz:
+        filas_con_datos = np.flatnonzero(proveedores)
+        maximos = np.asarray(a.argmax(axis=1)).ravel()
+        valores = np.asarray(a.max(axis=1).toarray()).ravel()
+        principal[filas_con_datos] = np.asarray(grafo.proveedores)[maximos[filas_con_datos]]
+        share[filas_con_datos] = valores[filas_con_datos] / adjudicados[filas_con_datos]
+
+    return (
+        pd.DataFrame(
+            {
+                "organismo": np.asarray(grafo.organismos),
+                "procesos": procesos.astype(int),
+                "adjudicados": adjudicados.astype(int),
+                "proveedores": proveedores.astype(int),
+                "hhi": hhi,
+                "ratio_repetidos": ratio_repetidos,
+                "ratio_directa": ratio_directa,
+                "proveedor_principal": principal,
+                "share_principal": share,
+            }
+        )
+        .sort_values(["hhi", "procesos"], ascending=False, na_position="last")
+        .reset_index(drop=True)
+    )
+
+
+def organismos_por_proveedor(grafo):
+    """Cantidad de organismos distintos que adjudicaron a cada proveedor"""
+    a = grafo.organismo_proveedor.tocsc()
+    return pd.Series(np.diff(a.indptr), index=grafo.proveedores, name="organismos").sort_values(ascending=False)
@@ -0,0 +1,362 @@
+import os
+import json
+from datetime import datetime
+from html import escape
+import pandas as pd
+import cubo as cubo_agregados
+from escritura_atomica import archivo_atomico, bloqueo
+from catalogo import (
+    cargar_catalogo,
+    cubo_del_reporte,
+    directorio_raiz,
+    entrada_del_reporte,
+    escribir_json_atomico,
+    todos_los_reportes,
+)
+
+# ==========================================
+# INSTANTÁNEAS ESTÁTICAS DE CADA REPORTE
+# ==========================================
+# Un reporte diario no cambia después de que diario.py lo escribe, pero
+# cada visita al dashboard volvía a abrir el xlsx, agrupar y armar las
+# figuras. El robot ahora genera, una vez por reporte:
+#
+#   data/instantaneas/2026-02/reporte_fenomenos_20260207.json
+#       totales, cubo, anomalías, organismos, decisiones principales y
+#       las figuras de plotly ya serializadas
+#   data/instantaneas/2026-02/reporte_fenomenos_20260207.html
+#       página autónoma (plotly desde CDN) para cualquier hosting estático
+#   data/instantaneas/indice.json
+#       listado de instantáneas para un frontend estático
+#
+# Los dashboards usan la instantánea si su sha256 coincide con el del
+# catálogo; si no existe o quedó vieja, calculan en vivo como antes.
+# Regenerar todas: python instantaneas.py
+#
+# plotly y grafo_entidades (scipy) se importan recién al generar: el robot
+# sigue funcionando sin ellos y la instantánea simplemente no se escribe.
+
+DIRECTORIO_INSTANTANEAS = "instantaneas"
+NOMBRE_INDICE = "indice.json"
+VERSION_INSTANTANEA = 1
+GENERAR_HTML = os.environ.get("INSTANTANEAS_HTML", "1") == "1"
+MAX_PRINCIPALES = 100
+URL_PLOTLY_JS = "https://cdn.plot.ly/plotly-2.35.2.min.js"
+
+COLUMNAS_PRINCIPALES = [
+    "fecha",
+    "detalle",
+    "tipo_decision",
+    "transferencia",
+    "tipo_decision_modelo",
+    "confianza_modelo",
+    "monto_ars",
+    "indice_fenomeno_corruptivo",
+    "nivel_riesgo_teorico",
+    "link",
+]
+
+COLORES_NIVEL = {"Alto": "#EF553B", "Medio": "#FECB52", "Bajo": "#636EFA"}
+
+
+# ==========================================
+# FIGURAS (COMPARTIDAS CON dashboard.py)
+# ==========================================
+def figura_intensidad_por_nivel(cubo):
+    import plotly.express as px
+
+    intensidad_nivel = cubo_agregados.rollup(cubo, ["tipo_decision", "nivel_riesgo_teorico"]).rename(
+        columns={"maximo": "indice_fenomeno_corruptivo"}
+    )
+    return px.bar(
+        intensidad_nivel,
+        x="indice_fenomeno_corruptivo",
+        y="tipo_decision",
+        color="nivel_riesgo_teorico",
+        orientation="h",
+        barmode="group",
+        hover_data=["cantidad"],
+        color_discrete_map=COLORES_NIVEL,
+        labels={
+            "indice_fenomeno_corruptivo": "Índice de Intensidad (0-10)",
+            "tipo_decision": "Escenario de la Teoría",
+        },
+    )
+
+
+def figura_transferencias(cubo):
+    import plotly.express as px
+
+    return px.pie(
+        cubo_agregados.por_transferencia(cubo),
+        names="transferencia",
+        values="cantidad",
+        hole=0.4,
+        title="Distribución de Impacto Económico",
+    )
+
+
+def figura_frecuencia(cubo):
+    import plotly.express as px
+
+    return px.bar(
+        cubo_agregados.por_escenario(cubo),
+        x="cantidad",
+        y="tipo_decision",
+        orientation="h",
+        title="Frecuencia de Fenómenos por Escenario",
+        labels={"cantidad": "Cantidad de Casos", "tipo_decision": "Escenario"},
+        color="cantidad",
+        color_continuous_scale="Reds",
+    )
+
+
+def figura_intensidad_promedio(cubo):
+    import plotly.express as px
+
+    intensidad_prom = (
+        cubo_agregados.por_escenario(cubo)
+        .rename(columns={"media": "indice_fenomeno_corruptivo"})
+        .sort_values("indice_fenomeno_corruptivo", ascending=False)
+    )
+    return px.bar(
+        intensidad_prom,
+        x="indice_fenomeno_corruptivo",
+        y="tipo_decision",
+        orientation="h",
+        title="Intensidad Promedio por Escenario",
+        labels={"indice_fenomeno_corruptivo": "Intensidad Promedio", "tipo_decision": "Escenario"},
+        color="indice_fenomeno_corruptivo",
+        color_continuous_scale="Oranges",
+    )
+
+
+def figura_matriz_riesgo(cubo):
+    import plotly.express as px
+
+    # Una burbuja por celda del cubo: tamaño = cantidad de casos
+    celdas = cubo_agregados.detectados(cubo).assign(
+        indice_fenomeno_corruptivo=lambda c: c["suma"] / c["cantidad"]
+    )
+    fig = px.scatter(
+        celdas,
+        x="indice_fenomeno_corruptivo",
+        y="transferencia",
+        color="nivel_riesgo_teorico",
+        size="cantidad",
+        hover_data=["tipo_decision", "cantidad"],
+        render_mode="webgl",
+        color_discrete_map=COLORES_NIVEL,
+        title="Distribución de Fenómenos",
+        labels={
+            "indice_fenomeno_corruptivo": "Índice de Intensidad",
+            "transferencia": "Dirección de Transferencia",
+        },
+    )
+    fig.update_layout(height=500)
+    return fig
+
+
+FIGURAS = {
+    "intensidad_por_nivel": figura_intensidad_por_nivel,
+    "transferencias": figura_transferencias,
+    "frecuencia": figura_frecuencia,
+    "intensidad_promedio": figura_intensidad_promedio,
+    "matriz_riesgo": figura_matriz_riesgo,
+}
+
+
+def construir_figuras(cubo):
+    """{nombre: figura}; vacío si el reporte no tiene fenómenos detectados"""
+    if cubo_agregados.totales(cubo)["detectados"] == 0:
+        return {}
+    return {nombre: armar(cubo) for nombre, armar in FIGURAS.items()}
+
+
+# ==========================================
+# GENERACIÓN
+# ==========================================
+def ruta_instantanea(ruta_reporte, data_dir, extension="json"):
+    relativa = os.path.relpath(os.path.abspath(ruta_reporte), os.path.abspath(data_dir))
+    base = os.path.splitext(relativa)[0]
+    return os.path.join(data_dir, DIRECTORIO_INSTANTANEAS, f"{base}.{extension}")
+
+
+def _registros(df):
+    return json.loads(df.to_json(orient="records", date_format="iso", force_ascii=False))
+
+
+def armar_instantanea(df, cubo, entrada):
+    import plotly.io as pio
+    import grafo_entidades
+
+    totales = cubo_agregados.totales(cubo)
+    principales = df.nlargest(min(MAX_PRINCIPALES, len(df)), "indice_fenomeno_corruptivo")
+    organismos = None
+    if "organismo" in df.columns and df["organismo"].notna().any():
+        organismos = _registros(grafo_entidades.metricas_por_organismo(grafo_entidades.construir_grafo(df)).head(20))
+
+    return {
+        "version": VERSION_INSTANTANEA,
+        "reporte": entrada["ruta"],
+        "fecha": entrada.get("fecha"),
+        "sha256": entrada.get("sha256"),
+        "generado": datetime.now().isoformat(timespec="seconds"),
+        "totales": totales,
+        "riesgo": cubo_agregados.conteo_por_nivel(cubo),
+        "cubo": cubo_agregados.cubo_a_registros(cubo),
+        "anomalias": entrada.get("anomalias") or [],
+        "organismos": organismos,
+        "columnas": list(df.columns),
+        "con_proveedores": "proveedor" in df.columns,
+        "opciones": {
+            col: sorted(df[col].dropna().astype(str).unique().tolist())
+            for col in ("tipo_decision", "transferencia")
+            if col in df.columns
+        },
+        "principales": _registros(principales[[c for c in COLUMNAS_PRINCIPALES if c in principales.columns]]),
+        "figuras": {nombre: json.loads(pio.to_json(fig)) for nombre, fig in construir_figuras(cubo).items()},
+    }
+
+
+def renderizar_html(instantanea):
+    """Página autónoma: métricas, figuras y decisiones principales"""
+    import plotly.io as pio
+
+    t = instantanea["totales"]
+    figuras = "".join(
+        f'<div class="figura">{pio.to_html(pio.from_json(json.dumps(spec)), full_html=False, include_plotlyjs=False)}</div>'
+        for spec in instantanea["figuras"].values()
+    )
+    anomalias = "".join(
+        f"<li><b>{escape(str(a['dimension']))}: {escape(str(a['valor']))}</b> · {a['cantidad']} decisiones "
+        f"(esperado ≈ {a['esperado']}, z = {a['z']})</li>"
+        for a in instantanea["anomalias"]
+    )
+    principales = pd.DataFrame(instantanea["principales"]).head(25)
+    tabla = principales.to_html(index=False, escape=True, na_rep="", border=0) if len(principales) else ""
+    return f"""<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8">
+<title>Monitor de Fenómenos Corruptivos · {escape(str(instantanea['fecha']))}</title>
+<script src="{URL_PLOTLY_JS}"></script>
+<style>
+body {{font-family: sans-serif; margin: 2em; color: #222;}}
+.metricas {{display: flex; gap: 2em;}} .metricas div {{font-size: 1.4em;}}
+.figura {{max-width: 1100px;}} table {{border-collapse: collapse; font-size: 0.85em;}}
+td, th {{border-bottom: 1px solid #e6e9ef; padding: 4px 8px; text-align: left;}}
+</style></head>
+<body>
+<h1>⚖️ Monitor de Fenómenos Corruptivos · {escape(str(instantanea['fecha']))}</h1>
+<div class="metricas">
+<div>Normas analizadas<br><b>{t['normas']}</b></div>
+<div>Fenómenos detectados<br><b>{t['detectados']}</b></div>
+<div>Riesgo máximo<br><b>{t['intensidad_max']}/10</b></div>
+<div>Riesgo alto<br><b>{instantanea['riesgo'].get('Alto', 0)}</b></div>
+</div>
+{f'<h2>📈 Anomalías del día</h2><ul>{anomalias}</ul>' if anomalias else ''}
+{figuras}
+<h2>🔍 Decisiones de mayor intensidad</h2>
+{tabla}
+<p><small>Generado {escape(instantanea['generado'])} · Teoría de Fenómenos Corruptivos (Monteverde, 2020)</small></p>
+</body></html>"""
+
+
+def actualizar_indice(data_dir, instantanea, ruta_json):
+    ruta_indice = os.path.join(data_dir, DIRECTORIO_INSTANTANEAS, NOMBRE_INDICE)
+    relativa = os.path.relpath(ruta_json, os.path.dirname(ruta_indice))
+    with bloqueo(data_dir, DIRECTORIO_INSTANTANEAS):
+        indice = {}
+        if os.path.exists(ruta_indice):
+            try:
+                with open(ruta_indice, encoding="utf-8") as f:
+                    indice = json.load(f)
+            except (OSError, ValueError):
+                indice = {}
+        indice.setdefault("instantaneas", {})[instantanea["reporte"]] = {
+            "fecha": instantanea["fecha"],
+            "json": relativa,
+            "html": os.path.splitext(relativa)[0] + ".html" if GENERAR_HTML else None,
+            "totales": instantanea["totales"],
+        }
+        indice["actualizado"] = instantanea["generado"]
+        escribir_json_atomico(ruta_indice, indice)
+
+
+def generar_instantanea(ruta_reporte, df, data_dir=None, html=GENERAR_HTML):
+    """Escribe la instantánea de un reporte ya registrado en el catálogo"""
+    data_dir = data_dir or directorio_raiz(ruta_reporte)
+    entrada = entrada_del_reporte(ruta_reporte, data_dir)
+    if entrada is None:
+        print(f"⚠️ {ruta_reporte} no está en el catálogo: no se genera instantánea")
+        return None
+    cubo = cubo_del_reporte(ruta_reporte, data_dir)
+    if cubo is None:
+        cubo = cubo_agregados.construir_cubo(df)
+
+    instantanea = armar_instantanea(df, cubo, entrada)
+    ruta_json = ruta_instantanea(ruta_reporte, data_dir)
+    os.makedirs(os.path.dirname(ruta_json), exist_ok=True)
+    escribir_json_atomico(ruta_json, instantanea)
+    if html:
+        with archivo_atomico(ruta_instantanea(ruta_reporte, data_dir, "html")) as temporal:
+            with open(temporal, "w", encoding="utf-8") as f:
+                f.write(renderizar_html(instantanea))
+    actualizar_indice(data_dir, instantanea, ruta_json)
+    return ruta_json
+
+
+# ==========================================
+# LECTURA
+# ==========================================
+def cargar_instantanea(ruta_reporte, data_dir):
+    """La instantánea vigente del reporte, o None si falta o no coincide con el catálogo"""
+    ruta = ruta_instantanea(ruta_reporte, data_dir)
+    if not os.path.exists(ruta):
+        return None
+    entrada = entrada_del_reporte(ruta_reporte, data_dir)
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            instantanea = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (
+        entrada is None
+        or instantanea.get("version") != VERSION_INSTANTANEA
+        or instantanea.get("sha256") != entrada.get("sha256")
+    ):
+        return None
+    return instantanea
+
+
+def figura(instantanea, nombre):
+    """Figura de plotly ya serializada (None si el reporte no tiene fenómenos)"""
+    import plotly.io as pio
+
+    spec = instantanea["figuras"].get(nombre)
+    return pio.from_json(json.dumps(spec)) if spec else None
+
+
+def regenerar_todas(data_dir):
+    from deltas import leer_dia
+
+    generadas = 0
+    for entrada in todos_los_reportes(data_dir) or []:
+        ruta = os.path.join(data_dir, entrada["ruta"])
+        if cargar_instantanea(ruta, data_dir) is not None:
+            continue
+        try:
+            generar_instantanea(ruta, leer_dia(ruta, data_dir), data_dir)
+            generadas += 1
+        except Exception as e:
+            print(f"❌ {entrada['ruta']}: {e}")
+    return generadas
+
+
+if __name__ == "__main__":
+    import sys
+
+    data_dir = "/app/data" if os.path.exists("/app/data") else "data"
+    if cargar_catalogo(data_dir) is None:
+        print("❌ No hay catálogo; ejecutar antes: python catalogo.py")
+        sys.exit(1)
+    print(f"✅ {regenerar_todas(data_dir)} instantánea(s) generadas en {os.path.join(data_dir, DIRECTORIO_INSTANTANEAS)}")
@@ -3,6 +3,12 @@ import pandas as pd
 import os
 from datetime import datetime
 from analisis import analizar_boletin, MATRIZ_TEORICA
+from deltas import leer_dia
+from exportador_excel import GLOSARIO, tabla_glosario
+from consultas_dashboard import TAMANOS_PAGINA, paginar
+from catalogo import cubo_del_reporte, todos_los_reportes
+from cubo import construir_cubo, conteo_por_nivel, totales
+from instantaneas import cargar_instantanea
 
 # ===============================
 # 1. CONFIGURACIÓN UI Y ESTILO
@@ -51,7 +57,13 @@ tab_monitor, tab_analisis, tab_documentacion = st.tabs(
 # --- PESTAÑA 1: MONITOR (Auditoría de Resultados) ---
 with tab_monitor:
     st.header("Visualización de Reportes Generados")
-    archivos = [f for f in os.listdir(DATA_DIR) if f.endswith(".xlsx")]
+    # Reportes de todos los meses según el catálogo; sin catálogo, la raíz de data/
+    entradas = todos_los_reportes(DATA_DIR)
+    if entradas is not None:
+        rutas = {os.path.basename(e["ruta"]): e["ruta"] for e in entradas}
+    else:
+        rutas = {f: f for f in os.listdir(DATA_DIR) if f.endswith(".xlsx")}
+    archivos = list(rutas)
 
     if not archivos:
         st.info(
@@ -61,40 +73,68 @@ with tab_monitor:
         archivo_selec = st.selectbox(
             "Seleccioná un reporte para auditar:", sorted(archivos, reverse=True)
         )
-        ruta = os.path.join(DATA_DIR, archivo_selec)
+        ruta = os.path.join(DATA_DIR, rutas[archivo_selec])
 
         try:
-            xl = pd.ExcelFile(ruta)
-            df = xl.parse("Analisis")
+            # Con instantánea vigente (instantaneas.py) no se abre el reporte
+            instantanea = cargar_instantanea(ruta, DATA_DIR)
+            if instantanea is not None:
+                df = None
+                totales_reporte = instantanea["totales"]
+                riesgo = instantanea["riesgo"]
+            else:
+                df = leer_dia(ruta, DATA_DIR)
+                # Dashboard de Métricas (desde el cubo de agregados del reporte)
+                cubo = cubo_del_reporte(ruta, DATA_DIR)
+                if cubo is None:
+                    cubo = construir_cubo(df)
+                totales_reporte = totales(cubo)
+                riesgo = conteo_por_nivel(cubo)
 
-            # Dashboard de Métricas
             m1, m2, m3 = st.columns(3)
-            m1.metric("Procesos Analizados", len(df))
-
-            if "indice_fenomeno_corruptivo" in df.columns:
-                m2.metric(
-                    "Intensidad Promedio",
-                    f"{df['indice_fenomeno_corruptivo'].mean():.1f} / 10",
-                )
-
-                if "nivel_riesgo_teorico" in df.columns:
-                    riesgo_alto = len(df[df["nivel_riesgo_teorico"] == "Alto"])
-                    m3.metric(
-                        "Alertas de Riesgo Alto", riesgo_alto, delta_color="inverse"
-                    )
+            m1.metric("Procesos Analizados", totales_reporte["normas"])
+            m2.metric(
+                "Intensidad Promedio",
+                f"{totales_reporte['intensidad_promedio']:.1f} / 10",
+            )
+            m3.metric(
+                "Alertas de Riesgo Alto",
+                riesgo["Alto"],
+                delta_color="inverse",
+            )
 
             st.write("### Detalle del Análisis Algorítmico")
-            st.dataframe(df, use_container_width=True, hide_index=True)
+            if df is None and not st.toggle("Ver todos los procesos del reporte", value=False):
+                st.caption("Procesos de mayor intensidad (instantánea precalculada)")
+                st.dataframe(
+                    pd.DataFrame(instantanea["principales"]),
+                    use_container_width=True,
+                    hide_index=True,
+                )
+            else:
+                if df is None:
+                    df = leer_dia(ruta, DATA_DIR)
+                # Paginación en el servidor: solo se envía la página visible
+                col_p1, col_p2 = st.columns(2)
+                tamano_pagina = col_p1.selectbox("Filas por página", TAMANOS_PAGINA)
+                total_paginas = max(1, -(-len(df) // tamano_pagina))
+                pagina = col_p2.number_input(
+                    "Página", min_value=1, max_value=total_paginas, value=1
+                )
+                df_pagina, _ = paginar(df, pagina, tamano_pagina, "indice_fenomeno_corruptivo")
+                st.dataframe(df_pagina, use_container_width=True, hide_index=True)
 
             st.divider()
             col_g, col_m = st.columns([1, 2])
 
             with col_g:
                 st.subheader("📖 Glosario de Variables")
-                if "Glosario" in xl.sheet_names:
-                    st.table(xl.parse("Glosario"))
+                # Del reporte cargado o de la instantánea: el libro no se vuelve a abrir
+                if df is not None:
+                    columnas_reporte = list(df.columns)
                 else:
-                    st.warning("Glosario no disponible en este archivo.")
+                    columnas_reporte = instantanea.get("columnas") or list(GLOSARIO)
+                st.table(tabla_glosario(columnas_reporte))
 
             with col_m:
                 st.subheader("🔬 Marco Teórico: Los 7 Escenarios")
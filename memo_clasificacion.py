@@ -0,0 +1,170 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# MEMO PERSISTENTE DE CLASIFICACIONES
+# ==========================================
+# El mismo detalle se vuelve a normalizar y clasificar en cada corrida del
+# robot, en cada "Análisis en Vivo" de main.py y en cada backfill, aunque ni
+# el texto ni MATRIZ_TEORICA hayan cambiado. Este memo guarda el resultado
+# (escenario, transferencia, índice y rasgos numéricos) en SQLite, con clave
+#
+#   blake2b(versión de reglas + texto)
+#
+# Al cambiar la matriz, la ponderación o la extracción de montos
+# (VERSION_RASGOS) cambia la versión y las entradas viejas dejan de
+# coincidir; se van descartando por antigüedad (LRU aproximado) cuando el
+# memo supera MAX_ENTRADAS. La consulta es masiva: una tabla temporal con
+# las claves del lote y un único JOIN.
+#
+# La clave usa el texto exacto, sin normalizar: el memo tiene que ser
+# transparente y la matriz no da lo mismo para "obra  publica" que para
+# "obra publica". Normalizar es además justamente el trabajo a evitar.
+#
+# El tamaño se lleva en memoria (un COUNT(*) al abrir): la tabla solo se
+# vuelve a contar cuando la cuenta supera el tope y hay que podar.
+
+NOMBRE_MEMO = "memo_clasificacion.sqlite"
+# Cambia si cambia cómo se arma la clave (2: texto exacto, antes espacios colapsados)
+FORMATO_CLAVE = 2
+MAX_ENTRADAS = int(os.environ.get("MEMO_MAX_ENTRADAS", "500000"))
+
+COLUMNAS_MEMO = [
+    "tipo_decision",
+    "transferencia",
+    "indice_fenomeno_corruptivo",
+    "monto_ars",
+    "monto_usd",
+    "porcentaje",
+    "norma",
+]
+
+COLUMNAS_NUMERICAS = ["indice_fenomeno_corruptivo", "monto_ars", "monto_usd", "porcentaje"]
+
+
+def ruta_memo(data_dir):
+    return os.path.join(data_dir, NOMBRE_MEMO)
+
+
+class MemoClasificacion:
+    """
+    Uso:
+        memo = MemoClasificacion(data_dir, VERSION_REGLAS)
+        resultado = memo.clasificar(df["detalle"], funcion_de_puntuacion)
+    """
+
+    def __init__(self, data_dir, version, max_entradas=MAX_ENTRADAS):
+        self.ruta = ruta_memo(data_dir)
+        self.version = version
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(self.ruta, timeout=30, check_same_thread=False)
+        # WAL: el robot escribe mientras los dashboards leen
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        columnas = ", ".join(
+            f"{c} REAL" if c in COLUMNAS_NUMERICAS else f"{c} TEXT"
+            for c in COLUMNAS_MEMO
+        )
+        self._conexion.execute(
+            f"CREATE TABLE IF NOT EXISTS memo (clave TEXT PRIMARY KEY, {columnas}, uso REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._conexion.execute("CREATE INDEX IF NOT EXISTS memo_uso ON memo (uso)")
+        self._conexion.commit()
+        self._entradas = len(self)
+
+    def close(self):
+        self._conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._conexion.execute("SELECT COUNT(*) FROM memo").fetchone()[0]
+
+    def claves(self, textos):
+        """Una clave por texto exacto; los nulos usan un byte que ningún texto UTF-8 produce"""
+        prefijo = f"{FORMATO_CLAVE}\x00{self.version}\x00".encode("utf-8")
+        return [
+            hashlib.blake2b(prefijo + (b"\xff" if pd.isna(t) else t.encode("utf-8")), digest_size=16).hexdigest()
+            for t in textos
+        ]
+
+    def buscar(self, claves):
+        """Resultados guardados para las claves dadas (índice = clave); marca su uso"""
+        if not claves:
+            return pd.DataFrame(columns=COLUMNAS_MEMO)
+        with self._lock:
+            cursor = self._conexion.cursor()
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS consulta (clave TEXT PRIMARY KEY)")
+            cursor.execute("DELETE FROM consulta")
+            cursor.executemany("INSERT OR IGNORE INTO consulta VALUES (?)", ((c,) for c in claves))
+            filas = cursor.execute(
+                f"SELECT m.clave, {', '.join('m.' + c for c in COLUMNAS_MEMO)} FROM memo m JOIN consulta USING (clave)"
+            ).fetchall()
+            cursor.execute("UPDATE memo SET uso = ? WHERE clave IN (SELECT clave FROM consulta)", (time.time(),))
+            self._conexion.commit()
+        tabla = pd.DataFrame(filas, columns=["clave"] + COLUMNAS_MEMO).set_index("clave")
+        return tabla.astype({c: "float64" for c in COLUMNAS_NUMERICAS} | {"norma": "string"})
+
+    def guardar(self, resultados):
+        """resultados: DataFrame con COLUMNAS_MEMO e índice = clave"""
+        if resultados.empty:
+            return
+        valores = resultados[COLUMNAS_MEMO].astype(object).where(resultados[COLUMNAS_MEMO].notna(), None)
+        ahora = time.time()
+        with self._lock:
+            self._conexion.executemany(
+                f"INSERT OR REPLACE INTO memo VALUES (?, {', '.join('?' for _ in COLUMNAS_MEMO)}, ?)",
+                ((clave, *fila, ahora) for clave, fila in zip(resultados.index, valores.itertuples(index=False))),
+            )
+            self._entradas += len(resultados)
+            if self._entradas > self.max_entradas:
+                self._podar()
+            self._conexion.commit()
+
+    def _podar(self):
+        """Descarta las entradas usadas hace más tiempo si se superó el tope"""
+        # La cuenta en memoria es una cota (otro proceso pudo podar o reemplazar)
+        self._entradas = len(self)
+        sobrantes = self._entradas - self.max_entradas
+        if sobrantes > 0:
+            self._conexion.execute(
+                "DELETE FROM memo WHERE clave IN (SELECT clave FROM memo ORDER BY uso LIMIT ?)", (sobrantes,)
+            )
+            self._entradas = self.max_entradas
+
+    def clasificar(self, detalles, puntuar):
+        """
+        Resultado por fila de 'detalles' (COLUMNAS_MEMO). Solo se llama a
+        puntuar() con los textos distintos que no están en el memo.
+        """
+        if detalles.empty:
+            return puntuar(detalles)[COLUMNAS_MEMO]
+        # Cada texto distinto se hashea, busca y (si falta) puntúa una sola vez
+        codigos, textos = pd.factorize(detalles.astype("string"), use_na_sentinel=False)
+        claves = pd.Index(self.claves(textos.tolist()))
+        primera_fila = np.unique(codigos, return_index=True)[1]
+
+        encontrados = self.buscar(claves.tolist())
+        faltan = encontrados.index.get_indexer(claves) < 0
+        partes = [encontrados] if len(encontrados) else []
+        if faltan.any():
+            nuevos = puntuar(detalles.iloc[primera_fila[faltan]])[COLUMNAS_MEMO]
+            nuevos.index = claves[faltan]
+            self.guardar(nuevos)
+            partes.append(nuevos)
+
+        print(f"🧠 Memo de clasificación: {len(encontrados)}/{len(claves)} textos distintos ya clasificados")
+        tabla = pd.concat(partes) if len(partes) > 1 else partes[0]
+        resultado = tabla.reindex(claves).iloc[codigos]
+        resultado.index = detalles.index
+        return resultado
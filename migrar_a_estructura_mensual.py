@@ -7,7 +7,19 @@ Este script reorganiza los reportes existentes en la carpeta data/
 creando subcarpetas por mes (formato YYYY-MM).
 
 USO:
-    python migrar_a_estructura_mensual.py
+    python migrar_a_estructura_mensual.py              # pregunta antes de migrar
+    python migrar_a_estructura_mensual.py --dry-run    # solo muestra el plan
+    python migrar_a_estructura_mensual.py --yes        # sin confirmación (CI/cron)
+    python migrar_a_estructura_mensual.py --yes --workers 16 --columnar --catalogo
+
+OPCIONES:
+    --workers N   Cantidad de archivos procesados en paralelo
+    --columnar    Genera el sidecar .arrow de cada reporte (ver cache_columnar.py)
+    --catalogo    Registra cada reporte en data/catalogo.json (ver catalogo.py)
+
+Cada archivo se verifica por sha256 después de moverlo. El progreso queda en
+data/.migracion.jsonl, por lo que la migración se puede interrumpir y volver
+a ejecutar: los archivos ya migrados se saltean y nada se procesa dos veces.
 
 ANTES:
     data/
@@ -25,102 +37,224 @@ DESPUÉS:
 """
 
 import os
+import sys
+import json
 import shutil
-from datetime import datetime
-from pathlib import Path
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+import catalogo
+from cache_columnar import calcular_sha256, leer_reporte
 
 DATA_DIR = "data"
+NOMBRE_JOURNAL = ".migracion.jsonl"
 
 
 def extraer_fecha_del_nombre(nombre_archivo):
     """
-    Extrae la fecha del nombre del archivo
+    Extrae el mes del nombre del archivo
     Ej: reporte_fenomenos_20260130.xlsx -> 2026-01
     """
-    try:
-        # Buscar el patrón YYYYMMDD en el nombre
-        partes = nombre_archivo.split("_")
-        for parte in partes:
-            if len(parte) == 12 and parte[:8].isdigit():  # 20260130.xlsx
-                fecha_str = parte[:8]  # 20260130
-                year = fecha_str[:4]
-                mes = fecha_str[4:6]
-                return f"{year}-{mes}"
-    except:
-        pass
-    return None
-
-
-def migrar_archivos():
-    """Reorganiza los archivos existentes en carpetas mensuales"""
+    fecha = catalogo.fecha_desde_nombre(nombre_archivo)
+    return fecha[:7] if fecha else None
+
+
+# ==========================================
+# JOURNAL (REANUDACIÓN)
+# ==========================================
+def leer_journal(data_dir):
+    """Retorna {archivo: registro} de los archivos ya migrados"""
+    ruta = os.path.join(data_dir, NOMBRE_JOURNAL)
+    registros = {}
+    if not os.path.exists(ruta):
+        return registros
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            try:
+                registro = json.loads(linea)
+            except ValueError:
+                continue  # Línea truncada por una interrupción
+            registros[registro["archivo"]] = registro
+    return registros
+
+
+def anotar_journal(data_dir, registro):
+    with open(os.path.join(data_dir, NOMBRE_JOURNAL), "a", encoding="utf-8") as f:
+        f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+# ==========================================
+# MIGRACIÓN DE UN ARCHIVO (se ejecuta en el pool)
+# ==========================================
+def _mover_verificado(origen, destino, sha_origen):
+    """Mueve origen -> destino y verifica el checksum antes de dar por terminado"""
+    if os.stat(origen).st_dev == os.stat(os.path.dirname(destino)).st_dev:
+        os.replace(origen, destino)  # Mismo filesystem: rename atómico
+    else:
+        temporal = os.path.join(os.path.dirname(destino), f".tmp_{os.path.basename(destino)}")
+        shutil.copy2(origen, temporal)
+        if calcular_sha256(temporal) != sha_origen:
+            os.remove(temporal)
+            raise IOError("checksum distinto tras la copia")
+        os.replace(temporal, destino)
+        os.remove(origen)
+
+    if calcular_sha256(destino) != sha_origen:
+        raise IOError("checksum distinto tras mover el archivo")
+
+
+def migrar_archivo(archivo, data_dir, columnar=False):
+    """Migra un archivo y retorna un registro para el journal"""
+    mes = extraer_fecha_del_nombre(archivo)
+    registro = {"archivo": archivo, "mes": mes}
+    if not mes:
+        return {**registro, "estado": "sin_fecha"}
+
+    origen = os.path.join(data_dir, archivo)
+    destino = os.path.join(data_dir, mes, archivo)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+
+    sha = calcular_sha256(origen)
+    registro.update({"ruta": os.path.join(mes, archivo), "sha256": sha})
+
+    if os.path.exists(destino):
+        # Corrida anterior interrumpida o copia manual previa
+        if calcular_sha256(destino) != sha:
+            return {**registro, "estado": "conflicto"}
+        os.remove(origen)
+        registro["estado"] = "ya_migrado"
+    else:
+        _mover_verificado(origen, destino, sha)
+        registro["estado"] = "migrado"
+
+    if columnar:
+        leer_reporte(destino)  # Deja el sidecar .arrow generado
+    return registro
+
+
+def armar_entrada_catalogo(ruta_relativa, data_dir):
+    """Lee el reporte migrado (vía sidecar) y arma su entrada de catálogo"""
+    ruta = os.path.join(data_dir, ruta_relativa)
+    return catalogo.armar_entrada(ruta, leer_reporte(ruta), data_dir)
 
-    if not os.path.exists(DATA_DIR):
-        print(f"❌ No se encuentra el directorio {DATA_DIR}")
-        return
 
-    # Listar todos los archivos .xlsx en el directorio raíz de data/
-    archivos = [
+# ==========================================
+# ORQUESTACIÓN
+# ==========================================
+def archivos_pendientes(data_dir):
+    """Archivos .xlsx todavía sueltos en la raíz de data/"""
+    return sorted(
         f
-        for f in os.listdir(DATA_DIR)
-        if f.endswith(".xlsx") and os.path.isfile(os.path.join(DATA_DIR, f))
+        for f in os.listdir(data_dir)
+        if f.endswith(".xlsx") and os.path.isfile(os.path.join(data_dir, f))
+    )
+
+
+def mostrar_plan(archivos, data_dir):
+    print(f"📋 Plan de migración ({len(archivos)} archivos):\n")
+    for archivo in archivos:
+        mes = extraer_fecha_del_nombre(archivo)
+        if not mes:
+            print(f"⚠️  {archivo}: se saltea (no se pudo extraer fecha)")
+        elif os.path.exists(os.path.join(data_dir, mes, archivo)):
+            print(f"🔁 {archivo} -> {mes}/ (ya existe, se comparará el checksum)")
+        else:
+            print(f"➡️  {archivo} -> {mes}/")
+
+
+def registrar_en_catalogo(data_dir, workers, crear_pool):
+    """Registra en el catálogo todo lo migrado que todavía no figure"""
+    en_catalogo = {}
+    for entrada in catalogo.todos_los_reportes(data_dir) or []:
+        en_catalogo[entrada["ruta"]] = entrada.get("sha256")
+
+    faltantes = [
+        r["ruta"]
+        for r in leer_journal(data_dir).values()
+        if r.get("estado") in ("migrado", "ya_migrado")
+        and en_catalogo.get(r["ruta"]) != r["sha256"]
+        and os.path.exists(os.path.join(data_dir, r["ruta"]))
     ]
+    if not faltantes:
+        return 0
 
-    if not archivos:
-        print(f"✅ No hay archivos para migrar en {DATA_DIR}")
-        return
+    with crear_pool(max_workers=workers) as pool:
+        entradas = list(pool.map(armar_entrada_catalogo, faltantes, [data_dir] * len(faltantes)))
+    catalogo.registrar_entradas(entradas, data_dir)
+    return len(entradas)
 
-    print(f"📁 Encontrados {len(archivos)} archivos para migrar\n")
 
-    migrados = 0
-    errores = 0
+def migrar_archivos(data_dir=DATA_DIR, workers=8, columnar=False, registrar=False):
+    """Reorganiza los archivos existentes en carpetas mensuales"""
 
-    for archivo in archivos:
-        mes_carpeta = extraer_fecha_del_nombre(archivo)
-
-        if not mes_carpeta:
-            print(f"⚠️  Saltando {archivo} (no se pudo extraer fecha)")
-            errores += 1
-            continue
-
-        # Crear directorio del mes si no existe
-        ruta_mes = os.path.join(DATA_DIR, mes_carpeta)
-        if not os.path.exists(ruta_mes):
-            os.makedirs(ruta_mes)
-            print(f"📂 Creada carpeta: {ruta_mes}")
-
-        # Mover archivo
-        ruta_origen = os.path.join(DATA_DIR, archivo)
-        ruta_destino = os.path.join(ruta_mes, archivo)
-
-        try:
-            shutil.move(ruta_origen, ruta_destino)
-            print(f"✅ Migrado: {archivo} -> {mes_carpeta}/")
-            migrados += 1
-        except Exception as e:
-            print(f"❌ Error al migrar {archivo}: {e}")
-            errores += 1
+    if not os.path.exists(data_dir):
+        print(f"❌ No se encuentra el directorio {data_dir}")
+        return None
+
+    archivos = archivos_pendientes(data_dir)
+    # La conversión columnar parsea Excel (CPU): conviene un pool de procesos
+    crear_pool = ProcessPoolExecutor if columnar else ThreadPoolExecutor
+    conteo = {"migrado": 0, "ya_migrado": 0, "sin_fecha": 0, "conflicto": 0, "error": 0}
+
+    if not archivos:
+        print(f"✅ No hay archivos para migrar en {data_dir}")
+    else:
+        print(f"📁 Encontrados {len(archivos)} archivos para migrar ({workers} workers)\n")
+        with crear_pool(max_workers=workers) as pool:
+            futuros = {
+                pool.submit(migrar_archivo, archivo, data_dir, columnar): archivo
+                for archivo in archivos
+            }
+            for futuro in as_completed(futuros):
+                archivo = futuros[futuro]
+                try:
+                    registro = futuro.result()
+                except Exception as e:
+                    print(f"❌ Error al migrar {archivo}: {e}")
+                    conteo["error"] += 1
+                    continue
+
+                conteo[registro["estado"]] += 1
+                if registro["estado"] in ("migrado", "ya_migrado"):
+                    anotar_journal(data_dir, registro)
+                    print(f"✅ Migrado: {archivo} -> {registro['mes']}/")
+                elif registro["estado"] == "conflicto":
+                    print(f"⚠️  Conflicto: {archivo} difiere de {registro['ruta']} (no se tocó)")
+                else:
+                    print(f"⚠️  Saltando {archivo} (no se pudo extraer fecha)")
+
+    registrados = 0
+    if registrar:
+        registrados = registrar_en_catalogo(data_dir, workers, crear_pool)
 
     print(f"\n{'=' * 50}")
     print(f"RESUMEN DE MIGRACIÓN")
     print(f"{'=' * 50}")
-    print(f"✅ Archivos migrados: {migrados}")
-    print(f"❌ Errores: {errores}")
-    print(f"📂 Estructura actualizada en: {os.path.abspath(DATA_DIR)}")
+    print(f"✅ Archivos migrados: {conteo['migrado']}")
+    print(f"🔁 Ya migrados (checksum verificado): {conteo['ya_migrado']}")
+    print(f"⚠️  Sin fecha / en conflicto: {conteo['sin_fecha']} / {conteo['conflicto']}")
+    print(f"❌ Errores: {conteo['error']}")
+    if registrar:
+        print(f"🗂️ Registrados en catálogo: {registrados}")
+    print(f"📂 Estructura actualizada en: {os.path.abspath(data_dir)}")
     print(f"\n¡Listo! Ahora puedes ejecutar dashboard.py")
+    return conteo
 
 
-def verificar_estructura():
+def verificar_estructura(data_dir=DATA_DIR):
     """Muestra la estructura actual de carpetas"""
     print(f"\n{'=' * 50}")
-    print(f"ESTRUCTURA ACTUAL DE {DATA_DIR}/")
+    print(f"ESTRUCTURA ACTUAL DE {data_dir}/")
     print(f"{'=' * 50}\n")
 
-    if not os.path.exists(DATA_DIR):
-        print(f"❌ Directorio {DATA_DIR} no existe")
+    if not os.path.exists(data_dir):
+        print(f"❌ Directorio {data_dir} no existe")
         return
 
-    for item in sorted(os.listdir(DATA_DIR)):
-        item_path = os.path.join(DATA_DIR, item)
+    for item in sorted(os.listdir(data_dir)):
+        item_path = os.path.join(data_dir, item)
         if os.path.isdir(item_path):
             archivos_mes = [f for f in os.listdir(item_path) if f.endswith(".xlsx")]
             print(f"📁 {item}/ ({len(archivos_mes)} reportes)")
@@ -130,7 +264,20 @@ def verificar_estructura():
             print(f"📄 {item} (sin organizar)")
 
 
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Migración a estructura mensual")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--dry-run", action="store_true", help="Solo mostrar el plan")
+    parser.add_argument("-y", "--yes", action="store_true", help="No pedir confirmación")
+    parser.add_argument("--workers", type=int, default=min(32, (os.cpu_count() or 1) * 4))
+    parser.add_argument("--columnar", action="store_true", help="Generar sidecars .arrow")
+    parser.add_argument("--catalogo", action="store_true", help="Registrar en catalogo.json")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    args = parsear_argumentos()
+
     print("""
     ╔════════════════════════════════════════════════════╗
     ║  MIGRACIÓN A ESTRUCTURA MENSUAL                    ║
@@ -138,18 +285,30 @@ if __name__ == "__main__":
     ╚════════════════════════════════════════════════════╝
     """)
 
+    if args.dry_run:
+        if os.path.exists(args.data_dir):
+            mostrar_plan(archivos_pendientes(args.data_dir), args.data_dir)
+        else:
+            print(f"❌ No se encuentra el directorio {args.data_dir}")
+        sys.exit(0)
+
     # Mostrar estructura actual
-    verificar_estructura()
+    verificar_estructura(args.data_dir)
 
-    # Confirmar migración
-    print(f"\n{'=' * 50}")
-    respuesta = input("¿Desea continuar con la migración? (s/n): ").lower().strip()
+    # Confirmar migración (salvo --yes)
+    if not args.yes:
+        if not sys.stdin.isatty():
+            print("\n❌ Sin terminal interactiva: use --yes para migrar o --dry-run para ver el plan")
+            sys.exit(1)
+        print(f"\n{'=' * 50}")
+        respuesta = input("¿Desea continuar con la migración? (s/n): ").lower().strip()
+        if respuesta not in ["s", "si", "sí", "y", "yes"]:
+            print("\n❌ Migración cancelada")
+            sys.exit(0)
 
-    if respuesta in ["s", "si", "sí", "y", "yes"]:
-        print(f"\n🚀 Iniciando migración...\n")
-        migrar_archivos()
+    print(f"\n🚀 Iniciando migración...\n")
+    conteo = migrar_archivos(args.data_dir, args.workers, args.columnar, args.catalogo)
 
-        # Mostrar estructura final
-        verificar_estructura()
-    else:
-        print("\n❌ Migración cancelada")
\ No newline at end of file
+    # Mostrar estructura final
+    verificar_estructura(args.data_dir)
+    sys.exit(1 if conteo and (conteo["error"] or conteo["conflicto"]) else 0)
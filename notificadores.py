@@ -0,0 +1,163 @@
+import os
+import json
+import smtplib
+from email.message import EmailMessage
+from cliente_http import obtener_cliente
+
+# ==========================================
+# NOTIFICADORES DE ALERTAS
+# ==========================================
+# Cada notificador recibe una lista de alertas (dicts con nro_proceso,
+# detalle, tipo_decision, indice, nivel, link, detectado) y las entrega por
+# su canal. Se configuran con la variable NOTIFICADORES, separando canales
+# con ";":
+#
+#   archivo:data/alertas.jsonl
+#   webhook:https://hooks.ejemplo.org/monitor
+#   smtp:host:puerto:remitente:destino1,destino2
+#
+# Usuario y clave SMTP se leen de SMTP_USUARIO / SMTP_CLAVE (nunca del spec).
+
+
+class NotificadorArchivo:
+    """Agrega una línea JSON por alerta (útil para auditoría y pruebas)"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+
+    def enviar(self, alertas):
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        with open(self.ruta, "a", encoding="utf-8") as f:
+            for alerta in alertas:
+                f.write(json.dumps(alerta, ensure_ascii=False) + "\n")
+
+
+class NotificadorWebhook:
+    """POST JSON {"alertas": [...]} usando el cliente HTTP compartido"""
+
+    def __init__(self, url, cliente=None):
+        self.url = url
+        self.cliente = cliente or obtener_cliente()
+
+    def enviar(self, alertas):
+        respuesta = self.cliente.post(self.url, json={"alertas": alertas})
+        respuesta.raise_for_status()
+
+
+class NotificadorSMTP:
+    """Un correo por ciclo con todas las alertas nuevas"""
+
+    def __init__(self, host, puerto, remitente, destinatarios, usuario=None, clave=None, tls=False):
+        self.host = host
+        self.puerto = int(puerto)
+        self.remitente = remitente
+        self.destinatarios = list(destinatarios)
+        self.usuario = usuario
+        self.clave = clave
+        self.tls = tls
+
+    def armar_mensaje(self, alertas):
+        mensaje = EmailMessage()
+        mensaje["Subject"] = f"🚨 {len(alertas)} alerta(s) de riesgo Alto - Monitor de Fenómenos Corruptivos"
+        mensaje["From"] = self.remitente
+        mensaje["To"] = ", ".join(self.destinatarios)
+        lineas = [
+            f"- [{a['nro_proceso']}] {a['detalle']} ({a['tipo_decision']}, {a['indice']}/10)\n  {a['link']}"
+            for a in alertas
+        ]
+        mensaje.set_content("\n".join(lineas))
+        return mensaje
+
+    def enviar(self, alertas):
+        with smtplib.SMTP(self.host, self.puerto, timeout=30) as smtp:
+            if self.tls:
+                smtp.starttls()
+            if self.usuario:
+                smtp.login(self.usuario, self.clave or "")
+            smtp.send_message(self.armar_mensaje(alertas))
+
+
+def _crear_archivo(resto):
+    return NotificadorArchivo(resto)
+
+
+def _crear_webhook(resto):
+    return NotificadorWebhook(resto)
+
+
+def _crear_smtp(resto):
+    host, puerto, remitente, destinos = resto.split(":", 3)
+    return NotificadorSMTP(
+        host,
+        puerto,
+        remitente,
+        [d.strip() for d in destinos.split(",") if d.strip()],
+        usuario=os.environ.get("SMTP_USUARIO"),
+        clave=os.environ.get("SMTP_CLAVE"),
+        tls=os.environ.get("SMTP_TLS", "0") == "1",
+    )
+
+
+TIPOS_NOTIFICADOR = {
+    "archivo": _crear_archivo,
+    "webhook": _crear_webhook,
+    "smtp": _crear_smtp,
+}
+
+
+def crear_notificadores(especificacion=None):
+    """Instancia los notificadores a partir del spec (o de NOTIFICADORES)"""
+    if especificacion is None:
+        especificacion = os.environ.get("NOTIFICADORES", "")
+    notificadores = []
+    for canal in especificacion.split(";"):
+        canal = canal.strip()
+        if not canal:
+            continue
+        tipo, _, resto = canal.partition(":")
+        if tipo not in TIPOS_NOTIFICADOR:
+            raise ValueError(f"Notificador desconocido: {tipo}")
+        notificador = TIPOS_NOTIFICADOR[tipo](resto)
+        notificador.canal = canal
+        notificadores.append(notificador)
+    return notificadores
+
+
+def nombre_canal(notificador):
+    """El spec que lo creó (p. ej. 'webhook:https://...'); identifica su cola de pendientes"""
+    return getattr(notificador, "canal", type(notificador).__name__)
+
+
+def notificar(alertas, notificadores):
+    """Entrega las alertas por todos los canales; un canal caído no frena a los demás"""
+    if not alertas:
+        return 0
+    entregados = 0
+    for notificador in notificadores:
+        try:
+            notificador.enviar(alertas)
+            entregados += 1
+        except Exception as e:
+            print(f"⚠️ Falló {type(notificador).__name__}: {e}")
+    return entregados
+
+
+def notificar_por_canal(colas, notificadores):
+    """
+    Entrega a cada canal su propia cola ({canal: [alertas]}). Retorna las
+    colas que no se pudieron entregar, para reintentarlas solo en ese canal.
+    """
+    restantes = {}
+    for notificador in notificadores:
+        canal = nombre_canal(notificador)
+        cola = colas.get(canal) or []
+        if not cola:
+            continue
+        try:
+            notificador.enviar(cola)
+        except Exception as e:
+            print(f"⚠️ Falló {canal}: {e}")
+            restantes[canal] = cola
+    return restantes
@@ -0,0 +1,212 @@
+import os
+import re
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # Sin pyarrow se usa str.extractall de pandas (más lento)
+    pc = None
+
+# ==========================================
+# RASGOS NUMÉRICOS DEL DETALLE
+# ==========================================
+# La matriz XAI solo mira palabras clave: "redeterminación de precios" pesa
+# lo mismo por $ 50.000 que por $ 1.250.000.000. Esta etapa extrae del texto
+# original los montos (pesos y dólares), los porcentajes y el identificador
+# de la norma (p. ej. DECTO-2026-25-APN-PTE) como columnas tipadas.
+#
+# Todo corre por columna sobre el lote completo con los kernels de Arrow
+# (RE2): un filtro barato descarta las filas sin montos y sobre las
+# candidatas se extrae la primera coincidencia, se la quita y se repite
+# hasta MAX_COINCIDENCIAS veces. Los números en formato argentino
+# (1.250.000,50) se convierten también por columna, sin bucles por fila.
+
+# Conversión de dólares a pesos para ponderar (ajustable por entorno)
+TIPO_CAMBIO_USD = float(os.environ.get("TIPO_CAMBIO_USD", "1000"))
+# Montos (en pesos) desde los que el índice empieza a subir
+UMBRAL_MONTO = 100_000_000.0
+# Puntos máximos que puede sumar un monto grande (uno por orden de magnitud)
+BONO_MAXIMO = 1.0
+
+# Montos / porcentajes que se leen como máximo de un mismo detalle
+MAX_COINCIDENCIAS = 4
+
+COLUMNAS_RASGOS = ["monto_ars", "monto_usd", "porcentaje", "norma"]
+
+_NUMERO = r"\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:,\d+)?"
+_MULTIPLICADOR = r"mil\s+millones|millones|mill[oó]n|mil"
+
+PATRON_MONTO = (
+    rf"(?P<prefijo>U\$[Ss]|US\$|USD|ARS|\$)\s*(?P<numero>{_NUMERO})(?:\s*(?P<multiplicador>{_MULTIPLICADOR})\b)?"
+    rf"|(?P<numero_sufijo>{_NUMERO})\s*(?:(?P<multiplicador_sufijo>{_MULTIPLICADOR})\s+(?:de\s+)?)?(?P<sufijo>pesos|d[oó]lares)"
+)
+PATRON_PORCENTAJE = r"(?P<porcentaje>\d{1,3}(?:,\d+)?)\s*(?:%|por\s*ciento)"
+PATRON_NORMA = r"(?P<norma>[A-Z]{2,6}-\d{4}-\d+-[A-Z]{2,5}(?:-[A-Z#]{2,12})*)"
+
+# Filtros previos: sin grupos de captura, se resuelven muy rápido
+FILTRO_MONTO = r"\$|USD|ARS|pesos|d[oó]lares"
+FILTRO_PORCENTAJE = r"%|por\s*ciento"
+FILTRO_NORMA = r"-20\d\d-"
+
+MULTIPLICADORES = {"mil": 1e3, "millon": 1e6, "millón": 1e6, "millones": 1e6, "mil millones": 1e9}
+PREFIJOS_USD = {"u$s", "us$", "usd"}
+
+# Entra en VERSION_REGLAS (y así en la clave del memo): cambiar un patrón
+# la cambia sola; REVISION_RASGOS se sube a mano al tocar la conversión
+# de números (numero_argentino, extraer_rasgos)
+REVISION_RASGOS = 1
+VERSION_RASGOS = f"{REVISION_RASGOS}-" + hashlib.sha256(
+    json.dumps(
+        [PATRON_MONTO, PATRON_PORCENTAJE, PATRON_NORMA, FILTRO_MONTO, FILTRO_PORCENTAJE, FILTRO_NORMA,
+         MULTIPLICADORES, sorted(PREFIJOS_USD), MAX_COINCIDENCIAS],
+        ensure_ascii=False,
+    ).encode("utf-8")
+).hexdigest()[:8]
+
+
+def numero_argentino(serie):
+    """'1.250.000,50' -> 1250000.5 sobre toda la Serie (float64, NaN si no parsea)"""
+    texto = serie.astype("string").str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    return pd.to_numeric(texto, errors="coerce").astype("float64")
+
+
+def _candidatas(texto, filtro):
+    return texto[texto.str.contains(filtro, case=False, regex=True, na=False)]
+
+
+def _coincidencias(texto, patron):
+    """
+    Todas las coincidencias (hasta MAX_COINCIDENCIAS por fila) como DataFrame
+    con una columna por grupo e índice (fila, n), igual que str.extractall.
+    """
+    if pc is None:
+        hallazgos = texto.str.extractall(patron, flags=re.IGNORECASE)
+        hallazgos = hallazgos[hallazgos.index.get_level_values(1) < MAX_COINCIDENCIAS]
+        return hallazgos.replace("", np.nan)
+
+    patron = "(?i)" + patron
+    filas = texto.index.to_numpy()
+    restante = pa.array(texto.to_numpy(dtype=object), type=pa.string())
+    partes = []
+    for n in range(MAX_COINCIDENCIAS):
+        if len(restante) == 0:
+            break
+        encontrado = pc.extract_regex(restante, patron)
+        hay = pc.is_valid(encontrado)
+        if not pc.any(hay).as_py():
+            break
+        grupos = encontrado.filter(hay).flatten()
+        filas_n = filas[hay.to_numpy(zero_copy_only=False)]
+        parte = pd.DataFrame(
+            {campo.name: grupos[i].to_pandas() for i, campo in enumerate(encontrado.type)}
+        ).replace("", np.nan)
+        parte.index = pd.MultiIndex.from_arrays([filas_n, np.full(len(filas_n), n)], names=[None, "match"])
+        partes.append(parte)
+        # Se quita la coincidencia y se sigue solo con las filas que tuvieron una
+        restante = pc.replace_substring_regex(restante.filter(hay), patron, "", max_replacements=1)
+        filas = filas_n
+    if not partes:
+        return pd.DataFrame()
+    return pd.concat(partes).sort_index()
+
+
+def _extraer_montos(texto):
+    """Suma por fila de los montos en pesos y en dólares"""
+    vacio = pd.Series(np.nan, index=texto.index, dtype="float64")
+    candidatas = _candidatas(texto, FILTRO_MONTO)
+    if candidatas.empty:
+        return vacio, vacio.copy()
+
+    hallazgos = _coincidencias(candidatas, PATRON_MONTO)
+    if hallazgos.empty:
+        return vacio, vacio.copy()
+
+    numero = hallazgos["numero"].fillna(hallazgos["numero_sufijo"])
+    multiplicador = (
+        hallazgos["multiplicador"]
+        .fillna(hallazgos["multiplicador_sufijo"])
+        .str.lower()
+        .str.replace(r"\s+", " ", regex=True)
+        .map(MULTIPLICADORES)
+        .fillna(1.0)
+        .astype("float64")
+    )
+    valor = numero_argentino(numero) * multiplicador
+    es_usd = hallazgos["prefijo"].str.lower().isin(PREFIJOS_USD) | hallazgos["sufijo"].str.lower().str.startswith("d").fillna(False)
+
+    fila = hallazgos.index.get_level_values(0)
+    ars = valor.where(~es_usd).groupby(fila).sum(min_count=1)
+    usd = valor.where(es_usd).groupby(fila).sum(min_count=1)
+    return ars.reindex(texto.index).astype("float64"), usd.reindex(texto.index).astype("float64")
+
+
+def _extraer_porcentaje(texto):
+    """Mayor porcentaje mencionado (aumentos tarifarios, alícuotas)"""
+    resultado = pd.Series(np.nan, index=texto.index, dtype="float64")
+    candidatas = _candidatas(texto, FILTRO_PORCENTAJE)
+    if candidatas.empty:
+        return resultado
+    hallazgos = _coincidencias(candidatas, PATRON_PORCENTAJE)
+    if hallazgos.empty:
+        return resultado
+    maximos = numero_argentino(hallazgos["porcentaje"]).groupby(hallazgos.index.get_level_values(0)).max()
+    return maximos.reindex(texto.index).astype("float64")
+
+
+def _extraer_norma(texto):
+    """Primer identificador GDE de la norma (DECTO-2026-25-APN-PTE, RESOL-...)"""
+    resultado = pd.Series(pd.NA, index=texto.index, dtype="string")
+    candidatas = _candidatas(texto, FILTRO_NORMA)
+    if candidatas.empty:
+        return resultado
+    if pc is None:
+        resultado.loc[candidatas.index] = candidatas.str.extract(PATRON_NORMA, expand=False)
+    else:
+        encontrado = pc.extract_regex(pa.array(candidatas.to_numpy(dtype=object), type=pa.string()), PATRON_NORMA)
+        resultado.loc[candidatas.index] = encontrado.field("norma").to_pandas().to_numpy()
+    return resultado
+
+
+def extraer_rasgos(df, columna="detalle"):
+    """Retorna un DataFrame con COLUMNAS_RASGOS alineado al índice de df"""
+    if columna not in df.columns:
+        texto = pd.Series("", index=df.index, dtype="string")
+    else:
+        # Un solo bloque contiguo: los DataFrames concatenados traen miles de
+        # fragmentos Arrow y cada kernel pagaría un costo fijo por fragmento
+        valores = df[columna].to_numpy(dtype=object, na_value="")
+        texto = pd.Series(valores, index=df.index, dtype="string[pyarrow]" if pc is not None else "string")
+    monto_ars, monto_usd = _extraer_montos(texto)
+    return pd.DataFrame(
+        {
+            "monto_ars": monto_ars,
+            "monto_usd": monto_usd,
+            "porcentaje": _extraer_porcentaje(texto),
+            "norma": _extraer_norma(texto),
+        },
+        index=df.index,
+    )
+
+
+def monto_equivalente(rasgos):
+    """Monto total en pesos (los dólares al TIPO_CAMBIO_USD)"""
+    return rasgos["monto_ars"].fillna(0.0) + rasgos["monto_usd"].fillna(0.0) * TIPO_CAMBIO_USD
+
+
+def bono_por_monto(montos):
+    """Puntos extra para el índice: log10(monto / UMBRAL_MONTO) acotado a [0, BONO_MAXIMO]"""
+    valores = np.asarray(montos, dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bono = np.log10(valores / UMBRAL_MONTO)
+    return np.clip(np.nan_to_num(bono, nan=0.0, neginf=0.0), 0.0, BONO_MAXIMO)
+
+
+PARAMETROS_PONDERACION = {
+    "tipo_cambio_usd": TIPO_CAMBIO_USD,
+    "umbral_monto": UMBRAL_MONTO,
+    "bono_maximo": BONO_MAXIMO,
+}
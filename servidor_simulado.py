@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Servidor Simulado - Comprar.gob.ar y BORA sin salir a internet
+==============================================================
+
+Sirve, en un puerto local:
+    /Compras.aspx?qs=...        Grilla sintética ctl00_CPH1_GridLicitaciones
+                                (GET = página 1, POST __doPostBack = página N)
+    /seccion/primera            Snapshot grabado debug_page_primera.html
+    /seccion/tercera            Snapshot grabado debug_page_tercera.html
+    /                           Snapshot grabado debug_page.html
+    /PLIEGO/...                 Detalle de un proceso, con enlaces a sus anexos
+    /ANEXOS/<qs>/pliego.docx    Pliego sintético (DOCX)
+    /ANEXOS/<qs>/anexo.pdf      Anexo sintético (PDF de una página)
+    /webhook                    Receptor de alertas (POST JSON, ver notificadores.py)
+
+También incluye un receptor SMTP mínimo (iniciar_smtp) para probar el
+notificador de correo sin un servidor real.
+
+La latencia, la tasa de errores 503 y la cantidad de páginas son
+configurables, para medir el scraper y probar la paginación en cualquier
+equipo Linux sin tocar los portales reales.
+
+USO:
+    python servidor_simulado.py --puerto 8765 --paginas 50 --latencia 0.2 --tasa-error 0.05
+    COMPRAR_URL="http://127.0.0.1:8765/Compras.aspx?qs=W1HXHGHtH10=" python diario.py
+"""
+
+import os
+import json
+import time
+import email
+import email.policy
+import io
+import random
+import zipfile
+import argparse
+import threading
+import socketserver
+from html import escape
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DIRECTORIO_BASE = os.path.dirname(os.path.abspath(__file__))
+
+SNAPSHOTS = {
+    "/": "debug_page.html",
+    "/seccion/primera": "debug_page_primera.html",
+    "/seccion/tercera": "debug_page_tercera.html",
+}
+
+OBJETIVO_GRILLA = "ctl00$CPH1$GridLicitaciones"
+
+# Textos sintéticos: mezclan escenarios de la matriz y casos neutros
+PLANTILLAS_DETALLE = [
+    "Redeterminación de precios de la obra pública {n}",
+    "Contratación directa para servicio de mantenimiento {n}",
+    "Concesión de uso de espacio para cantina {n}",
+    "Adquisición de alimento para comedores escolares {n}",
+    "Revisión tarifaria del peaje de la ruta nacional {n}",
+    "Adquisición de insumos de oficina {n}",
+    "Servicio de limpieza integral de edificio {n}",
+    "Provisión de equipamiento informático {n}",
+]
+TIPOS_PROCESO = [
+    "Licitación Pública",
+    "Licitación Privada",
+    "Contratación Directa",
+    "Concurso Público",
+]
+
+
+class ConfiguracionSimulador:
+    def __init__(self, paginas=5, filas_por_pagina=10, latencia=0.0, tasa_error=0.0, semilla=42):
+        self.paginas = paginas
+        self.filas_por_pagina = filas_por_pagina
+        self.latencia = latencia
+        self.tasa_error = tasa_error
+        self.semilla = semilla
+        self.pedidos = 0
+        self.novedades = []  # Publicaciones nuevas, al principio de la página 1
+        self.webhooks = []  # Cuerpos JSON recibidos en /webhook
+        self._lock = threading.Lock()
+
+    def publicar(self, detalle, tipo_proceso="Contratación Directa"):
+        """Agrega un proceso recién publicado (cambia solo la página 1)"""
+        with self._lock:
+            n = len(self.novedades) + 1
+            self.novedades.insert(
+                0,
+                {
+                    "nro_proceso": f"99-{9000 + n}-NOV26",
+                    "detalle": detalle,
+                    "tipo_proceso": tipo_proceso,
+                    "fecha_apertura": "30/03/2026 10:00 Hrs.",
+                    "link": f"/PLIEGO/VistaPreviaPliegoCiudadano.aspx?qs=NOV{n:06d}",
+                },
+            )
+
+    def contar_pedido(self):
+        with self._lock:
+            self.pedidos += 1
+            return self.pedidos
+
+
+# ==========================================
+# GENERACIÓN DE LA GRILLA ASP.NET
+# ==========================================
+def filas_de_pagina(config, pagina):
+    """Filas deterministas para una página (misma semilla, mismos datos)"""
+    rng = random.Random(config.semilla * 100003 + pagina)
+    filas = []
+    for i in range(config.filas_por_pagina):
+        n = (pagina - 1) * config.filas_por_pagina + i + 1
+        dia = 1 + n % 28
+        filas.append(
+            {
+                "nro_proceso": f"{n:02d}-{1000 + n}-LPU26",
+                "detalle": rng.choice(PLANTILLAS_DETALLE).format(n=n),
+                "tipo_proceso": rng.choice(TIPOS_PROCESO),
+                "fecha_apertura": f"{dia:02d}/03/2026 10:00 Hrs.",
+                "link": f"/PLIEGO/VistaPreviaPliegoCiudadano.aspx?qs=SIM{n:06d}",
+            }
+        )
+    return filas
+
+
+def _link_pagina(numero):
+    return f"javascript:__doPostBack('{OBJETIVO_GRILLA}','Page${numero}')"
+
+
+def renderizar_grilla(config, pagina):
+    filas_html = []
+    filas = filas_de_pagina(config, pagina)
+    if pagina == 1:
+        filas = list(config.novedades) + filas
+    for fila in filas:
+        filas_html.append(
+            "<tr>"
+            f"<td>{escape(fila['nro_proceso'][:2])}</td>"
+            f"<td>{escape(fila['nro_proceso'])}</td>"
+            f"<td><a href=\"{escape(fila['link'])}\">{escape(fila['detalle'])}</a></td>"
+            f"<td>{escape(fila['tipo_proceso'])}</td>"
+            f"<td>{escape(fila['fecha_apertura'])}</td>"
+            "<td>Publicado</td>"
+            "</tr>"
+        )
+
+    # Fila paginadora tal como la arma un GridView (tabla anidada)
+    enlaces = []
+    for numero in range(1, config.paginas + 1):
+        if numero == pagina:
+            enlaces.append(f"<td><span>{numero}</span></td>")
+        else:
+            enlaces.append(f"<td><a href=\"{_link_pagina(numero)}\">{numero}</a></td>")
+    paginador = (
+        '<tr class="pgr"><td colspan="6"><table><tr>'
+        + "".join(enlaces)
+        + "</tr></table></td></tr>"
+    )
+
+    return f"""<!DOCTYPE html>
+<html><head><title>COMPR.AR - Simulador</title></head>
+<body>
+<form method="post" action="./Compras.aspx?qs=W1HXHGHtH10=" id="aspnetForm">
+<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value="" />
+<input type="hidden" name="__EVENTARGUMENT" id="__EVENTARGUMENT" value="" />
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="SIMVS{pagina:06d}" />
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="SIMEV" />
+<table id="ctl00_CPH1_GridLicitaciones">
+<tr><th>#</th><th>Número de proceso</th><th>Nombre descriptivo</th><th>Tipo de proceso</th><th>Fecha de apertura</th><th>Estado</th></tr>
+{''.join(filas_html)}
+{paginador}
+</table>
+</form>
+</body></html>"""
+
+
+# ==========================================
+# ANEXOS SINTÉTICOS (DOCX / PDF)
+# ==========================================
+def texto_pliego(qs):
+    return f"Pliego de bases y condiciones {qs}. Redeterminación de precios con presupuesto oficial de $ 2.500.000.000."
+
+
+def texto_anexo_pdf(qs):
+    return f"Anexo {qs}: cuadro tarifario con aumento de tarifa del 40%."
+
+
+def docx_simulado(texto):
+    """DOCX mínimo: un zip con word/document.xml"""
+    documento = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body><w:p><w:r><w:t>{escape(texto)}</w:t></w:r></w:p></w:body></w:document>"
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as z:
+        z.writestr("[Content_Types].xml", '<?xml version="1.0"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>')
+        z.writestr("word/document.xml", documento)
+    return buffer.getvalue()
+
+
+def pdf_simulado(texto):
+    """PDF de una página con el texto en Helvetica (solo ASCII)"""
+    literal = texto.encode("latin-1", errors="replace").replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+    contenido = b"BT /F1 12 Tf 72 720 Td (" + literal + b") Tj ET"
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(contenido)).encode() + b" >>\nstream\n" + contenido + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    salida = bytearray(b"%PDF-1.4\n")
+    posiciones = []
+    for i, objeto in enumerate(objetos, start=1):
+        posiciones.append(len(salida))
+        salida += f"{i} 0 obj\n".encode() + objeto + b"\nendobj\n"
+    inicio_xref = len(salida)
+    salida += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode()
+    for posicion in posiciones:
+        salida += f"{posicion:010d} 00000 n \n".encode()
+    salida += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n".encode()
+    return bytes(salida)
+
+
+def pagina_pliego(qs):
+    return f"""<!DOCTYPE html>
+<html><head><title>Pliego {escape(qs)}</title></head>
+<body>
+<h1>Vista previa del pliego {escape(qs)}</h1>
+<ul>
+<li><a href="/ANEXOS/{escape(qs)}/pliego.docx">Pliego de bases y condiciones</a></li>
+<li><a href="/ANEXOS/{escape(qs)}/anexo.pdf">Anexo I</a></li>
+</ul>
+</body></html>"""
+
+
+# ==========================================
+# SERVIDOR HTTP
+# ==========================================
+def crear_manejador(config):
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, como los portales reales
+
+        def _responder(self, codigo, cuerpo, tipo="text/html; charset=utf-8"):
+            datos = cuerpo if isinstance(cuerpo, bytes) else cuerpo.encode("utf-8")
+            self.send_response(codigo)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def _simular_condiciones(self):
+            """Aplica latencia y errores configurados. True si ya respondió."""
+            config.contar_pedido()
+            if config.latencia:
+                time.sleep(random.uniform(0.5, 1.5) * config.latencia)
+            if config.tasa_error and random.random() < config.tasa_error:
+                self._responder(503, "Servicio no disponible (simulado)")
+                return True
+            return False
+
+        def do_GET(self):
+            if self._simular_condiciones():
+                return
+            ruta = urlsplit(self.path).path
+
+            if ruta.lower() == "/compras.aspx":
+                return self._responder(200, renderizar_grilla(config, 1))
+            if ruta in SNAPSHOTS:
+                archivo = os.path.join(DIRECTORIO_BASE, SNAPSHOTS[ruta])
+                if os.path.exists(archivo):
+                    with open(archivo, encoding="utf-8") as f:
+                        return self._responder(200, f.read())
+            if ruta.startswith("/PLIEGO/"):
+                qs = parse_qs(urlsplit(self.path).query).get("qs", [""])[0]
+                return self._responder(200, pagina_pliego(qs))
+            if ruta.startswith("/ANEXOS/"):
+                partes = ruta.split("/")
+                if len(partes) == 4 and partes[3] == "pliego.docx":
+                    tipo = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                    return self._responder(200, docx_simulado(texto_pliego(partes[2])), tipo)
+                if len(partes) == 4 and partes[3] == "anexo.pdf":
+                    return self._responder(200, pdf_simulado(texto_anexo_pdf(partes[2])), "application/pdf")
+            self._responder(404, "No encontrado")
+
+        def do_POST(self):
+            largo = int(self.headers.get("Content-Length", 0))
+            cuerpo = self.rfile.read(largo).decode("utf-8")
+            if self._simular_condiciones():
+                return
+            if urlsplit(self.path).path == "/webhook":
+                config.webhooks.append(json.loads(cuerpo or "{}"))
+                return self._responder(204, "")
+            formulario = parse_qs(cuerpo)
+            if urlsplit(self.path).path.lower() != "/compras.aspx":
+                return self._responder(404, "No encontrado")
+
+            # Un postback sin VIEWSTATE es rechazado por ASP.NET
+            if not formulario.get("__VIEWSTATE"):
+                return self._responder(500, "Validation of viewstate MAC failed")
+
+            objetivo = formulario.get("__EVENTTARGET", [""])[0]
+            argumento = formulario.get("__EVENTARGUMENT", [""])[0]
+            pagina = 1
+            if objetivo == OBJETIVO_GRILLA and argumento.startswith("Page$"):
+                try:
+                    pagina = int(argumento.split("$", 1)[1])
+                except ValueError:
+                    pagina = 1
+            if not 1 <= pagina <= config.paginas:
+                return self._responder(500, "Índice de página fuera de rango")
+            self._responder(200, renderizar_grilla(config, pagina))
+
+        def log_message(self, *args):
+            pass
+
+    return Manejador
+
+
+def iniciar_servidor(config=None, host="127.0.0.1", puerto=0):
+    """Levanta el simulador en un hilo. Retorna (servidor, url_base)."""
+    config = config or ConfiguracionSimulador()
+    servidor = ThreadingHTTPServer((host, puerto), crear_manejador(config))
+    servidor.daemon_threads = True
+    servidor.config = config
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://{host}:{servidor.server_port}"
+
+
+# ==========================================
+# RECEPTOR SMTP MÍNIMO
+# ==========================================
+class _ManejadorSMTP(socketserver.StreamRequestHandler):
+    """Lo justo de RFC 5321 para que smtplib entregue un mensaje"""
+
+    def _linea(self, texto):
+        self.wfile.write(f"{texto}\r\n".encode("utf-8"))
+
+    def handle(self):
+        self._linea("220 simulador ESMTP")
+        sobre = {"remitente": None, "destinatarios": []}
+        while True:
+            linea = self.rfile.readline().decode("utf-8", "replace")
+            if not linea:
+                return
+            comando = linea.strip().upper()
+            if comando.startswith(("EHLO", "HELO")):
+                self._linea("250 simulador")
+            elif comando.startswith("MAIL FROM:"):
+                sobre["remitente"] = linea.strip()[10:].strip("<> ")
+                self._linea("250 OK")
+            elif comando.startswith("RCPT TO:"):
+                sobre["destinatarios"].append(linea.strip()[8:].strip("<> "))
+                self._linea("250 OK")
+            elif comando == "DATA":
+                self._linea("354 Fin con <CRLF>.<CRLF>")
+                partes = []
+                while True:
+                    dato = self.rfile.readline().decode("utf-8", "replace")
+                    if dato in ("", ".\r\n", ".\n"):
+                        break
+                    partes.append(dato[1:] if dato.startswith("..") else dato)
+                self.server.mensajes.append(
+                    {**sobre, "mensaje": email.message_from_string("".join(partes), policy=email.policy.default)}
+                )
+                sobre = {"remitente": None, "destinatarios": []}
+                self._linea("250 OK")
+            elif comando in ("RSET", "NOOP"):
+                self._linea("250 OK")
+            elif comando == "QUIT":
+                self._linea("221 Chau")
+                return
+            else:
+                self._linea("502 No implementado")
+
+
+def iniciar_smtp(host="127.0.0.1", puerto=0):
+    """Levanta el receptor SMTP en un hilo. Los mensajes quedan en servidor.mensajes"""
+    servidor = socketserver.ThreadingTCPServer((host, puerto), _ManejadorSMTP)
+    servidor.daemon_threads = True
+    servidor.mensajes = []
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, servidor.server_address[1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulador local de Comprar.gob.ar y BORA")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--paginas", type=int, default=5)
+    parser.add_argument("--filas", type=int, default=10, help="Filas por página")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos promedio")
+    parser.add_argument("--tasa-error", type=float, default=0.0, help="Probabilidad de 503")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    config = ConfiguracionSimulador(args.paginas, args.filas, args.latencia, args.tasa_error, args.semilla)
+    servidor = ThreadingHTTPServer((args.host, args.puerto), crear_manejador(config))
+    servidor.daemon_threads = True
+    print(f"🧪 Simulador escuchando en http://{args.host}:{args.puerto}")
+    print(f"   Comprar: http://{args.host}:{args.puerto}/Compras.aspx?qs=W1HXHGHtH10=")
+    print(f"   BORA:    http://{args.host}:{args.puerto}/seccion/primera")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n🛑 Simulador detenido ({config.pedidos} pedidos atendidos)")
@@ -0,0 +1,378 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from analisis import MATRIZ_TEORICA, VERSION_REGLAS, aviso_sin_anexos, texto_para_clasificar
+from catalogo import todos_los_reportes
+from escritura_atomica import archivo_atomico, bloqueo
+from rasgos_numericos import bono_por_monto, extraer_rasgos, monto_equivalente
+
+# ==========================================
+# SIMULADOR "¿QUÉ PASA SI...?" DE PALABRAS CLAVE
+# ==========================================
+# Antes de sumar a MATRIZ_TEORICA una palabra que propone sugeridor_reglas.py
+# conviene saber cuántas filas del archivo histórico pasaría a clasificar,
+# qué clasificaciones pisaría (la última categoría de la matriz que
+# coincide gana) y cómo se moverían los niveles de riesgo.
+#
+# El archivo se normaliza una vez (igual que limpiar_texto_curado) y se
+# guarda como índice invertido en data/indice_reglas.npz:
+#
+#   textos distintos  -> con su cantidad de apariciones y su monto
+#   vocabulario       -> token alfanumérico -> lista ordenada de textos
+#
+# La matriz busca subcadenas, no palabras: "iva" también está en
+# "derivados". Por eso cada palabra de la keyword se busca dentro del
+# vocabulario (miles de tokens, no millones de filas), se unen las listas
+# de esos tokens, se intersectan entre palabras y solo los candidatos se
+# verifican con la subcadena completa. Una simulación tarda milisegundos.
+#
+#   python simulador_reglas.py --agregar "Obra Pública / Contratos" "ruta nacional"
+#   python simulador_reglas.py --quitar "Traslado de Impuestos" "iva"
+
+DATA_DIR = "/app/data" if os.path.exists("/app") else "data"
+NOMBRE_INDICE = "indice_reglas.npz"
+BLOQUEO_INDICE = "indice_reglas"
+VERSION_INDICE = 1
+NO_IDENTIFICADO = "No identificado"
+NIVELES = ["Alto", "Medio", "Bajo"]
+MAX_EJEMPLOS = 10
+
+
+def ruta_indice(data_dir):
+    return os.path.join(data_dir, NOMBRE_INDICE)
+
+
+def normalizar_textos(textos):
+    """Minúsculas y sin tildes, columna completa (mismo criterio que limpiar_texto_curado)"""
+    arreglo = pa.array(pd.Series(textos).astype("string").fillna(""), type=pa.large_string())
+    if isinstance(arreglo, pa.ChunkedArray):
+        arreglo = arreglo.combine_chunks()
+    return pc.replace_substring_regex(pc.utf8_normalize(pc.utf8_lower(arreglo), "NFD"), r"\p{Mn}+", "")
+
+
+def normalizar_keyword(keyword):
+    return normalizar_textos([keyword])[0].as_py()
+
+
+def _palabras(texto_normalizado):
+    return [p for p in pc.split_pattern_regex(pa.array([texto_normalizado]), r"[^a-z0-9]+")[0].as_py() if p]
+
+
+# Los textos se guardan en el .npz como buffers Arrow (offsets + bytes)
+def _a_buffers(arreglo):
+    arreglo = arreglo.cast(pa.large_string())
+    offsets = np.frombuffer(arreglo.buffers()[1], dtype=np.int64)[arreglo.offset : arreglo.offset + len(arreglo) + 1]
+    datos = np.frombuffer(arreglo.buffers()[2] or b"", dtype=np.uint8)[offsets[0] : offsets[-1]]
+    return offsets - offsets[0], datos
+
+
+def _desde_buffers(offsets, datos):
+    return pa.Array.from_buffers(pa.large_string(), len(offsets) - 1, [None, pa.py_buffer(offsets), pa.py_buffer(datos)])
+
+
+def _union(listas, total):
+    """Unión ordenada de listas de ids (marcar un vector de bits es más rápido que np.unique)"""
+    marcas = np.zeros(total, dtype=bool)
+    for lista in listas:
+        marcas[lista] = True
+    return np.flatnonzero(marcas)
+
+
+# ==========================================
+# 1. ÍNDICE INVERTIDO DEL ARCHIVO
+# ==========================================
+class IndiceArchivo:
+    """Textos distintos normalizados y posting lists token -> textos"""
+
+    def __init__(self, textos, conteos, montos, vocabulario, inicio_postings, postings, huella=None):
+        self.textos = textos
+        self.conteos = conteos
+        self.montos = montos
+        self.vocabulario = vocabulario
+        self.inicio_postings = inicio_postings
+        self.postings = postings
+        self.huella = huella
+
+    def __len__(self):
+        return len(self.textos)
+
+    @classmethod
+    def construir(cls, detalles, huella=None):
+        """detalles: Serie con el texto original de todas las filas del archivo"""
+        normalizados = normalizar_textos(detalles)
+        codificado = pc.dictionary_encode(normalizados)
+        codigos = codificado.indices.to_numpy(zero_copy_only=False)
+        textos = codificado.dictionary
+        conteos = np.bincount(codigos, minlength=len(textos)).astype(np.int64)
+        # Monto por texto distinto (el de su primera aparición)
+        primera = np.unique(codigos, return_index=True)[1]
+        rasgos = extraer_rasgos(pd.DataFrame({"detalle": pd.Series(detalles).iloc[primera].reset_index(drop=True)}))
+        montos = monto_equivalente(rasgos).to_numpy(dtype="float64")
+
+        listas = pc.split_pattern_regex(textos, r"[^a-z0-9]+")
+        tokens = pc.dictionary_encode(pc.list_flatten(listas))
+        id_token = tokens.indices.to_numpy(zero_copy_only=False).astype(np.int64)
+        id_texto = pc.list_parent_indices(listas).to_numpy().astype(np.int64)
+        # Pares (token, texto) únicos ordenados por token y luego por texto
+        pares = np.unique(id_token * len(textos) + id_texto)
+        por_token = np.bincount(pares // len(textos), minlength=len(tokens.dictionary))
+        inicio = np.concatenate([[0], np.cumsum(por_token)])
+        return cls(textos, conteos, montos, tokens.dictionary.cast(pa.large_string()), inicio, pares % len(textos), huella)
+
+    def textos_con_palabra(self, palabra):
+        """Textos con algún token que contiene 'palabra' (unión de posting lists)"""
+        tokens = np.flatnonzero(pc.match_substring(self.vocabulario, palabra).to_numpy(zero_copy_only=False))
+        if len(tokens) == 0:
+            return np.array([], dtype=np.int64)
+        if len(tokens) == 1:
+            return self.postings[self.inicio_postings[tokens[0]] : self.inicio_postings[tokens[0] + 1]]
+        return _union([self.postings[self.inicio_postings[t] : self.inicio_postings[t + 1]] for t in tokens], len(self.textos))
+
+    def textos_con(self, keyword):
+        """Ids (ordenados) de los textos que contienen la keyword como subcadena"""
+        keyword = normalizar_keyword(keyword)
+        palabras = _palabras(keyword)
+        if not palabras:  # Keyword sin letras ni números: se verifica sobre todo el archivo
+            candidatos = np.arange(len(self.textos))
+        else:
+            candidatos = None
+            for palabra in sorted(palabras, key=len, reverse=True):
+                encontrados = self.textos_con_palabra(palabra)
+                candidatos = encontrados if candidatos is None else np.intersect1d(candidatos, encontrados, assume_unique=True)
+                if len(candidatos) == 0:
+                    return candidatos
+        if len(palabras) == 1 and palabras[0] == keyword:
+            return candidatos  # La palabra ya es la subcadena completa
+        coinciden = pc.match_substring(self.textos.take(pa.array(candidatos)), keyword).to_numpy(zero_copy_only=False)
+        return candidatos[coinciden]
+
+    # ---------- persistencia ----------
+    def guardar(self, ruta):
+        textos_offsets, textos_datos = _a_buffers(self.textos)
+        vocab_offsets, vocab_datos = _a_buffers(self.vocabulario)
+        with archivo_atomico(ruta) as temporal:
+            with open(temporal, "wb") as f:
+                np.savez(
+                    f,
+                    meta=np.array(json.dumps({"version": VERSION_INDICE, "huella": self.huella})),
+                    textos_offsets=textos_offsets,
+                    textos_datos=textos_datos,
+                    vocab_offsets=vocab_offsets,
+                    vocab_datos=vocab_datos,
+                    conteos=self.conteos,
+                    montos=self.montos,
+                    inicio_postings=self.inicio_postings,
+                    postings=self.postings,
+                )
+
+    @classmethod
+    def cargar(cls, ruta, huella=None):
+        """Índice guardado, o None si no existe o corresponde a otro estado del archivo"""
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with np.load(ruta) as d:
+                meta = json.loads(str(d["meta"]))
+                if meta.get("version") != VERSION_INDICE or (huella is not None and meta.get("huella") != huella):
+                    return None
+                return cls(
+                    _desde_buffers(d["textos_offsets"], d["textos_datos"]),
+                    d["conteos"],
+                    d["montos"],
+                    _desde_buffers(d["vocab_offsets"], d["vocab_datos"]),
+                    d["inicio_postings"],
+                    d["postings"],
+                    meta.get("huella"),
+                )
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Índice de reglas ilegible ({ruta}): {e}")
+            return None
+
+
+def huella_del_archivo(entradas):
+    """Cambia si se agrega, quita o reescribe cualquier reporte del catálogo"""
+    firmas = sorted(f"{e['ruta']}:{e.get('sha256')}" for e in entradas)
+    return hashlib.sha256("\n".join(firmas).encode("utf-8")).hexdigest()[:16]
+
+
+def cargar_o_construir_indice(data_dir=None, leer=None):
+    """Índice vigente de data/ (se reconstruye solo si cambió el catálogo)"""
+    from deltas import leer_dia
+
+    data_dir = data_dir or DATA_DIR
+    leer = leer or (lambda ruta: leer_dia(ruta, data_dir))
+    entradas = todos_los_reportes(data_dir) or []
+    huella = huella_del_archivo(entradas)
+    indice = IndiceArchivo.cargar(ruta_indice(data_dir), huella)
+    if indice is not None:
+        return indice
+
+    with bloqueo(data_dir, BLOQUEO_INDICE):
+        detalles = []
+        for entrada in entradas:
+            try:
+                df = leer(os.path.join(data_dir, entrada["ruta"]))
+            except Exception as e:
+                print(f"⚠️ {entrada['ruta']}: {e}")
+                continue
+            if "detalle" in df.columns:
+                detalles.append(texto_para_clasificar(df).astype("string"))
+        archivo = pd.concat(detalles, ignore_index=True) if detalles else pd.Series([], dtype="string")
+        indice = IndiceArchivo.construir(archivo, huella)
+        indice.guardar(ruta_indice(data_dir))
+    print(f"🗂️ Índice de reglas: {int(indice.conteos.sum())} filas, {len(indice)} textos distintos, {len(indice.vocabulario)} tokens")
+    return indice
+
+
+# ==========================================
+# 2. SIMULACIÓN
+# ==========================================
+def _nivel(indice_riesgo):
+    return np.select([indice_riesgo >= 8, indice_riesgo >= 5], ["Alto", "Medio"], default="Bajo")
+
+
+class SimuladorReglas:
+    """
+    Uso:
+        simulador = SimuladorReglas(cargar_o_construir_indice(data_dir))
+        delta = simulador.simular(agregar=[("Obra Pública / Contratos", "ruta nacional")])
+    """
+
+    def __init__(self, indice, matriz=None):
+        self.indice = indice
+        self.matriz = matriz or MATRIZ_TEORICA
+        self.categorias = list(self.matriz)
+        self.pesos = np.array([0.0] + [self.matriz[c]["peso"] for c in self.categorias])
+        self.bonos = bono_por_monto(indice.montos)
+        self._cache = {}
+        # Una máscara de bits por texto: bit i = la categoría i coincide
+        self.mascaras = np.zeros(len(indice), dtype=np.uint32)
+        for i, categoria in enumerate(self.categorias):
+            for keyword in self.matriz[categoria]["keywords"]:
+                self.mascaras[self.textos_con(keyword)] |= np.uint32(1 << i)
+
+    def textos_con(self, keyword):
+        clave = normalizar_keyword(keyword)
+        if clave not in self._cache:
+            self._cache[clave] = self.indice.textos_con(keyword)
+        return self._cache[clave]
+
+    def _etiquetas(self, mascaras):
+        """0 = No identificado; i+1 = la última categoría (en orden de la matriz) que coincide"""
+        ultima = np.zeros(len(mascaras), dtype=np.int64)
+        for i in range(len(self.categorias)):
+            ultima[(mascaras >> np.uint32(i)) & np.uint32(1) == 1] = i + 1
+        return ultima
+
+    def _riesgo(self, etiquetas, textos):
+        peso = self.pesos[etiquetas]
+        return np.where(peso > 0, np.minimum(peso + self.bonos[textos], 10.0), 0.0).round(2)
+
+    def _posicion(self, categoria):
+        if categoria not in self.matriz:
+            raise ValueError(f"Categoría desconocida: {categoria!r} (opciones: {', '.join(self.categorias)})")
+        return self.categorias.index(categoria)
+
+    def simular(self, agregar=(), quitar=()):
+        """
+        agregar / quitar: [(categoría, keyword), ...]. Retorna el reporte de
+        diferencias contra la matriz vigente, ponderado por filas del archivo.
+        """
+        inicio = time.perf_counter()
+        nuevas = {}  # texto -> máscara simulada (solo los afectados)
+        afectados = []
+        for categoria, keyword in quitar:
+            i = self._posicion(categoria)
+            restantes = [k for k in self.matriz[categoria]["keywords"] if normalizar_keyword(k) != normalizar_keyword(keyword)]
+            candidatos = self.textos_con(keyword)
+            # Siguen coincidiendo los que tienen otra keyword de la categoría
+            siguen = np.zeros(len(candidatos), dtype=bool)
+            for k in restantes:
+                siguen |= np.isin(candidatos, self.textos_con(k), assume_unique=True)
+            afectados.append((candidatos[~siguen], i, False))
+        for categoria, keyword in agregar:
+            afectados.append((self.textos_con(keyword), self._posicion(categoria), True))
+
+        ids = _union([a[0] for a in afectados], len(self.indice))
+        mascara_antes = self.mascaras[ids]
+        mascara_despues = mascara_antes.copy()
+        for textos, i, encender in afectados:
+            posiciones = np.searchsorted(ids, textos)
+            if encender:
+                mascara_despues[posiciones] |= np.uint32(1 << i)
+            else:
+                mascara_despues[posiciones] &= ~np.uint32(1 << i)
+
+        antes, despues = self._etiquetas(mascara_antes), self._etiquetas(mascara_despues)
+        cambian = antes != despues
+        nivel_antes = _nivel(self._riesgo(antes, ids))
+        nivel_despues = _nivel(self._riesgo(despues, ids))
+        filas = self.indice.conteos[ids]
+        nombres = np.array([NO_IDENTIFICADO] + self.categorias, dtype=object)
+
+        transiciones = (
+            pd.DataFrame({"antes": nombres[antes[cambian]], "despues": nombres[despues[cambian]], "filas": filas[cambian]})
+            .groupby(["antes", "despues"], as_index=False)["filas"].sum()
+            .sort_values("filas", ascending=False)
+        )
+        delta_niveles = {
+            n: int(filas[nivel_despues == n].sum() - filas[nivel_antes == n].sum()) for n in NIVELES
+        }
+        orden_ejemplos = ids[cambian][np.argsort(-filas[cambian], kind="stable")][:MAX_EJEMPLOS]
+        return {
+            "version_reglas": VERSION_REGLAS,
+            "agregar": [list(c) for c in agregar],
+            "quitar": [list(c) for c in quitar],
+            "filas_archivo": int(self.indice.conteos.sum()),
+            "filas_coinciden": int(filas.sum()),
+            "filas_cambian": int(filas[cambian].sum()),
+            "nuevas": int(filas[cambian & (antes == 0)].sum()),
+            "reclasificadas": int(filas[cambian & (antes > 0) & (despues > 0)].sum()),
+            "sin_clasificar": int(filas[cambian & (despues == 0)].sum()),
+            "transiciones": transiciones.to_dict(orient="records"),
+            "delta_niveles": delta_niveles,
+            "ejemplos": self.indice.textos.take(pa.array(orden_ejemplos)).to_pylist(),
+            "milisegundos": round((time.perf_counter() - inicio) * 1000, 2),
+        }
+
+
+def imprimir_delta(delta):
+    print("\n=== SIMULACIÓN DE CAMBIOS EN LA MATRIZ ===")
+    for accion in ("agregar", "quitar"):
+        for categoria, keyword in delta[accion]:
+            print(f"{'➕' if accion == 'agregar' else '➖'} '{keyword}' en {categoria}")
+    print(f"Filas del archivo: {delta['filas_archivo']} · con la keyword: {delta['filas_coinciden']}")
+    print(f"Nuevas clasificaciones: {delta['nuevas']}")
+    print(f"Reclasificadas (pisan otra categoría): {delta['reclasificadas']}")
+    print(f"Pasan a 'No identificado': {delta['sin_clasificar']}")
+    for t in delta["transiciones"]:
+        print(f"   {t['antes']} -> {t['despues']}: {t['filas']}")
+    print("Niveles de riesgo: " + ", ".join(f"{n} {v:+d}" for n, v in delta["delta_niveles"].items()))
+    for ejemplo in delta["ejemplos"][:5]:
+        print(f"   · {ejemplo[:110]}")
+    print(f"⏱️ {delta['milisegundos']} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simula agregar o quitar keywords de MATRIZ_TEORICA sobre el archivo")
+    parser.add_argument("--agregar", nargs=2, action="append", default=[], metavar=("CATEGORIA", "KEYWORD"))
+    parser.add_argument("--quitar", nargs=2, action="append", default=[], metavar=("CATEGORIA", "KEYWORD"))
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--json", action="store_true", help="Imprimir el reporte como JSON")
+    args = parser.parse_args()
+
+    simulador = SimuladorReglas(cargar_o_construir_indice(args.data_dir))
+    delta = simulador.simular(agregar=args.agregar, quitar=args.quitar)
+    aviso = aviso_sin_anexos(args.data_dir)
+    if args.json:
+        print(json.dumps({**delta, "aviso": aviso}, ensure_ascii=False, indent=1))
+    else:
+        imprimir_delta(delta)
+        if aviso:
+            print(aviso)
@@ -1,7 +1,8 @@
-import pandas as pd
 from collections import Counter
 import os
 from analisis import limpiar_texto_curado
+from cache_columnar import leer_reporte
+from catalogo import todos_los_reportes
 
 # Palabras vacías (Stopwords) que no nos importan porque son conectores
 STOPWORDS = [
@@ -49,7 +50,7 @@ def analizar_frecuencias(archivo_excel):
     y cuenta qué palabras se repiten más.
     """
     try:
-        df = pd.read_excel(archivo_excel, sheet_name="Analisis")
+        df = leer_reporte(archivo_excel)
     except Exception as e:
         print(f"Error al leer el Excel: {e}")
         return
@@ -97,23 +98,29 @@ def analizar_frecuencias(archivo_excel):
         print(f"{palabra:<20} | {cantidad:<10}")
 
     print("-" * 35)
+    print("Para medir el efecto de una palabra sobre todo el archivo:")
+    print('  python simulador_reglas.py --agregar "<Categoría>" "<palabra>"')
 
 
 # --- EJECUCIÓN ---
 if __name__ == "__main__":
     # Busca automáticamente el último Excel generado en la carpeta data
     data_dir = "data"
-    archivos = [
-        f
-        for f in os.listdir(data_dir)
-        if f.startswith("reporte_fenomenos") and f.endswith(".xlsx")
-    ]
-
-    if archivos:
+    entradas = todos_los_reportes(data_dir)
+    if entradas is not None:
+        archivos = [e["ruta"] for e in entradas]
+    else:
+        archivos = [
+            f
+            for f in os.listdir(data_dir)
+            if f.startswith("reporte_fenomenos") and f.endswith(".xlsx")
+        ]
         # Ordenamos para obtener el más reciente
         archivos.sort(reverse=True)
+
+    if archivos:
         ultimo_reporte = os.path.join(data_dir, archivos[0])
         print(f"Analizando reporte: {ultimo_reporte}")
         analizar_frecuencias(ultimo_reporte)
     else:
-        print("No encontré reportes Excel en la carpeta /data")
\ No newline at end of file
+        print("No encontré reportes Excel en la carpeta /data")
@@ -0,0 +1,298 @@
+import os
+import subprocess
+import sys
+from unittest import mock
+
+import pandas as pd
+import pytest
+import catalogo
+import deltas
+from analisis import VERSION_REGLAS, clasificar_decisiones, puntuar_textos
+from cache_columnar import leer_reporte, ruta_sidecar, sidecar_vigente
+from escritura_atomica import archivo_atomico, bloqueo_particion
+from exportador_excel import EscritorReporteExcel, exportar_reporte_excel
+from memo_clasificacion import MemoClasificacion
+from migrar_a_estructura_mensual import migrar_archivos
+
+# ==========================================
+# DATOS DE PRUEBA
+# ==========================================
+
+
+def reporte_simulado(n=3, inicio=0):
+    return pd.DataFrame(
+        [
+            {
+                "fecha": "2026-02-01",
+                "nro_proceso": f"PROC-{i}",
+                "detalle": f"Redeterminación de precios obra pública {i}",
+                "tipo_decision": "Obra Pública / Contratos",
+                "transferencia": "Estado a Empresas",
+                "indice_fenomeno_corruptivo": 8.5,
+                "nivel_riesgo_teorico": "Alto",
+            }
+            for i in range(inicio, inicio + n)
+        ]
+    )
+
+
+# ==========================================
+# EXPORTADOR EXCEL
+# ==========================================
+
+
+def test_exportador_genera_hojas_esperadas(tmp_path):
+    """Los consumidores buscan las hojas Analisis y Glosario"""
+    path = exportar_reporte_excel(reporte_simulado(), tmp_path / "reporte.xlsx")
+
+    xl = pd.ExcelFile(path)
+    assert xl.sheet_names == ["Analisis", "Glosario"]
+    assert len(xl.parse("Analisis")) == 3
+    assert "tipo_decision" in xl.parse("Glosario")["Columna"].tolist()
+
+
+def test_exportador_acumula_lotes(tmp_path):
+    """Los lotes de un pipeline en streaming terminan en la misma hoja"""
+    path = tmp_path / "reporte.xlsx"
+    with EscritorReporteExcel(path) as escritor:
+        escritor.agregar_lote(reporte_simulado(2))
+        escritor.agregar_lote(reporte_simulado(3, inicio=2))
+
+    df = pd.read_excel(path, sheet_name="Analisis")
+    assert escritor.filas == 5
+    assert df["nro_proceso"].tolist() == [f"PROC-{i}" for i in range(5)]
+
+
+# ==========================================
+# CACHÉ COLUMNAR (SIDECAR ARROW)
+# ==========================================
+
+
+def test_sidecar_aplica_mapeo_y_se_reutiliza(tmp_path):
+    """La primera lectura crea el sidecar; la segunda no toca el Excel"""
+    ruta = tmp_path / "reporte_fenomenos_20260121.xlsx"
+    legado = reporte_simulado().rename(
+        columns={"indice_fenomeno_corruptivo": "indice_total"}
+    )
+    legado.to_excel(ruta, index=False, sheet_name="Analisis")
+
+    df = leer_reporte(str(ruta))
+    assert "indice_fenomeno_corruptivo" in df.columns
+    assert os.path.exists(ruta_sidecar(str(ruta)))
+    assert sidecar_vigente(str(ruta))
+
+    with mock.patch("cache_columnar.leer_excel_normalizado") as lector:
+        df_cache = leer_reporte(str(ruta))
+    lector.assert_not_called()
+    assert df_cache["indice_fenomeno_corruptivo"].tolist() == [8.5] * 3
+
+
+def test_sidecar_obsoleto_se_regenera(tmp_path):
+    """Si el xlsx cambia, el hash delata al sidecar viejo"""
+    ruta = str(tmp_path / "reporte_fenomenos_20260121.xlsx")
+    reporte_simulado(2).to_excel(ruta, index=False)
+    leer_reporte(ruta)
+
+    reporte_simulado(4).to_excel(ruta, index=False)
+    assert not sidecar_vigente(ruta)
+    assert len(leer_reporte(ruta)) == 4
+    assert sidecar_vigente(ruta)
+
+
+def test_esquema_tipa_y_actualiza_reportes_legados(tmp_path):
+    """Columnas históricas y texto_clean se resuelven una vez, al escribir el sidecar"""
+    ruta = str(tmp_path / "reporte_fenomenos_20260121.xlsx")
+    legado = reporte_simulado(300).rename(columns={"nivel_riesgo_teorico": "nivel_riesgo"})
+    legado["texto_clean"] = legado["detalle"].str.lower()
+    legado["indice_total"] = legado["indice_fenomeno_corruptivo"]
+    legado.to_excel(ruta, index=False)
+
+    df = leer_reporte(ruta)
+
+    assert "texto_clean" not in df.columns and "indice_total" not in df.columns
+    assert df["indice_fenomeno_corruptivo"].dtype == "float32"
+    assert df["nivel_riesgo_teorico"].cat.categories.tolist() == ["Bajo", "Medio", "Alto"]
+    assert df["nivel_riesgo_teorico"].cat.ordered
+    assert df.memory_usage(deep=True).sum() < legado.memory_usage(deep=True).sum()
+    with mock.patch("cache_columnar.aplicar_esquema") as esquema:
+        tipado = leer_reporte(ruta)
+    esquema.assert_not_called()
+    assert isinstance(tipado["tipo_decision"].dtype, pd.CategoricalDtype)
+
+
+# ==========================================
+# CATÁLOGO DEL ARCHIVO
+# ==========================================
+
+
+def test_catalogo_registra_y_lista_sin_abrir_reportes(tmp_path):
+    """El primer registro incorpora los meses que ya estaban en disco"""
+    (tmp_path / "2026-01").mkdir()
+    (tmp_path / "2026-02").mkdir()
+    reporte_simulado(2).to_excel(
+        tmp_path / "2026-01" / "reporte_fenomenos_20260131.xlsx", index=False
+    )
+    nuevo = tmp_path / "2026-02" / "reporte_fenomenos_20260201.xlsx"
+    exportar_reporte_excel(reporte_simulado(4), nuevo)
+
+    entrada = catalogo.registrar_reporte(str(nuevo), reporte_simulado(4))
+
+    assert entrada["ruta"] == os.path.join("2026-02", "reporte_fenomenos_20260201.xlsx")
+    assert entrada["riesgo"] == {"Alto": 4, "Medio": 0, "Bajo": 0}
+    assert catalogo.meses_disponibles(str(tmp_path)) == ["2026-02", "2026-01"]
+
+    with mock.patch("catalogo.leer_reporte") as lector:
+        resumen = catalogo.resumen_del_mes("2026-01", str(tmp_path))
+    lector.assert_not_called()
+    assert resumen["filas"] == 2
+    assert not [f for f in os.listdir(tmp_path) if f.startswith(".tmp_")]
+
+
+# ==========================================
+# DELTAS DIARIOS Y COMPACTACIÓN
+# ==========================================
+
+
+def test_deltas_reconstruyen_cada_dia(tmp_path):
+    """Solo se guarda lo que cambia y cualquier día se puede reconstruir"""
+    data_dir = str(tmp_path)
+    dia1 = reporte_simulado(3)
+    dia2 = reporte_simulado(3, inicio=1)  # baja PROC-0, alta PROC-3
+    dia2.loc[dia2["nro_proceso"] == "PROC-1", "detalle"] = "Texto corregido"
+
+    deltas.escribir_delta(dia1, "2026-01-31", data_dir)
+    ruta = deltas.escribir_delta(dia2, "2026-02-01", data_dir)
+
+    ops = pd.read_parquet(ruta)
+    assert sorted(ops["_op"]) == ["alta", "baja", "cambio"]
+
+    deltas.compactar_meses_cerrados(data_dir, mes_actual="2026-02")
+    assert not os.path.exists(deltas.ruta_delta("2026-01-31", data_dir))
+
+    enero = deltas.reconstruir_snapshot("2026-01-31", data_dir)
+    febrero = deltas.reconstruir_snapshot("2026-02-01", data_dir)
+    assert sorted(enero["nro_proceso"]) == ["PROC-0", "PROC-1", "PROC-2"]
+    assert sorted(febrero["nro_proceso"]) == ["PROC-1", "PROC-2", "PROC-3"]
+    assert "Texto corregido" in febrero["detalle"].tolist()
+
+
+# ==========================================
+# MIGRACIÓN A ESTRUCTURA MENSUAL
+# ==========================================
+
+
+def test_migracion_verificada_e_idempotente(tmp_path):
+    """Mueve, verifica, registra en el catálogo y una segunda corrida no hace nada"""
+    exportar_reporte_excel(reporte_simulado(), tmp_path / "reporte_fenomenos_20260130.xlsx")
+    (tmp_path / "notas_sin_fecha.xlsx").write_bytes(b"")
+
+    conteo = migrar_archivos(str(tmp_path), workers=2, registrar=True)
+    assert conteo["migrado"] == 1 and conteo["sin_fecha"] == 1
+    assert (tmp_path / "2026-01" / "reporte_fenomenos_20260130.xlsx").exists()
+    assert catalogo.meses_disponibles(str(tmp_path)) == ["2026-01"]
+
+    conteo = migrar_archivos(str(tmp_path), workers=2, registrar=True)
+    assert conteo["migrado"] == 0 and conteo["error"] == 0
+
+
+# ==========================================
+# MEMO DE CLASIFICACIÓN
+# ==========================================
+
+
+def test_memo_reutiliza_clasificaciones_y_acota_su_tamano(tmp_path):
+    detalles = pd.Series(
+        [
+            "Redeterminación de obra publica por $ 1.250.000.000",
+            "Redeterminación de obra publica por $ 1.250.000.000",  # mismo texto
+            "Aumento de tarifa del 25% cuadro tarifario",
+            None,
+        ]
+    )
+    llamadas = []
+
+    def puntuar(textos):
+        llamadas.append(len(textos))
+        return puntuar_textos(textos)
+
+    with MemoClasificacion(tmp_path, VERSION_REGLAS) as memo:
+        primero = memo.clasificar(detalles, puntuar)
+        segundo = memo.clasificar(detalles, puntuar)
+        assert llamadas == [3]  # Solo los textos distintos, una única vez
+        pd.testing.assert_frame_equal(primero, segundo, check_dtype=False)
+        assert primero["indice_fenomeno_corruptivo"].tolist() == [9.5, 9.5, 7.5, 0.0]
+        assert segundo.loc[2, "porcentaje"] == 25.0
+
+    # Otra versión de reglas no reutiliza nada; el tope descarta lo más viejo
+    with MemoClasificacion(tmp_path, "otra-version", max_entradas=4) as memo:
+        memo.clasificar(detalles, puntuar)
+        assert llamadas == [3, 3]
+        assert len(memo) == 4
+        memo.clasificar(pd.Series(["Otro texto"]), puntuar)
+        assert len(memo) == 4
+
+    # clasificar_decisiones con y sin memo da el mismo resultado
+    df = pd.DataFrame({"detalle": detalles})
+    with MemoClasificacion(tmp_path, VERSION_REGLAS) as memo:
+        pd.testing.assert_frame_equal(clasificar_decisiones(df, memo), clasificar_decisiones(df))
+
+
+def test_version_de_reglas_cambia_con_la_extraccion_de_montos(monkeypatch):
+    """Un arreglo en rasgos_numericos invalida el memo aunque la matriz no cambie"""
+    import analisis
+
+    antes = analisis.calcular_version_reglas(analisis.MATRIZ_TEORICA, analisis.PARAMETROS_PONDERACION)
+    monkeypatch.setattr(analisis, "VERSION_RASGOS", "otra")
+    assert analisis.calcular_version_reglas(analisis.MATRIZ_TEORICA, analisis.PARAMETROS_PONDERACION) != antes
+    assert antes == analisis.VERSION_REGLAS
+
+
+def test_memo_es_transparente_con_textos_que_solo_difieren_en_espacios(tmp_path):
+    # La matriz no reconoce "obra  publica": el memo no puede reutilizar un resultado para el otro
+    for orden in (["obra  publica nueva", "obra publica nueva"], ["obra publica nueva", "obra  publica nueva"]):
+        df = pd.DataFrame({"detalle": orden})
+        with MemoClasificacion(tmp_path, VERSION_REGLAS) as memo:
+            pd.testing.assert_frame_equal(clasificar_decisiones(df, memo), clasificar_decisiones(df))
+
+
+# ==========================================
+# ESCRITURAS ATÓMICAS Y BLOQUEOS
+# ==========================================
+
+
+def test_escritura_atomica_y_bloqueo_por_dia(tmp_path):
+    """Un fallo deja el reporte anterior intacto; otra corrida del mismo día espera su turno"""
+    ruta = tmp_path / "reporte_fenomenos_20260201.xlsx"
+    exportar_reporte_excel(reporte_simulado(3), ruta)
+    try:
+        with archivo_atomico(ruta) as temporal:
+            with open(temporal, "wb") as f:
+                f.write(b"a medio escribir")
+            raise RuntimeError("corte")
+    except RuntimeError:
+        pass
+    assert len(pd.read_excel(ruta, sheet_name="Analisis")) == 3
+    assert os.listdir(tmp_path) == [ruta.name]
+
+    # Otro proceso toma el día; esta corrida no entra hasta que lo suelte
+    codigo = (
+        "import sys, time; from escritura_atomica import bloqueo_particion\n"
+        "with bloqueo_particion(sys.argv[1], '2026-02-01'):\n"
+        "    print('tomado', flush=True); time.sleep(2)"
+    )
+    otro = subprocess.Popen(
+        [sys.executable, "-c", codigo, str(tmp_path)], stdout=subprocess.PIPE, text=True, cwd=os.path.dirname(__file__)
+    )
+    try:
+        assert otro.stdout.readline().strip() == "tomado"
+        with pytest.raises(TimeoutError):
+            with bloqueo_particion(tmp_path, "2026-02-01", timeout=0.3):
+                pass
+        # Otro día no está bloqueado y el mismo hilo puede volver a pedir el suyo
+        with bloqueo_particion(tmp_path, "2026-02-02", timeout=0.3):
+            with bloqueo_particion(tmp_path, "2026-02-02", timeout=0.3):
+                pass
+    finally:
+        otro.wait()
+    with bloqueo_particion(tmp_path, "2026-02-01", timeout=5):
+        pass
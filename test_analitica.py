@@ -0,0 +1,498 @@
+import pandas as pd
+import pytest
+import requests
+from analisis import clasificar_decisiones
+from anomalias import detectar_anomalias
+from api_consultas import iniciar_api
+from catalogo import registrar_reporte
+from clasificador_lineal import actualizar_modelo, agregar_prediccion
+from consultas_dashboard import filtrar_reporte, paginar
+from cubo import (
+    construir_cubo,
+    conteo_por_nivel,
+    cubo_a_registros,
+    cubo_desde_registros,
+    por_escenario,
+    totales,
+)
+from exportador_excel import exportar_reporte_excel
+from grafo_entidades import construir_grafo, metricas_por_organismo
+from instantaneas import MAX_PRINCIPALES, cargar_instantanea, figura, generar_instantanea
+from rasgos_numericos import BONO_MAXIMO, extraer_rasgos
+
+# ==========================================
+# DATOS DE PRUEBA
+# ==========================================
+ESCENARIOS = [
+    ("Obra Pública / Contratos", "Estado a Empresas", 8.5, "Alto"),
+    ("Salarios y Paritarias", "Asalariados a Empleadores", 5.5, "Medio"),
+    ("No identificado", "No identificado", 0.0, "Bajo"),
+]
+
+
+def reporte_grande(n):
+    filas = []
+    for i in range(n):
+        escenario, transferencia, peso, nivel = ESCENARIOS[i % len(ESCENARIOS)]
+        filas.append(
+            {
+                "fecha": "2026-02-01",
+                "nro_proceso": f"PROC-{i}",
+                "detalle": f"Decisión {i} sobre {escenario.lower()}",
+                "tipo_decision": escenario,
+                "transferencia": transferencia,
+                "indice_fenomeno_corruptivo": peso,
+                "nivel_riesgo_teorico": nivel,
+            }
+        )
+    return pd.DataFrame(filas)
+
+
+# ==========================================
+# CONSULTAS DEL DASHBOARD
+# ==========================================
+
+
+def test_paginado_del_lado_del_servidor():
+    df = reporte_grande(300)
+    filtrado = filtrar_reporte(df, niveles=["Alto", "Medio"])
+
+    pagina, total = paginar(filtrado, pagina=2, tamano=25, orden="indice_fenomeno_corruptivo")
+
+    assert len(filtrado) == 200 and total == 8
+    assert len(pagina) == 25
+    # Los 100 casos de 8.5 van primero; la página 2 sigue en ese grupo
+    assert (pagina["indice_fenomeno_corruptivo"] == 8.5).all()
+
+
+# ==========================================
+# CUBO DE AGREGADOS
+# ==========================================
+
+
+def test_cubo_reproduce_las_metricas_del_reporte():
+    """Las vistas del cubo coinciden con los groupby sobre las filas"""
+    df = reporte_grande(9000)
+    cubo = construir_cubo(df)
+    detectados = df[df["tipo_decision"] != "No identificado"]
+
+    assert len(cubo) == 3
+    assert totales(cubo)["detectados"] == len(detectados)
+    esperado = detectados.groupby("tipo_decision")["indice_fenomeno_corruptivo"].mean()
+    vista = por_escenario(cubo).set_index("tipo_decision")["media"]
+    assert vista.sort_index().tolist() == esperado.sort_index().tolist()
+    assert conteo_por_nivel(cubo) == {"Alto": 3000, "Medio": 3000, "Bajo": 3000}
+
+    persistido = cubo_desde_registros(cubo_a_registros(cubo))
+    assert totales(persistido) == totales(cubo)
+
+
+# ==========================================
+# API DE CONSULTAS
+# ==========================================
+
+
+@pytest.fixture
+def api_con_dos_reportes(tmp_path):
+    for dia, n in (("20260201", 120), ("20260202", 60)):
+        ruta = tmp_path / "2026-02" / f"reporte_fenomenos_{dia}.xlsx"
+        ruta.parent.mkdir(exist_ok=True)
+        df = reporte_grande(n)
+        exportar_reporte_excel(df, ruta)
+        registrar_reporte(str(ruta), df, data_dir=str(tmp_path))
+    servidor, base = iniciar_api(str(tmp_path))
+    yield base
+    servidor.shutdown()
+
+
+def test_api_pagina_por_keyset_sin_repetir(api_con_dos_reportes):
+    base = api_con_dos_reportes
+    vistos, cursor, paginas = [], None, 0
+    while True:
+        params = {"nivel": "Alto", "limite": 15, **({"despues": cursor} if cursor else {})}
+        cuerpo = requests.get(f"{base}/procesos", params=params).json()
+        vistos += [(p["fecha_reporte"], p["nro_proceso"]) for p in cuerpo["datos"]]
+        paginas += 1
+        cursor = cuerpo["siguiente"]
+        if cursor is None:
+            break
+
+    assert len(vistos) == len(set(vistos)) == 40 + 20
+    assert paginas == 4
+    # Más reciente primero
+    assert vistos[0][0] == "2026-02-02" and vistos[-1][0] == "2026-02-01"
+
+
+def test_api_agregados_y_revalidacion_por_etag(api_con_dos_reportes):
+    base = api_con_dos_reportes
+    respuesta = requests.get(f"{base}/agregados", params={"por": "nivel"})
+    etag = respuesta.headers["ETag"]
+
+    assert "max-age" in respuesta.headers["Cache-Control"]
+    assert {d["nivel"]: d["cantidad"] for d in respuesta.json()["datos"]} == {"Alto": 60, "Medio": 60, "Bajo": 60}
+    repetida = requests.get(f"{base}/agregados", params={"por": "nivel"}, headers={"If-None-Match": etag})
+    assert repetida.status_code == 304
+    assert requests.get(f"{base}/agregados", params={"por": "otro"}).status_code == 400
+
+
+# ==========================================
+# ANOMALÍAS (EWMA)
+# ==========================================
+
+
+def test_anomalias_marcan_rafaga_de_un_organismo(tmp_path):
+    """Un día normal no alerta; una ráfaga de un organismo nuevo sí, y reprocesar es idempotente"""
+    for dia in range(1, 9):
+        normal = reporte_grande(6 + dia % 2).assign(organismo="MINISTERIO DE ECONOMÍA")
+        assert detectar_anomalias(normal, f"2026-02-{dia:02d}", str(tmp_path)) == []
+
+    rafaga = pd.concat(
+        [reporte_grande(6).assign(organismo="MINISTERIO DE ECONOMÍA"), reporte_grande(30).assign(organismo="VIALIDAD")],
+        ignore_index=True,
+    )
+    anomalias = detectar_anomalias(rafaga, "2026-02-09", str(tmp_path))
+    repetido = detectar_anomalias(rafaga, "2026-02-09", str(tmp_path))
+
+    marcadas = {(a["dimension"], a["valor"]) for a in anomalias}
+    assert ("organismo", "VIALIDAD") in marcadas
+    assert ("escenario", "Obra Pública / Contratos") in marcadas
+    assert ("organismo", "MINISTERIO DE ECONOMÍA") not in marcadas
+    assert repetido == anomalias
+
+
+# ==========================================
+# GRAFO ORGANISMO ↔ PROVEEDOR
+# ==========================================
+
+
+def test_grafo_calcula_concentracion_por_organismo():
+    df = pd.DataFrame(
+        {
+            "nro_proceso": ["1", "2", "3", "4", "5", "5"],
+            "organismo": ["VIALIDAD", "VIALIDAD", "VIALIDAD", "SALUD", "SALUD", "SALUD"],
+            "proveedor": ["Constructora X", "Constructora X", "Vial Y", None, "Droguería Z", "Droguería Z"],
+            "tipo_proceso": ["Contratación Directa", "Licitación Pública", "Licitación Pública"] * 2,
+        }
+    )
+    metricas = metricas_por_organismo(construir_grafo(df)).set_index("organismo")
+
+    vialidad, salud = metricas.loc["VIALIDAD"], metricas.loc["SALUD"]
+    assert vialidad["procesos"] == 3 and vialidad["proveedores"] == 2
+    assert round(vialidad["hhi"]) == round(10000 * ((2 / 3) ** 2 + (1 / 3) ** 2))
+    assert vialidad["ratio_repetidos"] == 2 / 3
+    assert vialidad["proveedor_principal"] == "Constructora X"
+    # El proceso 5 aparece dos veces pero cuenta una sola
+    assert salud["procesos"] == 2 and salud["adjudicados"] == 1 and salud["hhi"] == 10000
+    assert salud["ratio_directa"] == 0.5
+
+
+# ==========================================
+# RASGOS NUMÉRICOS
+# ==========================================
+
+
+def test_rasgos_numericos_y_ponderacion_por_monto():
+    df = pd.DataFrame(
+        {
+            "detalle": [
+                "Redeterminación de obra publica por $ 1.250.000.000,50",
+                "Obra publica menor por $ 50.000",
+                "Aumento de tarifa del 25,5% y luego 30 % - cuadro tarifario",
+                "Decreto 25/2026DECTO-2026-25-APN-PTE - Recházase recurso por USD 3,5 millones",
+                None,
+            ]
+        }
+    )
+    rasgos = extraer_rasgos(df)
+    assert rasgos["monto_ars"].tolist()[:2] == [1250000000.5, 50000.0]
+    assert rasgos["monto_ars"].dtype == "float64"
+    assert rasgos.loc[2, "porcentaje"] == 30.0
+    assert rasgos.loc[3, "monto_usd"] == 3_500_000.0
+    assert rasgos.loc[3, "norma"] == "DECTO-2026-25-APN-PTE"
+    assert rasgos.loc[4].isna().all()
+
+    clasificado = clasificar_decisiones(df)
+    indice = clasificado["indice_fenomeno_corruptivo"]
+    # El monto grande suma hasta BONO_MAXIMO; el chico y el no detectado no cambian
+    assert indice[0] == pytest.approx(8.5 + BONO_MAXIMO)
+    assert indice[1] == pytest.approx(8.5)
+    assert indice[3] == 0.0
+    assert clasificado["nivel_riesgo_teorico"].tolist()[:3] == ["Alto", "Alto", "Medio"]
+
+
+# ==========================================
+# INSTANTÁNEAS ESTÁTICAS
+# ==========================================
+
+
+def test_instantanea_reemplaza_al_reporte_mientras_esta_vigente(tmp_path):
+    """La instantánea trae métricas, figuras y principales; si el reporte cambia, deja de usarse"""
+    (tmp_path / "2026-02").mkdir()
+    ruta = str(tmp_path / "2026-02" / "reporte_fenomenos_20260203.xlsx")
+    df = reporte_grande(300)
+    exportar_reporte_excel(df, ruta)
+    registrar_reporte(ruta, df, data_dir=str(tmp_path))
+
+    generar_instantanea(ruta, df, str(tmp_path))
+    instantanea = cargar_instantanea(ruta, str(tmp_path))
+    assert instantanea["totales"] == totales(construir_cubo(df))
+    assert instantanea["riesgo"] == {"Alto": 100, "Medio": 100, "Bajo": 100}
+    assert len(instantanea["principales"]) == MAX_PRINCIPALES
+    assert {f["indice_fenomeno_corruptivo"] for f in instantanea["principales"]} == {8.5}
+    assert figura(instantanea, "matriz_riesgo").data
+    assert (tmp_path / "instantaneas" / "2026-02" / "reporte_fenomenos_20260203.html").exists()
+    assert (tmp_path / "instantaneas" / "indice.json").exists()
+
+    # Reprocesar el día con otras filas cambia el sha del catálogo
+    otro = reporte_grande(30)
+    exportar_reporte_excel(otro, ruta)
+    registrar_reporte(ruta, otro, data_dir=str(tmp_path))
+    assert cargar_instantanea(ruta, str(tmp_path)) is None
+
+
+# ==========================================
+# CLASIFICADOR LINEAL (SEGUNDA ETAPA)
+# ==========================================
+
+
+def test_clasificador_lineal_aprende_del_historico_y_sugiere_escenarios(tmp_path):
+    """Entrena una sola vez por reporte y reconoce paráfrasis que la matriz no cubre"""
+    plantillas = [
+        "Licitación de obra publica para la ruta nacional {i} tramo Chubut",
+        "Cuadro tarifario del servicio de gas natural por redes zona {i}",
+        "Designación transitoria de personal en la dirección de sumarios {i}",
+    ]
+    (tmp_path / "2026-02").mkdir()
+    for dia in (1, 2):
+        detalles = [p.format(i=i) for i in range(40) for p in plantillas]
+        df = clasificar_decisiones(pd.DataFrame({"fecha": f"2026-02-0{dia}", "detalle": detalles}))
+        ruta = str(tmp_path / "2026-02" / f"reporte_fenomenos_2026020{dia}.xlsx")
+        exportar_reporte_excel(df, ruta)
+        registrar_reporte(ruta, df, data_dir=str(tmp_path))
+
+    assert actualizar_modelo(str(tmp_path)) == 240
+    assert actualizar_modelo(str(tmp_path)) == 0  # Los reportes ya vistos no se repiten
+
+    nuevos = clasificar_decisiones(
+        pd.DataFrame({"detalle": ["Ampliación de la ruta nacional 40 tramo Chubut", "Gas natural por redes: nuevos valores"]})
+    )
+    assert (nuevos["tipo_decision"] == "No identificado").all()
+    sugerido = agregar_prediccion(nuevos, str(tmp_path))
+    assert sugerido["tipo_decision_modelo"].tolist() == ["Obra Pública / Contratos", "Tarifas Servicios Públicos"]
+    assert (sugerido["confianza_modelo"] > 0.5).all()
+    assert sugerido["tipo_decision"].tolist() == nuevos["tipo_decision"].tolist()
+
+
+def test_simulador_de_reglas_coincide_con_reclasificar_el_archivo(tmp_path, monkeypatch):
+    """El delta del índice invertido es el mismo que volver a correr la matriz modificada"""
+    import copy
+    import analisis
+    from analisis import MATRIZ_TEORICA, puntuar_textos
+    from simulador_reglas import SimuladorReglas, cargar_o_construir_indice, ruta_indice
+
+    detalles = [
+        "Licitación de obra pública para la ruta nacional 3 por $ 900.000.000",
+        "Ampliación de la ruta nacional 40 tramo Chubut",
+        "Régimen de IVA diferencial para derivados del petróleo",
+        "Concesión de la ruta nacional 9",
+        "Designación transitoria de personal",
+        "Cuadro tarifario del servicio de gas natural",
+    ]
+    (tmp_path / "2026-03").mkdir()
+    for dia in (1, 2):
+        df = clasificar_decisiones(pd.DataFrame({"fecha": f"2026-03-0{dia}", "detalle": detalles * dia}))
+        ruta = str(tmp_path / "2026-03" / f"reporte_fenomenos_2026030{dia}.xlsx")
+        exportar_reporte_excel(df, ruta)
+        registrar_reporte(ruta, df, data_dir=str(tmp_path))
+
+    simulador = SimuladorReglas(cargar_o_construir_indice(str(tmp_path)))
+    assert int(simulador.indice.conteos.sum()) == 18 and len(simulador.indice) == 6
+    cambios = {
+        "agregar": [("Obra Pública / Contratos", "ruta nacional")],
+        "quitar": [("Traslado de Impuestos", "iva")],
+    }
+    delta = simulador.simular(**cambios)
+
+    archivo = pd.Series(detalles * 3)
+    antes = puntuar_textos(archivo)
+    matriz = copy.deepcopy(MATRIZ_TEORICA)
+    matriz["Obra Pública / Contratos"]["keywords"].append("ruta nacional")
+    matriz["Traslado de Impuestos"]["keywords"].remove("iva")
+    monkeypatch.setattr(analisis, "MATRIZ_TEORICA", matriz)
+    despues = puntuar_textos(archivo)
+
+    cambian = antes["tipo_decision"] != despues["tipo_decision"]
+    assert delta["filas_cambian"] == cambian.sum() == 9  # ruta 40 (nueva), concesión (pisada), IVA (perdida)
+    assert delta["nuevas"] == (cambian & (antes["tipo_decision"] == "No identificado")).sum()
+    assert delta["sin_clasificar"] == (cambian & (despues["tipo_decision"] == "No identificado")).sum()
+    nivel = lambda r: pd.cut(r["indice_fenomeno_corruptivo"], [-1, 4.999, 7.999, 10], labels=["Bajo", "Medio", "Alto"])
+    esperado = (nivel(despues).value_counts() - nivel(antes).value_counts()).to_dict()
+    assert delta["delta_niveles"] == {n: int(esperado[n]) for n in ("Alto", "Medio", "Bajo")}
+
+    # El índice persiste y se reusa mientras el catálogo no cambie
+    assert (tmp_path / "indice_reglas.npz").exists() and ruta_indice(str(tmp_path)).endswith(".npz")
+    recargado = cargar_o_construir_indice(str(tmp_path), leer=lambda ruta: pytest.fail("no debía releer"))
+    assert recargado.textos.to_pylist() == simulador.indice.textos.to_pylist()
+    with pytest.raises(ValueError):
+        simulador.simular(agregar=[("Inexistente", "x")])
+
+
+def test_top_riesgo_persistido_responde_sin_abrir_reportes(tmp_path):
+    """Global, mes, trimestre y escenario coinciden con ordenar todas las filas"""
+    import numpy as np
+    from top_riesgo import actualizar_top, consultar_top, trimestre
+
+    rng = np.random.default_rng(7)
+    todas = []
+    for fecha in ("2026-01-30", "2026-02-03", "2026-02-17", "2026-04-01", "2026-02-17"):
+        df = reporte_grande(90).assign(fecha=fecha)
+        df["indice_fenomeno_corruptivo"] = np.where(
+            df["indice_fenomeno_corruptivo"] > 0, rng.integers(50, 100, len(df)) / 10, 0.0
+        )
+        actualizar_top(df, fecha, str(tmp_path), f"{fecha[:7]}/reporte.xlsx")
+        # Segunda corrida del 17/02: reemplaza a la primera
+        todas = [t for t in todas if t["fecha"].iloc[0] != fecha] + [df.assign(fila=range(len(df)))]
+    archivo = pd.concat(todas, ignore_index=True)
+    archivo = archivo[archivo["indice_fenomeno_corruptivo"] > 0]
+
+    def esperado(filas, k):
+        orden = filas.sort_values(["indice_fenomeno_corruptivo", "fecha", "fila"], ascending=[False, False, True])
+        return list(zip(orden["fecha"].head(k), orden["nro_proceso"].head(k)))
+
+    def obtenido(decisiones):
+        return [(d["fecha"], d["nro_proceso"]) for d in decisiones]
+
+    assert obtenido(consultar_top(str(tmp_path), 30)) == esperado(archivo, 30)
+    febrero = archivo[archivo["fecha"].str.startswith("2026-02")]
+    assert obtenido(consultar_top(str(tmp_path), 25, "2026-02-01", "2026-02-28")) == esperado(febrero, 25)
+    desde, hasta = trimestre(2026, 1)
+    primer_trimestre = archivo[archivo["fecha"].between(desde, hasta)]
+    assert obtenido(consultar_top(str(tmp_path), 50, desde, hasta)) == esperado(primer_trimestre, 50)
+    salarios = archivo[archivo["tipo_decision"] == "Salarios y Paritarias"]
+    assert obtenido(consultar_top(str(tmp_path), 10, escenario="Salarios y Paritarias")) == esperado(salarios, 10)
+    parcial = salarios[salarios["fecha"].between("2026-02-10", "2026-04-30")]
+    assert obtenido(
+        consultar_top(str(tmp_path), 10, "2026-02-10", "2026-04-30", "Salarios y Paritarias")
+    ) == esperado(parcial, 10)
+    with pytest.raises(ValueError):
+        consultar_top(str(tmp_path), 10_000)
+
+
+def test_top_riesgo_descarta_los_dias_viejos_sin_perder_los_meses(tmp_path, monkeypatch):
+    """Los días de meses viejos se pliegan en el mes; el archivo no crece con cada reporte"""
+    import json
+    import numpy as np
+    import top_riesgo
+    from top_riesgo import actualizar_top, consultar_top
+
+    monkeypatch.setattr(top_riesgo, "MESES_CON_DIAS", 1)
+    rng = np.random.default_rng(11)
+    todas = []
+    for fecha in ("2026-01-05", "2026-01-20", "2026-02-03", "2026-02-17", "2026-01-20"):
+        df = reporte_grande(60).assign(fecha=fecha)
+        df["indice_fenomeno_corruptivo"] = np.where(
+            df["indice_fenomeno_corruptivo"] > 0, rng.integers(50, 100, len(df)) / 10, 0.0
+        )
+        actualizar_top(df, fecha, str(tmp_path), f"{fecha[:7]}/reporte.xlsx")
+        # La segunda corrida del 20/01 llega cuando enero ya no tiene días
+        todas = [t for t in todas if t["fecha"].iloc[0] != fecha] + [df.assign(fila=range(len(df)))]
+    archivo = pd.concat(todas, ignore_index=True)
+    archivo = archivo[archivo["indice_fenomeno_corruptivo"] > 0]
+
+    def esperado(filas, k):
+        orden = filas.sort_values(["indice_fenomeno_corruptivo", "fecha", "fila"], ascending=[False, False, True])
+        return list(zip(orden["fecha"].head(k), orden["nro_proceso"].head(k)))
+
+    def obtenido(decisiones):
+        return [(d["fecha"], d["nro_proceso"]) for d in decisiones]
+
+    with open(tmp_path / "top_riesgo.json", encoding="utf-8") as f:
+        assert sorted(json.load(f)["dias"]) == ["2026-02-03", "2026-02-17"]
+    assert obtenido(consultar_top(str(tmp_path), 30)) == esperado(archivo, 30)
+    enero = archivo[archivo["fecha"].str.startswith("2026-01")]
+    assert obtenido(consultar_top(str(tmp_path), 30, "2026-01-01", "2026-01-31")) == esperado(enero, 30)
+    # Enero cortado: sale filtrando la lista del mes, en orden exacto
+    parcial = archivo[archivo["fecha"].between("2026-01-10", "2026-02-10")]
+    recortado = obtenido(consultar_top(str(tmp_path), 30, "2026-01-10", "2026-02-10"))
+    assert recortado and recortado == esperado(parcial, len(recortado))
+
+
+def test_calendario_de_aperturas_ordenado_por_fecha(tmp_path):
+    """La fecha del portal se parsea al ingresar y el rango sale de un corte del índice"""
+    from calendario_aperturas import actualizar_calendario, cargar_calendario
+    from esquema import aplicar_esquema, fecha_argentina
+
+    textos = pd.Series(["30/03/2026 10:00 Hrs.", "n/a", "2026-04-02", "5/4/26", "31/02/2026", "07-04-2026 - 14.30 hs"])
+    assert fecha_argentina(textos).tolist()[:4] == [
+        pd.Timestamp("2026-03-30 10:00"), pd.NaT, pd.Timestamp("2026-04-02"), pd.Timestamp("2026-04-05")
+    ]
+    assert pd.isna(fecha_argentina(textos)[4]) and fecha_argentina(textos)[5] == pd.Timestamp("2026-04-07 14:30")
+
+    def dia(fecha, aperturas):
+        df = reporte_grande(len(aperturas)).assign(fecha=fecha, fecha_apertura=aperturas)
+        return aplicar_esquema(df)
+
+    actualizar_calendario(dia("2026-03-20", ["25/03/2026 10:00 Hrs.", "n/a", "01/04/2026 12:00 Hrs."]), "2026-03-20", str(tmp_path), "a")
+    # Al día siguiente PROC-0 se posterga y aparece PROC-3
+    segundo = dia("2026-03-21", ["02/04/2026 10:00 Hrs.", "n/a", "01/04/2026 12:00 Hrs.", "26/03/2026 09:00 Hrs."])
+    actualizar_calendario(segundo, "2026-03-21", str(tmp_path), "b")
+    actualizar_calendario(segundo, "2026-03-21", str(tmp_path), "b")  # Segunda corrida del mismo día
+
+    calendario = cargar_calendario(str(tmp_path))
+    assert calendario.tabla["nro_proceso"].tolist() == ["PROC-3", "PROC-2", "PROC-0"]
+    assert (calendario.aperturas[:-1] <= calendario.aperturas[1:]).all()
+    assert calendario.entre("2026-03-26 09:00", "2026-04-01 12:00")["nro_proceso"].tolist() == ["PROC-3", "PROC-2"]
+    proximas = calendario.proximas(dias=7, desde="2026-03-27", niveles=["Alto"])
+    assert proximas["nro_proceso"].tolist() == ["PROC-0"]
+    assert proximas["fecha"].tolist() == ["2026-03-21"]
+
+    # Sin el índice (un clon nuevo) se rehace solo desde el catálogo
+    (tmp_path / "2026-03").mkdir()
+    ruta = str(tmp_path / "2026-03" / "reporte_fenomenos_20260321.xlsx")
+    exportar_reporte_excel(segundo, ruta)
+    registrar_reporte(ruta, segundo, data_dir=str(tmp_path))
+    (tmp_path / "calendario_aperturas.arrow").unlink()
+    assert cargar_calendario(str(tmp_path)).tabla["nro_proceso"].tolist() == ["PROC-3", "PROC-2", "PROC-0"]
+    assert (tmp_path / "calendario_aperturas.arrow").exists()
+
+
+def test_comparar_versiones_de_la_matriz_en_una_pasada(monkeypatch):
+    """Cada versión da lo mismo que puntuar_textos con esa matriz, normalizando una sola vez"""
+    import analisis
+    from analisis import MATRIZ_TEORICA, puntuar_textos
+    from comparar_reglas import BASE, comparar, con_pesos
+
+    detalles = pd.Series([
+        "Resolución de movilidad jubilatoria ANSES por $ 900.000.000",
+        "Licitación de obra pública con redeterminación de precios",
+        "Régimen de retenciones a la exportación de granos",
+        "Designación transitoria de personal",
+    ])
+    propuesta = con_pesos(MATRIZ_TEORICA, {"Jubilaciones / Pensiones": 7.0})
+    propuesta["Derechos de Exportación"] = {"keywords": ["retenciones"], "transferencia": "Productores al Estado", "peso": 6.0}
+
+    normalizaciones = []
+    original = analisis.limpiar_texto_curado
+    monkeypatch.setattr(analisis, "limpiar_texto_curado", lambda t: normalizaciones.append(t) or original(t))
+    clasificaciones, resumen = comparar(detalles, {BASE: MATRIZ_TEORICA, "propuesta": propuesta, "igual": MATRIZ_TEORICA})
+    assert len(normalizaciones) == len(detalles)
+    monkeypatch.setattr(analisis, "limpiar_texto_curado", original)
+
+    for nombre, matriz in (("vigente", MATRIZ_TEORICA), ("propuesta", propuesta)):
+        monkeypatch.setattr(analisis, "MATRIZ_TEORICA", matriz)
+        esperado = puntuar_textos(detalles)
+        assert clasificaciones[f"tipo_decision[{nombre}]"].tolist() == esperado["tipo_decision"].tolist()
+        assert clasificaciones[f"indice[{nombre}]"].tolist() == esperado["indice_fenomeno_corruptivo"].tolist()
+
+    diferencias = resumen["diferencias"]["propuesta"]
+    assert diferencias["cambian_escenario"] == diferencias["nuevas"] == 1
+    assert diferencias["transiciones"] == [{"antes": "No identificado", "despues": "Derechos de Exportación", "filas": 1}]
+    assert diferencias["cambian_nivel"] == 2  # Jubilaciones baja de Alto a Medio; retenciones entra como Medio
+    assert resumen["diferencias"]["igual"]["cambian_indice"] == 0
+    assert resumen["versiones"][BASE] == analisis.VERSION_REGLAS
+
+    # Las keywords son literales: "(" o "." no rompen ni amplían la búsqueda
+    literal = {"Sociedades": {"keywords": ["s.a. (en formacion)"], "transferencia": "x", "peso": 5.0}}
+    textos = pd.Series(["Constitución de Acme S.A. (en formación)", "Acme sxa en formacion"])
+    _, resumen_literal = comparar(textos, {BASE: MATRIZ_TEORICA, "literal": literal})
+    assert resumen_literal["diferencias"]["literal"]["nuevas"] == 1
@@ -0,0 +1,310 @@
+import os
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+import requests
+import diario
+from analisis import clasificar_decisiones
+from anexos import agregar_texto_anexos, extraer_textos
+from cliente_http import CircuitoAbierto, ClienteHTTP, LimitadorAIMD
+from fuentes import Fuente, FuenteBORA, ejecutar_fuentes
+from notificadores import NotificadorSMTP, crear_notificadores
+from servidor_simulado import ConfiguracionSimulador, iniciar_servidor, iniciar_smtp
+from vigilancia import ciclo_vigilancia
+
+# ==========================================
+# SERVIDOR LOCAL DE PRUEBA
+# ==========================================
+
+
+@pytest.fixture
+def servidor_inestable():
+    """Responde 503 las primeras 'fallas' veces y luego 200"""
+    estado = {"fallas": 2, "pedidos": 0}
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            estado["pedidos"] += 1
+            codigo = 503 if estado["pedidos"] <= estado["fallas"] else 200
+            self.send_response(codigo)
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{servidor.server_port}/", estado
+    servidor.shutdown()
+
+
+# ==========================================
+# CLIENTE HTTP
+# ==========================================
+
+
+def test_cliente_reintenta_errores_transitorios(servidor_inestable):
+    url, estado = servidor_inestable
+    cliente = ClienteHTTP(reintentos=3, backoff_base=0.01)
+
+    respuesta = cliente.get(url)
+
+    assert respuesta.status_code == 200
+    assert estado["pedidos"] == 3
+
+
+def test_disyuntor_corta_un_portal_degradado(servidor_inestable):
+    url, estado = servidor_inestable
+    estado["fallas"] = 100
+    cliente = ClienteHTTP(reintentos=5, backoff_base=0.01, umbral_fallas=2)
+
+    with pytest.raises(CircuitoAbierto):
+        cliente.get(url)
+    assert estado["pedidos"] == 2
+
+
+def test_cliente_falla_al_agotar_reintentos_y_no_traba_el_disyuntor(servidor_inestable, monkeypatch):
+    url, estado = servidor_inestable
+    estado["fallas"] = 100
+    cliente = ClienteHTTP(reintentos=1, backoff_base=0.01, umbral_fallas=1, tiempo_reapertura=0.0)
+
+    with pytest.raises(requests.HTTPError) as error:
+        cliente.get(url)
+    assert error.value.response.status_code == 503
+
+    # Una excepción ajena a requests en la prueba del semiabierto lo vuelve a abrir
+    def hook_roto(*args, **kwargs):
+        raise ValueError("hook roto")
+
+    disyuntor = cliente.estado_host(url).disyuntor
+    monkeypatch.setattr(cliente.estado_host(url).session, "request", hook_roto)
+    with pytest.raises(ValueError):
+        cliente.get(url)
+    assert disyuntor.estado == "abierto"
+    monkeypatch.undo()
+    estado["fallas"] = 0
+    assert cliente.get(url).status_code == 200
+
+
+def test_limitador_aimd_reduce_ante_errores():
+    limitador = LimitadorAIMD(inicial=8, maximo=16)
+    limitador.adquirir()
+    limitador.liberar(latencia=0.1, exito=False)
+    assert limitador.limite == 4
+
+    for _ in range(8):
+        limitador.adquirir()
+        limitador.liberar(latencia=0.1, exito=True)
+    assert 5 < limitador.limite < 7
+
+
+# ==========================================
+# SIMULADOR LOCAL DE COMPRAR.GOB.AR
+# ==========================================
+
+
+def test_scraper_pagina_contra_el_simulador():
+    """La paginación por postback recorre todas las páginas sin repetir filas"""
+    config = ConfiguracionSimulador(paginas=4, filas_por_pagina=5)
+    servidor, base = iniciar_servidor(config)
+    try:
+        df = diario.extraer_licitaciones(f"{base}/Compras.aspx?qs=W1HXHGHtH10=", paginas_max=10)
+    finally:
+        servidor.shutdown()
+
+    assert len(df) == 20
+    assert df["nro_proceso"].is_unique
+    assert df["link"].str.startswith(f"{base}/PLIEGO/").all()
+
+
+# ==========================================
+# VIGILANCIA Y NOTIFICADORES
+# ==========================================
+
+
+def test_vigilancia_alerta_solo_lo_nuevo(tmp_path):
+    """La línea base no alerta; una página sin cambios corta el recorrido"""
+    config = ConfiguracionSimulador(paginas=3, filas_por_pagina=5)
+    servidor, base = iniciar_servidor(config)
+    url = f"{base}/Compras.aspx?qs=W1HXHGHtH10="
+    destino = tmp_path / "alertas.jsonl"
+    notificadores = crear_notificadores(f"archivo:{destino};webhook:{base}/webhook")
+    try:
+        inicial = ciclo_vigilancia(notificadores, url, paginas_max=3, data_dir=str(tmp_path))
+        pedidos = config.pedidos
+        sin_cambios = ciclo_vigilancia(notificadores, url, paginas_max=3, data_dir=str(tmp_path))
+        pedidos_sin_cambios = config.pedidos - pedidos
+
+        config.publicar("Contratación directa con sobreprecio en obra pública")
+        config.publicar("Adquisición de resmas de papel")
+        con_novedad = ciclo_vigilancia(notificadores, url, paginas_max=3, data_dir=str(tmp_path))
+    finally:
+        servidor.shutdown()
+
+    assert inicial["nuevos"] == 15 and inicial["alertas"] == []
+    assert sin_cambios["nuevos"] == 0 and pedidos_sin_cambios == 1
+    assert con_novedad["nuevos"] == 2
+    assert [a["nro_proceso"] for a in con_novedad["alertas"]] == ["99-9001-NOV26"]
+    assert len(destino.read_text(encoding="utf-8").splitlines()) == 1
+    assert config.webhooks[0]["alertas"][0]["tipo_decision"] == "Obra Pública / Contratos"
+
+
+def test_vigilancia_reintenta_las_alertas_no_entregadas(tmp_path):
+    """Lo que un canal no acepta queda pendiente solo para ese canal"""
+    config = ConfiguracionSimulador(paginas=1, filas_por_pagina=5)
+    servidor, base = iniciar_servidor(config)
+    url = f"{base}/Compras.aspx?qs=W1HXHGHtH10="
+    bloqueo = tmp_path / "caido"
+    bloqueo.write_text("")  # un archivo donde el canal espera un directorio: la escritura falla
+    sano, caido = tmp_path / "sano.jsonl", bloqueo / "alertas.jsonl"
+    notificadores = crear_notificadores(f"archivo:{sano};archivo:{caido}")
+    try:
+        ciclo_vigilancia(notificadores, url, paginas_max=1, data_dir=str(tmp_path))
+        config.publicar("Contratación directa con sobreprecio en obra pública")
+        fallido = ciclo_vigilancia(notificadores, url, paginas_max=1, data_dir=str(tmp_path))
+        bloqueo.unlink()
+        reintento = ciclo_vigilancia(notificadores, url, paginas_max=1, data_dir=str(tmp_path))
+    finally:
+        servidor.shutdown()
+
+    assert len(fallido["alertas"]) == 1 and fallido["entregadas"] == 1 and fallido["pendientes"] == 1
+    assert reintento["nuevos"] == 0 and reintento["entregadas"] == 1 and reintento["pendientes"] == 0
+    # El canal sano no la recibe dos veces; el caído la recibe al recuperarse
+    assert len(sano.read_text(encoding="utf-8").splitlines()) == 1
+    assert "99-9001-NOV26" in caido.read_text(encoding="utf-8")
+
+
+def test_notificador_smtp_entrega_el_resumen():
+    servidor, puerto = iniciar_smtp()
+    notificador = NotificadorSMTP("127.0.0.1", puerto, "monitor@localhost", ["auditoria@localhost"])
+    alerta = {
+        "nro_proceso": "99-9001-NOV26",
+        "detalle": "Contratación directa con sobreprecio",
+        "tipo_decision": "Obra Pública / Contratos",
+        "indice": 8.5,
+        "link": "http://127.0.0.1/PLIEGO/x",
+    }
+    try:
+        notificador.enviar([alerta])
+    finally:
+        servidor.shutdown()
+
+    assert len(servidor.mensajes) == 1
+    recibido = servidor.mensajes[0]
+    assert recibido["destinatarios"] == ["auditoria@localhost"]
+    assert "99-9001-NOV26" in recibido["mensaje"].get_content()
+
+
+# ==========================================
+# REGISTRO DE FUENTES
+# ==========================================
+
+
+class FuenteLenta(Fuente):
+    nombre = "lenta"
+    timeout = 0.3
+
+    def obtener(self, tarea, cliente):
+        time.sleep(2)
+        return []
+
+    def parsear(self, crudo, tarea):
+        return crudo
+
+
+class FuenteRota(Fuente):
+    nombre = "rota"
+
+    def obtener(self, tarea, cliente):
+        raise ConnectionError("portal provincial caído")
+
+
+def test_fuentes_corren_en_paralelo_con_fallas_aisladas():
+    config = ConfiguracionSimulador(paginas=2, filas_por_pagina=5)
+    servidor, base = iniciar_servidor(config)
+    fuentes = [
+        diario.FuenteComprar([f"{base}/Compras.aspx?qs=W1HXHGHtH10="], paginas_max=2),
+        FuenteBORA(base, ["primera", "tercera"]),
+        FuenteLenta(),
+        FuenteRota(),
+    ]
+    inicio = time.monotonic()
+    try:
+        df, resultados = ejecutar_fuentes(fuentes, ClienteHTTP(reintentos=0))
+    finally:
+        servidor.shutdown()
+
+    estados = {r["fuente"]: r["estado"] for r in resultados}
+    assert estados == {"comprar": "ok", "bora": "ok", "lenta": "timeout", "rota": "error"}
+    assert time.monotonic() - inicio < 1.5
+    assert len(df) == 10 + 31 + 39
+    bora = df[df["nro_proceso"].str.startswith("BORA-primera-")]
+    assert bora["organismo"].iloc[0] == "DIRECCIÓN NACIONAL DE VIALIDAD"
+    assert bora["link"].iloc[0] == f"{base}/detalleAviso/primera/337599/20260121"
+
+
+# ==========================================
+# ANEXOS (PLIEGOS DOCX / PDF)
+# ==========================================
+
+
+def extraer_o_morir(ruta, tipo, timeout):
+    """Extractor de prueba: el documento 'mata' tira abajo su worker"""
+    if "mata" in ruta:
+        os._exit(1)
+    return "texto de " + os.path.basename(ruta), None
+
+
+def test_documento_que_rompe_el_pool_queda_marcado(tmp_path, monkeypatch):
+    rutas = []
+    for nombre in ("a.pdf", "mata.pdf", "b.pdf"):
+        (tmp_path / nombre).write_bytes(b"%PDF-1.4")
+        rutas.append(str(tmp_path / nombre))
+    monkeypatch.setattr("anexos.extraer_texto", extraer_o_morir)
+
+    textos = extraer_textos([(r, "pdf") for r in rutas], workers=2)
+
+    assert textos == {rutas[0]: "texto de a.pdf", rutas[2]: "texto de b.pdf"}
+    assert (tmp_path / "mata.pdf.error").exists()
+    assert not (tmp_path / "a.pdf.error").exists()
+
+
+def test_anexos_se_descargan_una_vez_y_alimentan_la_matriz(tmp_path, monkeypatch):
+    config = ConfiguracionSimulador()
+    servidor, base = iniciar_servidor(config)
+    df = pd.DataFrame(
+        {
+            "detalle": ["Adquisición de insumos de oficina 1", "Servicio de limpieza 2"],
+            "link": [f"{base}/PLIEGO/Vista.aspx?qs=SIM000001", f"{base}/PLIEGO/Vista.aspx?qs=SIM000002"],
+        }
+    )
+    # Un documento corrupto en la caché no frena a los demás
+    roto = tmp_path / "anexos" / "roto.pdf"
+    roto.parent.mkdir()
+    roto.write_bytes(b"%PDF-1.4 truncado")
+    try:
+        enriquecido = agregar_texto_anexos(df, ClienteHTTP(reintentos=0), tmp_path, workers=2)
+        assert extraer_textos([(str(roto), "pdf")], workers=1) == {}
+        # La falla queda registrada: el mismo documento no vuelve al pool
+        assert (tmp_path / "anexos" / "roto.pdf.error").exists()
+        with monkeypatch.context() as m:
+            m.setattr("anexos.ProcessPoolExecutor", None)
+            assert extraer_textos([(str(roto), "pdf")], workers=1) == {}
+        pedidos = config.pedidos
+        agregar_texto_anexos(df, ClienteHTTP(reintentos=0), tmp_path, workers=2)
+        assert config.pedidos - pedidos == 2  # Solo las páginas de los procesos
+    finally:
+        servidor.shutdown()
+
+    assert enriquecido["anexos"].tolist() == [2, 2]
+    assert "presupuesto oficial de $ 2.500.000.000" in enriquecido.loc[0, "texto_anexos"]
+    assert "aumento de tarifa del 40%" in enriquecido.loc[1, "texto_anexos"]
+
+    clasificado = clasificar_decisiones(enriquecido)
+    assert "texto_anexos" not in clasificado.columns
+    assert (clasificado["tipo_decision"] != "No identificado").all()
+    assert clasificado["monto_ars"].tolist() == [2_500_000_000.0] * 2
@@ -0,0 +1,280 @@
+import os
+import json
+import heapq
+import calendar
+import pandas as pd
+from catalogo import cargar_catalogo, escribir_json_atomico, todos_los_reportes
+from deltas import leer_dia
+from escritura_atomica import bloqueo
+from esquema import COLUMNA_INDICE, COLUMNA_NIVEL
+
+# ==========================================
+# ÍNDICE PERSISTENTE DE LAS DECISIONES DE MAYOR RIESGO
+# ==========================================
+# "Las 50 decisiones más riesgosas del trimestre" no debería obligar a abrir
+# cada reporte. Este índice guarda, ya fusionadas, las K decisiones de mayor
+# índice de cada mes y escenario, de cada escenario y de todo el archivo; y,
+# solo para los últimos MESES_CON_DIAS meses, las K de cada día. Las listas
+# se guardan ordenadas de mayor a menor (un heap ya resuelto) y se fusionan
+# con heapq.
+#
+# Cada reporte nuevo se fusiona en O(K) por lista: sus listas entran en las
+# del mes, el escenario y el total. Si el día ya estaba (otra corrida del
+# mismo día), el mes se rehace desde sus días (a lo sumo 31) y los
+# escenarios afectados desde los meses. Los días de meses más viejos se
+# descartan: su aporte ya quedó en el mes, y el archivo no crece con cada
+# reporte. Un rango que corta un mes ya sin días se responde filtrando la
+# lista del mes: el orden es exacto, pero puede traer menos de k.
+#
+# El índice vive en data/top_riesgo.json (el robot lo versiona); se puede
+# rehacer desde el catálogo con: python top_riesgo.py reconstruir
+
+NOMBRE_ESTADO = "top_riesgo.json"
+VERSION_ESTADO = 2
+BLOQUEO_ESTADO = "top_riesgo"
+
+K = int(os.environ.get("TOP_RIESGO_K", "100"))
+# Meses (contando el más reciente) que conservan las listas de cada día
+MESES_CON_DIAS = int(os.environ.get("TOP_RIESGO_MESES_CON_DIAS", "3"))
+LARGO_DETALLE = 500
+
+COLUMNAS_TOP = [
+    "nro_proceso",
+    "detalle",
+    "tipo_decision",
+    "transferencia",
+    "organismo",
+    "link",
+    COLUMNA_INDICE,
+    COLUMNA_NIVEL,
+]
+
+
+def ruta_estado(data_dir):
+    return os.path.join(data_dir, NOMBRE_ESTADO)
+
+
+def estado_vacio():
+    return {"version": VERSION_ESTADO, "k": K, "dias": {}, "meses": {}, "escenarios": {}, "global": []}
+
+
+def cargar_estado(data_dir):
+    ruta = ruta_estado(data_dir)
+    if not os.path.exists(ruta):
+        return estado_vacio()
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            estado = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Índice de mayor riesgo ilegible ({ruta}): {e}")
+        return estado_vacio()
+    if estado.get("version") != VERSION_ESTADO or estado.get("k") != K:
+        return estado_vacio()
+    return estado
+
+
+def guardar_estado(estado, data_dir):
+    escribir_json_atomico(ruta_estado(data_dir), estado)
+
+
+# ==========================================
+# LISTAS DEL DÍA Y FUSIÓN
+# ==========================================
+def _clave(decision):
+    """Mayor índice primero; a igual índice, la más reciente y luego la primera fila del reporte"""
+    return decision[COLUMNA_INDICE], decision["fecha"], -decision["fila"]
+
+
+def fusionar(*listas, k=K):
+    return heapq.nlargest(k, (d for lista in listas for d in lista), key=_clave)
+
+
+def top_del_reporte(df, fecha, reporte=None, k=K):
+    """{escenario: [decisiones]} con las K de mayor índice de cada escenario del día"""
+    if df.empty or COLUMNA_INDICE not in df.columns:
+        return {}
+    detectados = df[df[COLUMNA_INDICE] > 0]
+    if detectados.empty:
+        return {}
+    columnas = [c for c in COLUMNAS_TOP if c in detectados.columns]
+    principales = (
+        detectados.assign(fila=range(len(detectados)))
+        .sort_values(COLUMNA_INDICE, ascending=False, kind="stable")
+        .groupby("tipo_decision", observed=True, sort=False)
+        .head(k)[columnas + ["fila"]]
+    )
+    if "detalle" in principales.columns:
+        principales["detalle"] = principales["detalle"].astype(str).str.slice(0, LARGO_DETALLE)
+    # to_json resuelve categorías, float32 y NaN (null) en una pasada
+    registros = json.loads(principales.to_json(orient="records", force_ascii=False))
+    por_escenario = {}
+    for registro in registros:
+        registro.update(fecha=fecha, reporte=reporte)
+        por_escenario.setdefault(registro["tipo_decision"], []).append(registro)
+    return por_escenario
+
+
+def _sin_fecha(lista, fecha):
+    return [d for d in lista if d["fecha"] != fecha]
+
+
+def podar_dias(estado, meses=MESES_CON_DIAS):
+    """Descarta las listas diarias de los meses anteriores a los 'meses' más recientes"""
+    conservados = sorted({f[:7] for f in estado["dias"]})[-meses:]
+    estado["dias"] = {f: dia for f, dia in estado["dias"].items() if f[:7] in conservados}
+
+
+def procesar_reporte(por_escenario, fecha, estado, reporte=None):
+    """Fusiona las listas de un día en las del mes, los escenarios y el total"""
+    k = estado["k"]
+    mes = fecha[:7]
+    anterior = estado["dias"].get(fecha)
+    mes_sin_dias = not any(f[:7] == mes for f in estado["dias"])
+    estado["dias"][fecha] = {"reporte": reporte, "escenarios": por_escenario}
+    del_mes = estado["meses"].setdefault(mes, {})
+
+    if anterior is None:
+        # Si el mes ya no tiene días, una corrida vieja del mismo día se quita primero
+        for escenario in set(por_escenario) | (set(del_mes) if mes_sin_dias else set()):
+            lista = por_escenario.get(escenario, [])
+            del_mes[escenario] = fusionar(_sin_fecha(del_mes.get(escenario, []), fecha), lista, k=k)
+            estado["escenarios"][escenario] = fusionar(
+                _sin_fecha(estado["escenarios"].get(escenario, []), fecha), lista, k=k
+            )
+        del_dia = [d for lista in por_escenario.values() for d in lista]
+        estado["global"] = fusionar(_sin_fecha(estado["global"], fecha), del_dia, k=k)
+    else:
+        # Día reemplazado: las decisiones viejas pueden haber desplazado a otras
+        dias_del_mes = [dia for f, dia in estado["dias"].items() if f[:7] == mes]
+        for escenario in set(anterior["escenarios"]) | set(por_escenario):
+            del_mes[escenario] = fusionar(*(dia["escenarios"].get(escenario, []) for dia in dias_del_mes), k=k)
+            if not del_mes[escenario]:
+                del del_mes[escenario]
+            listas = [m.get(escenario, []) for m in estado["meses"].values()]
+            estado["escenarios"][escenario] = fusionar(*listas, k=k)
+            if not estado["escenarios"][escenario]:
+                del estado["escenarios"][escenario]
+        # Las K del total están entre las K de cada escenario
+        estado["global"] = fusionar(*estado["escenarios"].values(), k=k)
+
+    for escenario in [e for e, lista in del_mes.items() if not lista]:
+        del del_mes[escenario]
+    if not del_mes:
+        del estado["meses"][mes]
+    podar_dias(estado, MESES_CON_DIAS)
+    return estado
+
+
+def actualizar_top(df, fecha, data_dir, reporte=None):
+    """Punto de entrada del pipeline: fusiona el reporte en el índice persistido"""
+    por_escenario = top_del_reporte(df, fecha, reporte)
+    with bloqueo(data_dir, BLOQUEO_ESTADO):
+        estado = cargar_estado(data_dir)
+        procesar_reporte(por_escenario, fecha, estado, reporte)
+        guardar_estado(estado, data_dir)
+    return por_escenario
+
+
+# ==========================================
+# CONSULTAS
+# ==========================================
+def ultimo_dia(mes):
+    """'2026-02' -> '2026-02-28'"""
+    anio, numero = (int(p) for p in mes.split("-"))
+    return f"{mes}-{calendar.monthrange(anio, numero)[1]:02d}"
+
+
+def _mes_completo(mes, desde, hasta):
+    return (desde is None or desde <= f"{mes}-01") and (hasta is None or hasta >= ultimo_dia(mes))
+
+
+def consultar_top(data_dir, k=50, desde=None, hasta=None, escenario=None, estado=None):
+    """
+    Las k decisiones de mayor índice del rango (fechas YYYY-MM-DD, inclusive)
+    y, opcionalmente, de un escenario. No abre ningún reporte: los meses
+    completos salen de sus listas fusionadas y los bordes, de las listas
+    diarias (o de las del mes filtradas, si sus días ya se descartaron).
+    """
+    estado = estado or cargar_estado(data_dir)
+    if k > estado["k"]:
+        raise ValueError(f"El índice guarda las {estado['k']} principales; se pidieron {k}")
+    if desde is None and hasta is None:
+        lista = estado["escenarios"].get(escenario, []) if escenario else estado["global"]
+        return lista[:k]
+
+    def en_rango(fecha):
+        return (desde is None or fecha >= desde) and (hasta is None or fecha <= hasta)
+
+    def del_escenario(escenarios):
+        return list(escenarios.values()) if escenario is None else [escenarios.get(escenario, [])]
+
+    meses_con_dias = {f[:7] for f in estado["dias"]}
+    listas = []
+    for mes, del_mes in estado["meses"].items():
+        if (desde is not None and ultimo_dia(mes) < desde) or (hasta is not None and f"{mes}-01" > hasta):
+            continue
+        if _mes_completo(mes, desde, hasta):
+            listas.extend(del_escenario(del_mes))
+        elif mes in meses_con_dias:
+            for fecha, dia in estado["dias"].items():
+                if fecha[:7] == mes and en_rango(fecha):
+                    listas.extend(del_escenario(dia["escenarios"]))
+        else:
+            listas.extend([d for d in lista if en_rango(d["fecha"])] for lista in del_escenario(del_mes))
+    return fusionar(*listas, k=k)
+
+
+def trimestre(anio, numero):
+    """(desde, hasta) del trimestre 1-4 de un año, para consultar_top"""
+    inicio = 3 * (numero - 1) + 1
+    return f"{anio}-{inicio:02d}-01", ultimo_dia(f"{anio}-{inicio + 2:02d}")
+
+
+def top_a_tabla(decisiones):
+    columnas = ["fecha"] + COLUMNAS_TOP
+    return pd.DataFrame(decisiones, columns=columnas)
+
+
+# ==========================================
+# RECONSTRUCCIÓN DESDE EL CATÁLOGO
+# ==========================================
+def reconstruir_top(data_dir):
+    """Rehace el índice recorriendo los reportes del catálogo. Retorna el estado"""
+    estado = estado_vacio()
+    for entrada in reversed(todos_los_reportes(data_dir) or []):
+        if not entrada.get("fecha"):
+            continue
+        df = leer_dia(os.path.join(data_dir, entrada["ruta"]), data_dir)
+        procesar_reporte(top_del_reporte(df, entrada["fecha"], entrada["ruta"]), entrada["fecha"], estado, entrada["ruta"])
+    with bloqueo(data_dir, BLOQUEO_ESTADO):
+        guardar_estado(estado, data_dir)
+    return estado
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Decisiones de mayor riesgo del archivo, sin abrir los reportes")
+    parser.add_argument("accion", nargs="?", choices=["consultar", "reconstruir"], default="consultar")
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--desde", help="YYYY-MM-DD")
+    parser.add_argument("--hasta", help="YYYY-MM-DD")
+    parser.add_argument("--mes", help="YYYY-MM")
+    parser.add_argument("--escenario")
+    parser.add_argument("--data-dir", default="/app/data" if os.path.exists("/app/data") else "data")
+    args = parser.parse_args()
+
+    if args.accion == "reconstruir":
+        if cargar_catalogo(args.data_dir) is None:
+            print("❌ No hay catálogo; ejecutar antes: python catalogo.py")
+            raise SystemExit(1)
+        estado = reconstruir_top(args.data_dir)
+        print(f"✅ Índice rehecho con {len(estado['meses'])} meses y {len(estado['escenarios'])} escenarios.")
+    else:
+        desde, hasta = (f"{args.mes}-01", ultimo_dia(args.mes)) if args.mes else (args.desde, args.hasta)
+        tabla = top_a_tabla(consultar_top(args.data_dir, args.k, desde, hasta, args.escenario))
+        if tabla.empty:
+            print("No hay decisiones indexadas para esa consulta (¿falta 'python top_riesgo.py reconstruir'?).")
+        else:
+            with pd.option_context("display.max_colwidth", 80, "display.width", 200):
+                print(tabla[["fecha", "tipo_decision", COLUMNA_INDICE, "detalle"]].to_string(index=False))
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Vigilancia - Sondeo frecuente de Comprar.gob.ar con alertas inmediatas
+=======================================================================
+
+Complementa la corrida diaria (diario.py): cada pocos minutos pide la grilla
+del portal y:
+    1. Calcula un hash del contenido de cada página; si una página no
+       cambió, no se parsea ni se clasifica, y se corta el recorrido
+       (las publicaciones nuevas entran por el principio del listado).
+    2. Clasifica solo los procesos que no se habían visto antes.
+    3. Envía los nuevos de riesgo Alto a los notificadores configurados
+       (archivo, webhook, SMTP; ver notificadores.py). Cada canal tiene su
+       cola: lo que un canal no acepta queda pendiente y se le reintenta
+       solo a él en el próximo ciclo.
+
+El estado (hashes por página, procesos vistos y alertas pendientes por
+canal) se guarda en data/vigilancia.json. La primera corrida solo toma la línea base y no
+alerta sobre lo ya publicado, salvo --alertar-existentes.
+
+USO:
+    NOTIFICADORES="archivo:data/alertas.jsonl" python vigilancia.py --intervalo 300
+    python vigilancia.py --ciclos 1          # una sola revisión (cron)
+"""
+
+import os
+import json
+import time
+import random
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+import pandas as pd
+from analisis import abrir_memo, clasificar_decisiones
+from catalogo import escribir_json_atomico
+from diario import PAGINAS_MAX, URL_COMPRAR, encontrar_grilla, parsear_grilla, recorrer_paginas
+from notificadores import crear_notificadores, nombre_canal, notificar_por_canal
+
+DATA_DIR = "/app/data" if os.path.exists("/app") else "data"
+
+NOMBRE_ESTADO = "vigilancia.json"
+VERSION_ESTADO = 1
+INTERVALO_DEFECTO = int(os.environ.get("VIGILANCIA_INTERVALO", "300"))
+# Un proceso visto hace más de estos días se olvida (acota el estado)
+DIAS_RETENCION = 45
+
+
+# ==========================================
+# ESTADO PERSISTENTE
+# ==========================================
+def ruta_estado(data_dir):
+    return os.path.join(data_dir, NOMBRE_ESTADO)
+
+
+def estado_vacio(url):
+    return {"version": VERSION_ESTADO, "url": url, "paginas": {}, "vistos": {}, "pendientes": {}, "ultima_revision": None}
+
+
+def cargar_estado(data_dir, url):
+    """Estado previo para esta URL; uno vacío si no existe o es de otra URL"""
+    ruta = ruta_estado(data_dir)
+    if os.path.exists(ruta):
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                estado = json.load(f)
+            if estado.get("version") == VERSION_ESTADO and estado.get("url") == url:
+                if not isinstance(estado.get("pendientes"), dict):
+                    estado["pendientes"] = {}
+                return estado
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Estado de vigilancia ilegible ({ruta}): {e}")
+    return estado_vacio(url)
+
+
+def guardar_estado(estado, data_dir):
+    os.makedirs(data_dir, exist_ok=True)
+    estado["ultima_revision"] = datetime.now().isoformat(timespec="seconds")
+    escribir_json_atomico(ruta_estado(data_dir), estado)
+
+
+def podar_vistos(estado, dias=DIAS_RETENCION):
+    limite = (datetime.now() - timedelta(days=dias)).strftime("%Y-%m-%d")
+    estado["vistos"] = {nro: dia for nro, dia in estado["vistos"].items() if dia >= limite}
+    estado["pendientes"] = {
+        canal: vigentes
+        for canal, cola in estado["pendientes"].items()
+        if (vigentes := [a for a in cola if a["detectado"][:10] >= limite])
+    }
+
+
+# ==========================================
+# DETECCIÓN DE CAMBIOS
+# ==========================================
+def hash_grilla(soup):
+    """Huella de la grilla (sin VIEWSTATE, que cambia en cada respuesta)"""
+    tabla = encontrar_grilla(soup)
+    contenido = str(tabla) if tabla else ""
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def revisar_portal(estado, url, paginas_max, cliente=None):
+    """
+    Recorre la grilla hasta la primera página sin cambios.
+    Retorna (df_nuevos, resumen); actualiza los hashes del estado. Los
+    nuevos se marcan como vistos recién al clasificarlos (ciclo_vigilancia).
+    """
+    nuevos = []
+    resumen = {"paginas_revisadas": 0, "paginas_sin_cambios": 0}
+
+    for numero, soup in recorrer_paginas(url, paginas_max, cliente):
+        resumen["paginas_revisadas"] += 1
+        huella = hash_grilla(soup)
+        if estado["paginas"].get(str(numero)) == huella:
+            resumen["paginas_sin_cambios"] += 1
+            break
+        estado["paginas"][str(numero)] = huella
+
+        for fila in parsear_grilla(soup, url) or []:
+            nro = fila["nro_proceso"]
+            if nro and nro not in estado["vistos"]:
+                nuevos.append(fila)
+
+    return pd.DataFrame(nuevos), resumen
+
+
+def armar_alertas(df_clasificado):
+    """Alertas para los procesos nuevos de riesgo Alto"""
+    if df_clasificado.empty:
+        return []
+    altos = df_clasificado[df_clasificado["nivel_riesgo_teorico"] == "Alto"]
+    detectado = datetime.now().isoformat(timespec="seconds")
+    return [
+        {
+            "nro_proceso": fila["nro_proceso"],
+            "detalle": fila["detalle"],
+            "tipo_decision": fila["tipo_decision"],
+            "transferencia": fila["transferencia"],
+            "indice": float(fila["indice_fenomeno_corruptivo"]),
+            "nivel": fila["nivel_riesgo_teorico"],
+            "link": fila.get("link", ""),
+            "detectado": detectado,
+        }
+        for fila in altos.to_dict(orient="records")
+    ]
+
+
+# ==========================================
+# CICLO DE VIGILANCIA
+# ==========================================
+def ciclo_vigilancia(
+    notificadores,
+    url=None,
+    paginas_max=None,
+    data_dir=None,
+    cliente=None,
+    alertar_existentes=False,
+):
+    """Una revisión completa: detectar, clasificar lo nuevo y notificar"""
+    url = url or URL_COMPRAR
+    paginas_max = paginas_max or PAGINAS_MAX
+    data_dir = data_dir or DATA_DIR
+
+    estado = cargar_estado(data_dir, url)
+    linea_base = not estado["paginas"]
+
+    df_nuevos, resumen = revisar_portal(estado, url, paginas_max, cliente)
+    alertas = []
+    if not df_nuevos.empty:
+        df_nuevos["detalle"] = df_nuevos["detalle"].fillna("Sin descripción")
+        memo = abrir_memo(data_dir)
+        try:
+            alertas = armar_alertas(clasificar_decisiones(df_nuevos, memo))
+        finally:
+            if memo is not None:
+                memo.close()
+
+    if linea_base and not alertar_existentes:
+        print(f"📌 Línea base tomada: {len(df_nuevos)} procesos existentes (sin alertar)")
+        alertas = []
+    hoy = datetime.now().strftime("%Y-%m-%d")
+    for nro in df_nuevos.get("nro_proceso", []):
+        estado["vistos"][nro] = hoy
+
+    # Cada canal recibe lo que le quedó pendiente más las alertas nuevas
+    colas = {}
+    for notificador in notificadores:
+        canal = nombre_canal(notificador)
+        colas[canal] = estado["pendientes"].get(canal, []) + alertas
+    estado["pendientes"] = notificar_por_canal(colas, notificadores)
+    entregadas = 0
+    for canal, cola in colas.items():
+        if cola and canal not in estado["pendientes"]:
+            entregadas += len(cola)
+            print(f"🚨 {len(cola)} alerta(s) de riesgo Alto enviadas por {canal}")
+    for canal, cola in estado["pendientes"].items():
+        print(f"⚠️ {len(cola)} alerta(s) pendientes para {canal}; se reintentan en el próximo ciclo")
+
+    podar_vistos(estado)
+    guardar_estado(estado, data_dir)
+
+    pendientes = sum(len(cola) for cola in estado["pendientes"].values())
+    resumen.update({"nuevos": len(df_nuevos), "alertas": alertas, "entregadas": entregadas, "pendientes": pendientes})
+    return resumen
+
+
+def vigilar(intervalo=INTERVALO_DEFECTO, ciclos=None, **kwargs):
+    """Repite ciclo_vigilancia cada 'intervalo' segundos (con jitter ±10%)"""
+    notificadores = crear_notificadores()
+    print(f"👁️ Vigilancia iniciada: cada {intervalo}s, {len(notificadores)} notificador(es)")
+    if not notificadores:
+        print("⚠️ NOTIFICADORES está vacío: las alertas de riesgo Alto no se entregan a ningún canal")
+    realizados = 0
+    while ciclos is None or realizados < ciclos:
+        inicio = time.monotonic()
+        try:
+            resumen = ciclo_vigilancia(notificadores, **kwargs)
+            print(
+                f"🔄 {datetime.now():%H:%M:%S} · {resumen['paginas_revisadas']} página(s), "
+                f"{resumen['nuevos']} nuevo(s), {len(resumen['alertas'])} alerta(s), "
+                f"{resumen['entregadas']} entregada(s), {resumen['pendientes']} pendiente(s)"
+            )
+        except Exception as e:
+            # Un portal caído (o el disyuntor abierto) no detiene la vigilancia
+            print(f"⚠️ Ciclo fallido: {e}")
+        realizados += 1
+        if ciclos is not None and realizados >= ciclos:
+            break
+        espera = intervalo * random.uniform(0.9, 1.1) - (time.monotonic() - inicio)
+        time.sleep(max(0.0, espera))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sondeo frecuente de Comprar.gob.ar con alertas")
+    parser.add_argument("--intervalo", type=int, default=INTERVALO_DEFECTO, help="Segundos entre revisiones")
+    parser.add_argument("--ciclos", type=int, default=None, help="Cantidad de revisiones (por defecto, sin fin)")
+    parser.add_argument("--paginas", type=int, default=None, help="Máximo de páginas por revisión")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--alertar-existentes", action="store_true", help="Alertar también en la línea base")
+    args = parser.parse_args()
+
+    try:
+        vigilar(
+            args.intervalo,
+            args.ciclos,
+            paginas_max=args.paginas,
+            data_dir=args.data_dir,
+            alertar_existentes=args.alertar_existentes,
+        )
+    except KeyboardInterrupt:
+        print("\n🛑 Vigilancia detenida")